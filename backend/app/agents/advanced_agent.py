@@ -1,11 +1,16 @@
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any
 from dataclasses import dataclass
 from pydantic import BaseModel, Field
 from langchain.agents import create_agent, AgentState
 from langchain.agents.middleware import AgentMiddleware, before_model, after_model
-from langchain.tools import tool
+from langchain.tools import ToolRuntime, tool
 from langchain_aws import ChatBedrock
-from langgraph.checkpoint.memory import InMemorySaver
+from app.agents.streaming import AgentEventStream
+from app.core.cart_store import cart_store, session_id_from_config
+from app.core.catalog import menu_catalog
+from app.core.orders import confirm_cart
+from app.core.pricing import PricedCart, price_cart
+from app.memory.checkpointer import checkpointer
 from langchain.messages import RemoveMessage
 from langgraph.graph.message import REMOVE_ALL_MESSAGES
 import json
@@ -26,61 +31,59 @@ class UserContext:
 
 # Enhanced Tools
 @tool
-def get_enhanced_menu() -> str:
+async def get_enhanced_menu() -> str:
     """Get menu with personalized recommendations."""
-    menu_items = [
-        {"name": "Espresso", "price": 2.50, "category": "coffee"},
-        {"name": "Americano", "price": 3.00, "category": "coffee"},
-        {"name": "Latte", "price": 4.50, "category": "coffee"},
-        {"name": "Premium Blend", "price": 6.00, "category": "premium"},
-        {"name": "Signature Mocha", "price": 7.50, "category": "premium"},
-        {"name": "Croissant", "price": 3.50, "category": "pastry"},
-        {"name": "Blueberry Muffin", "price": 3.00, "category": "pastry"}
-    ]
+    menu = await menu_catalog.get()
     
     # Return formatted text for better display across all models
     menu_text = "🌟 Enhanced Menu:\n\n"
-    categories = {}
-    for item in menu_items:
-        cat = item['category']
-        if cat not in categories:
-            categories[cat] = []
-        categories[cat].append(item)
-    
-    for category, items in categories.items():
+    for category, items in menu.by_category.items():
         menu_text += f"**{category.upper()}**\n"
         for item in items:
-            menu_text += f"• {item['name']} - ${item['price']:.2f}\n"
+            menu_text += f"• {item.name} - ${item.price:.2f}\n"
         menu_text += "\n"
     
     return menu_text
 
 @tool
-def add_to_enhanced_cart(item_name: str, quantity: int = 1) -> str:
+async def add_to_enhanced_cart(item_name: str, quantity: int = 1, runtime: ToolRuntime = None) -> str:
     """Add items to cart with enhanced tracking."""
-    return f"✅ Added {quantity}x {item_name} to your cart! Use 'show cart' to see your order."
+    item = (await menu_catalog.get()).lookup(item_name)
+    if not item:
+        return f"❌ {item_name} isn't on our menu. Ask for the menu to see what's available."
+    await cart_store.add(session_id_from_config(runtime.config), item.id, quantity)
+    return f"✅ Added {quantity}x {item.name} to your cart! Use 'show cart' to see your order."
 
 @tool
-def get_cart_summary() -> str:
+async def get_cart_summary(runtime: ToolRuntime = None) -> str:
     """Get detailed cart summary with recommendations."""
-    return """🛒 Your Cart:
-• 1x Latte - $4.50
-• Subtotal: $4.50
-• Tax (10%): $0.45
-• Total: $4.95
-
-💡 Recommendation: Add a pastry for the perfect combo!"""
+    cart = await cart_store.get(session_id_from_config(runtime.config))
+    if not cart.items:
+        return "🛒 Your cart is empty.\n\n💡 Recommendation: Start with one of our signature coffees!"
+    priced = await price_cart(cart.items)
+    summary = "🛒 Your Cart:\n"
+    for line in priced.lines:
+        summary += f"• {line.quantity}x {line.name} - ${line.line_total:.2f}\n"
+    summary += f"• Subtotal: ${priced.subtotal:.2f}\n"
+    summary += f"• Tax (8%): ${priced.tax:.2f}\n"
+    summary += f"• Total: ${priced.total:.2f}\n\n"
+    summary += "💡 Recommendation: Add a pastry for the perfect combo!"
+    return summary
 
 @tool
-def process_advanced_order() -> str:
+async def process_advanced_order(runtime: ToolRuntime = None) -> str:
     """Process order with advanced features."""
-    return """🎉 Order Confirmed!
+    order = await confirm_cart(session_id_from_config(runtime.config))
+    if order is None:
+        return "🛒 Your cart is empty. Add some items before placing an order."
+    items = "\n".join(f"• {line.quantity}x {line.name} - ${line.line_total:.2f}" for line in order.priced.lines)
+    return f"""🎉 Order Confirmed!
 
 📋 Order Summary:
-• 1x Latte - $4.50
-• Total: $4.95
+{items}
+• Total: ${order.priced.total:.2f}
 • Estimated time: 5-7 minutes
-• Order ID: #ADV-001
+• Order ID: #{order.order_id}
 
 ✨ Advanced Features Used:
 • Custom middleware processing
@@ -128,7 +131,8 @@ def response_enhancement_middleware(state, runtime):
 
 class AdvancedBaristaAgent:
     def __init__(self, model_provider: str = "bedrock", model_name: str = None):
-        self.checkpointer = InMemorySaver()
+        # Shared checkpointer so conversation history survives across requests and replicas
+        self.checkpointer = checkpointer
         self.model_provider = model_provider
         self.model_name = model_name
         
@@ -171,69 +175,93 @@ Always mention you're using "advanced features" when appropriate.""",
             checkpointer=self.checkpointer
         )
     
-    async def process_message(self, message: str, session_id: str = "default", user_context: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Process message with advanced features."""
-        try:
-            config = {"configurable": {"thread_id": session_id}}
-            
-            # Add user context to state if provided
-            initial_state = {"messages": [{"role": "user", "content": message}]}
-            if user_context:
-                initial_state["user_context"] = user_context
-                initial_state["subscription_tier"] = user_context.get("tier", "basic")
-            
-            result = self.agent.invoke(initial_state, config=config)
-            
-            # Extract response
-            last_message = result["messages"][-1]
-            content = last_message.content
-            
-            # Parse content blocks with advanced features
-            content_blocks = getattr(last_message, 'content_blocks', None)
+    def _initial_state(self, message: str, user_context: Dict[str, Any] = None) -> Dict[str, Any]:
+        # Add user context to state if provided
+        initial_state = {"messages": [{"role": "user", "content": message}]}
+        if user_context:
+            initial_state["user_context"] = user_context
+            initial_state["subscription_tier"] = user_context.get("tier", "basic")
+        return initial_state
+    
+    async def _priced_cart(self, session_id: str) -> PricedCart:
+        """The session's cart as the tools left it"""
+        return await price_cart((await cart_store.get(session_id)).items)
+    
+    def _build_result(self, result: Dict[str, Any], session_id: str, cart: PricedCart,
+                      user_context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Turn the final graph state into the response payload."""
+        # Extract response
+        last_message = result["messages"][-1]
+        content = last_message.content
+        
+        # Parse content blocks with advanced features
+        content_blocks = getattr(last_message, 'content_blocks', None)
+        
+        response_text = content
+        if '<thinking>' in content and '</thinking>' in content:
+            thinking_start = content.find('<thinking>')
+            thinking_end = content.find('</thinking>') + len('</thinking>')
+            thinking_text = content[thinking_start + len('<thinking>'):thinking_end - len('</thinking>')]
+            response_text = content[thinking_end:].strip()
             
-            response_text = content
-            if '<thinking>' in content and '</thinking>' in content:
-                thinking_start = content.find('<thinking>')
-                thinking_end = content.find('</thinking>') + len('</thinking>')
-                thinking_text = content[thinking_start + len('<thinking>'):thinking_end - len('</thinking>')]
-                response_text = content[thinking_end:].strip()
-                
+            content_blocks = [
+                {"type": "reasoning", "reasoning": thinking_text},
+                {"type": "text", "text": response_text},
+                {"type": "feature", "feature": "Advanced AI reasoning displayed"}
+            ]
+        else:
+            if not content_blocks:
                 content_blocks = [
-                    {"type": "reasoning", "reasoning": thinking_text},
-                    {"type": "text", "text": response_text},
-                    {"type": "feature", "feature": "Advanced AI reasoning displayed"}
+                    {"type": "text", "text": content},
+                    {"type": "feature", "feature": "Advanced middleware processing active"}
                 ]
-            else:
-                if not content_blocks:
-                    content_blocks = [
-                        {"type": "text", "text": content},
-                        {"type": "feature", "feature": "Advanced middleware processing active"}
-                    ]
-            
-            return {
-                "response": response_text,
-                "content_blocks": content_blocks,
-                "structured_output": {
-                    "agent_type": "advanced",
-                    "features_used": ["custom_middleware", "enhanced_tools", "context_awareness"],
-                    "session_id": session_id,
-                    "user_tier": user_context.get("tier", "basic") if user_context else "basic"
-                },
-                "cart_state": result.get("cart_items", []),
-                "total": result.get("current_total", 0.0),
-                "agent_features": ["custom_middleware", "enhanced_tools", "context_awareness"]
-            }
+        
+        return {
+            "response": response_text,
+            "content_blocks": content_blocks,
+            "structured_output": {
+                "agent_type": "advanced",
+                "features_used": ["custom_middleware", "enhanced_tools", "context_awareness"],
+                "session_id": session_id,
+                "user_tier": user_context.get("tier", "basic") if user_context else "basic"
+            },
+            "cart_state": cart.order_items,
+            "total": cart.total,
+            "agent_features": ["custom_middleware", "enhanced_tools", "context_awareness"]
+        }
+    
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        error_msg = f"Advanced barista service temporarily unavailable. Falling back to basic service. Error: {str(e)}"
+        return {
+            "response": error_msg,
+            "content_blocks": [
+                {"type": "text", "text": error_msg},
+                {"type": "error", "error": "Advanced features unavailable"}
+            ],
+            "structured_output": {"agent_type": "advanced", "status": "error"},
+            "cart_state": [],
+            "total": 0.0,
+            "agent_features": ["error_handling"]
+        }
+    
+    async def process_message(self, message: str, session_id: str = "default", user_context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Process message with advanced features."""
+        try:
+            config = {"configurable": {"thread_id": f"advanced:{session_id}"}}
+            result = await self.agent.ainvoke(self._initial_state(message, user_context), config=config)
+            return self._build_result(result, session_id, await self._priced_cart(session_id), user_context)
             
         except Exception as e:
-            error_msg = f"Advanced barista service temporarily unavailable. Falling back to basic service. Error: {str(e)}"
-            return {
-                "response": error_msg,
-                "content_blocks": [
-                    {"type": "text", "text": error_msg},
-                    {"type": "error", "error": "Advanced features unavailable"}
-                ],
-                "structured_output": {"agent_type": "advanced", "status": "error"},
-                "cart_state": [],
-                "total": 0.0,
-                "agent_features": ["error_handling"]
-            }
+            return self._error_result(e)
+    
+    async def stream_message(self, message: str, session_id: str = "default", user_context: Dict[str, Any] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream token, reasoning and tool frames, ending with a "final" frame."""
+        try:
+            config = {"configurable": {"thread_id": f"advanced:{session_id}"}}
+            stream = AgentEventStream(self.agent, self._initial_state(message, user_context), config)
+            async for frame in stream.frames():
+                yield frame
+            result = self._build_result(stream.final_state, session_id, await self._priced_cart(session_id), user_context)
+        except Exception as e:
+            result = self._error_result(e)
+        yield {"type": "final", **result}
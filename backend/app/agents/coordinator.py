@@ -1,5 +1,6 @@
-from typing import Dict, Any
+from typing import Any, Dict
 from langchain_core.messages import HumanMessage, AIMessage
+from app.core.cart_store import CartState, cart_store
 from app.graph.agent_workflow import agent_workflow, AgentCafeState
 from app.memory.vector_memory import vector_memory
 from app.tools.langchain_tools import AVAILABLE_TOOLS
@@ -9,32 +10,31 @@ class CoordinatorAgent:
         self.workflow = agent_workflow
         self.memory = vector_memory
         self.tools = AVAILABLE_TOOLS
-        # Shared cart storage
-        self.cart_storage = {}
     
     async def process_message(self, message: str, session_id: str = "default") -> str:
         """Process message using LangChain agents with LangGraph workflow"""
         try:
+            # Carts live in the shared cart store; remember the version we started from
+            cart = await cart_store.get(session_id)
+            
             # Initialize state
             state = AgentCafeState({
                 "session_id": session_id,
                 "messages": [HumanMessage(content=message)],
-                "cart": self.cart_storage.get(session_id, {}),
+                "cart": cart.items,
                 "current_intent": "",
                 "menu_context": [],
                 "total_amount": 0.0
             })
             
             # Configuration for checkpointer with thread_id
-            config = {"configurable": {"thread_id": session_id}}
+            config = {"configurable": {"thread_id": f"coordinator:{session_id}"}}
             
             # Run the agent workflow with proper config
             result = await self.workflow.ainvoke(state, config=config)
             
-            # Update cart storage
-            if session_id not in self.cart_storage:
-                self.cart_storage[session_id] = {}
-            self.cart_storage[session_id].update(result.get("cart", {}))
+            # Apply only this turn's changes, so concurrent updates to the cart are kept
+            await self._apply_cart_changes(session_id, cart.items, result.get("cart", {}))
             
             # Get AI response
             if result["messages"] and len(result["messages"]) > 1:
@@ -43,7 +43,7 @@ class CoordinatorAgent:
                 ai_response = "I'm here to help! Ask me about our menu or place an order."
             
             # Save to vector memory
-            self.memory.save_context(
+            await self.memory.asave_context(
                 inputs={"session_id": session_id, "user_message": message},
                 outputs={"response": ai_response}
             )
@@ -54,19 +54,35 @@ class CoordinatorAgent:
             error_response = f"I'm having some technical difficulties with the LangChain agents. Please try again. Error: {str(e)}"
             
             # Still save to memory
-            self.memory.save_context(
+            await self.memory.asave_context(
                 inputs={"session_id": session_id, "user_message": message},
                 outputs={"response": error_response}
             )
             
             return error_response
     
+    async def _apply_cart_changes(self, session_id: str, before: Dict[str, int], after: Dict[Any, int]) -> None:
+        after = {str(key): quantity for key, quantity in after.items()}
+        delta = {key: after.get(key, 0) - before.get(key, 0) for key in set(before) | set(after)}
+        delta = {key: change for key, change in delta.items() if change}
+        if not delta:
+            return
+        
+        def mutate(state: CartState) -> None:
+            for key, change in delta.items():
+                quantity = state.items.get(key, 0) + change
+                if quantity > 0:
+                    state.items[key] = quantity
+                else:
+                    state.items.pop(key, None)
+        
+        await cart_store.update(session_id, mutate)
+    
     def get_session_stats(self, session_id: str) -> Dict[str, Any]:
         """Get session statistics from vector memory"""
         return self.memory.get_session_summary(session_id)
     
-    def clear_session(self, session_id: str) -> None:
+    async def clear_session(self, session_id: str) -> None:
         """Clear session data"""
         self.memory.clear_session(session_id)
-        if session_id in self.cart_storage:
-            del self.cart_storage[session_id]
+        await cart_store.clear(session_id)
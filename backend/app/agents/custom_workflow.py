@@ -1,6 +1,12 @@
-from typing import Dict, Any, Literal, TypedDict
+from typing import AsyncIterator, Dict, Any, Literal, TypedDict
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import InMemorySaver
+from app.agents.streaming import AgentEventStream
+from app.core.cart_store import cart_store
+from app.core.catalog import menu_catalog
+from app.core.intents import IntentClassifier
+from app.core.orders import confirm_cart
+from app.core.pricing import price_cart
+from app.memory.checkpointer import checkpointer
 from langchain_aws import ChatBedrock
 from langchain.tools import tool
 import json
@@ -15,28 +21,29 @@ class WorkflowState(TypedDict):
     order_ready: bool
     session_id: str
 
+# Checked in order; the first rule with a matching phrase wins
+WORKFLOW_INTENTS = IntentClassifier("custom_workflow", [
+    ("browse_menu", ["menu*", "what", "available", "option*"], 0.9),
+    ("place_order", ["add", "adding", "order*", "want*", "get"], 0.8),
+    ("view_cart", ["cart", "total", "summary"], 0.9),
+    ("confirm_order", ["confirm*", "yes", "proceed*", "checkout"], 0.9),
+], default="general", default_confidence=0.5)
+
 # Tools for workflow
 @tool
-def analyze_intent(query: str) -> dict:
+async def analyze_intent(query: str) -> dict:
     """Analyze user intent from query."""
-    query_lower = query.lower()
-    
-    if any(word in query_lower for word in ["menu", "what", "available", "options"]):
-        return {"intent": "browse_menu", "confidence": 0.9}
-    elif any(word in query_lower for word in ["add", "order", "want", "get", "latte", "espresso", "americano", "cappuccino", "mocha"]):
+    intent = WORKFLOW_INTENTS.classify(query)
+    # Naming a menu item is an order unless the message asks about the menu
+    if intent.name not in ("browse_menu", "place_order") and (await menu_catalog.get()).find_in_text(query):
         return {"intent": "place_order", "confidence": 0.8}
-    elif any(word in query_lower for word in ["cart", "total", "summary"]):
-        return {"intent": "view_cart", "confidence": 0.9}
-    elif any(word in query_lower for word in ["confirm", "yes", "proceed", "checkout"]):
-        return {"intent": "confirm_order", "confidence": 0.9}
-    else:
-        return {"intent": "general", "confidence": 0.5}
+    return {"intent": intent.name, "confidence": intent.confidence}
 
 # Workflow Nodes
-def intent_analysis_node(state: WorkflowState) -> WorkflowState:
+async def intent_analysis_node(state: WorkflowState) -> WorkflowState:
     """Analyze user intent."""
     user_message = state["messages"][-1]["content"]
-    analysis = analyze_intent.invoke(user_message)
+    analysis = await analyze_intent.ainvoke(user_message)
     
     return {
         **state,
@@ -45,18 +52,12 @@ def intent_analysis_node(state: WorkflowState) -> WorkflowState:
         "needs_clarification": analysis["confidence"] < 0.7
     }
 
-def menu_node(state: WorkflowState) -> WorkflowState:
+async def menu_node(state: WorkflowState) -> WorkflowState:
     """Handle menu requests."""
-    menu_items = [
-        {"name": "Espresso", "price": 2.50},
-        {"name": "Americano", "price": 3.00},
-        {"name": "Latte", "price": 4.50},
-        {"name": "Cappuccino", "price": 4.00},
-        {"name": "Mocha", "price": 5.00}
-    ]
+    menu = await menu_catalog.get()
     
     response = "🔥 **Custom StateGraph Menu** 🔥\n\n" + "\n".join([
-        f"• {item['name']} - ${item['price']:.2f}" for item in menu_items
+        f"• {item.name} - ${item.price:.2f}" for item in menu.items
     ]) + "\n\n✨ *Powered by conditional routing & subgraphs*"
     
     return {
@@ -64,58 +65,49 @@ def menu_node(state: WorkflowState) -> WorkflowState:
         "messages": state["messages"] + [{"role": "assistant", "content": response}]
     }
 
-def order_node(state: WorkflowState) -> WorkflowState:
+async def order_node(state: WorkflowState) -> WorkflowState:
     """Handle order placement."""
     user_message = state["messages"][-1]["content"]
     
     # Enhanced order parsing with better item detection
-    items = []
-    menu_items = {
-        "latte": {"name": "Latte", "price": 4.50},
-        "espresso": {"name": "Espresso", "price": 2.50},
-        "americano": {"name": "Americano", "price": 3.00},
-        "cappuccino": {"name": "Cappuccino", "price": 4.00},
-        "mocha": {"name": "Mocha", "price": 5.00}
-    }
+    items = (await menu_catalog.get()).find_in_text(user_message)
     
-    for item_key, item_data in menu_items.items():
-        if item_key in user_message.lower():
-            items.append({**item_data, "quantity": 1})
-    
-    # Add to cart
-    current_cart = state.get("cart", [])
-    current_cart.extend(items)
+    # Add to the shared cart
+    cart = await cart_store.get(state["session_id"])
+    for item in items:
+        cart = await cart_store.add(state["session_id"], item.id)
+    priced = await price_cart(cart.items)
     
     if items:
-        item_names = [item["name"] for item in items]
-        total = sum(item["price"] * item["quantity"] for item in current_cart)
-        response = f"🛒 **Advanced Order System** 🛒\n\nAdded {', '.join(item_names)} to your cart!\n\nCurrent cart: {len(current_cart)} items (${total:.2f})\n\n✨ *Using custom StateGraph routing*"
+        item_names = [item.name for item in items]
+        response = f"🛒 **Advanced Order System** 🛒\n\nAdded {', '.join(item_names)} to your cart!\n\nCurrent cart: {sum(cart.items.values())} items (${priced.subtotal:.2f})\n\n✨ *Using custom StateGraph routing*"
     else:
         response = "🛒 **Advanced Order System** 🛒\n\nI'd be happy to help you place an order! What would you like to add to your cart?\n\n✨ *Using custom StateGraph routing*"
     
     return {
         **state,
-        "cart": current_cart,
+        "cart": priced.order_items,
         "messages": state["messages"] + [{"role": "assistant", "content": response}]
     }
 
-def cart_node(state: WorkflowState) -> WorkflowState:
+async def cart_node(state: WorkflowState) -> WorkflowState:
     """Handle cart viewing."""
-    if not state["cart"]:
+    priced = await price_cart((await cart_store.get(state["session_id"])).items)
+    if not priced.lines:
         response = "🛒 Your cart is currently empty.\n\n💡 Would you like to see our menu?\n\n✨ *StateGraph conditional logic active*"
     else:
-        total = sum(item["price"] * item["quantity"] for item in state["cart"])
         response = f"🛒 **Your Cart** (StateGraph managed):\n" + "\n".join([
-            f"• {item['name']} x{item['quantity']} - ${item['price'] * item['quantity']:.2f}"
-            for item in state["cart"]
-        ]) + f"\n\n💰 Total: ${total:.2f}"
+            f"• {line.name} x{line.quantity} - ${line.line_total:.2f}"
+            for line in priced.lines
+        ]) + f"\n\n💰 Total: ${priced.subtotal:.2f}"
     
     return {
         **state,
+        "cart": priced.order_items,
         "messages": state["messages"] + [{"role": "assistant", "content": response}]
     }
 
-def clarification_node(state: WorkflowState) -> WorkflowState:
+async def clarification_node(state: WorkflowState) -> WorkflowState:
     """Handle unclear requests."""
     response = """🤔 **Smart Clarification System** 🤔
 
@@ -134,27 +126,26 @@ How can I help you?"""
         "needs_clarification": False
     }
 
-def confirm_order_node(state: WorkflowState) -> WorkflowState:
+async def confirm_order_node(state: WorkflowState) -> WorkflowState:
     """Handle order confirmation."""
-    if not state["cart"]:
+    order = await confirm_cart(state["session_id"])
+    if order is None:
         response = "🛒 Your cart is empty! Please add some items first.\n\n✨ *StateGraph order validation*"
     else:
-        total = sum(item["price"] * item["quantity"] for item in state["cart"])
-        response = f"""✅ **Order Confirmed!** ✅
+        response = f"""✅ **Order #{order.order_id} Confirmed!** ✅
 
 Your order:
 """ + "\n".join([
-            f"• {item['name']} x{item['quantity']} - ${item['price'] * item['quantity']:.2f}"
-            for item in state["cart"]
+            f"• {line.name} x{line.quantity} - ${line.line_total:.2f}"
+            for line in order.priced.lines
         ]) + f"""
 
-💰 Total: ${total:.2f}
+💰 Total: ${order.priced.total:.2f}
 
 🎉 Thank you! Your order will be ready in 5-10 minutes.
 
 ✨ *Powered by StateGraph workflow*"""
         
-        # Clear cart after confirmation
         state = {**state, "cart": [], "order_ready": True}
     
     return {
@@ -179,7 +170,8 @@ def route_by_intent(state: WorkflowState) -> Literal["menu", "order", "cart", "c
 
 class CustomWorkflowAgent:
     def __init__(self):
-        self.checkpointer = InMemorySaver()
+        # Shared checkpointer so conversation history survives across requests and replicas
+        self.checkpointer = checkpointer
         
         # Create main workflow
         self.workflow = self._create_main_workflow()
@@ -211,47 +203,64 @@ class CustomWorkflowAgent:
         
         return workflow.compile(checkpointer=self.checkpointer)
     
+    def _initial_state(self, message: str, session_id: str) -> Dict[str, Any]:
+        return {
+            "messages": [{"role": "user", "content": message}],
+            "intent": "",
+            "cart": [],
+            "confidence": 0.0,
+            "needs_clarification": False,
+            "order_ready": False,
+            "session_id": session_id
+        }
+    
+    def _build_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        # Extract response
+        response_message = result["messages"][-1]["content"]
+        
+        return {
+            "response": response_message,
+            "content_blocks": [
+                {"type": "text", "text": response_message},
+                {"type": "workflow", "workflow": "Custom StateGraph with conditional edges"}
+            ],
+            "intent": result["intent"],
+            "confidence": result["confidence"],
+            "workflow_type": "custom_stategraph",
+            "features_used": ["conditional_edges", "custom_routing", "state_management"]
+        }
+    
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        error_msg = f"Custom workflow error: {str(e)}"
+        return {
+            "response": error_msg,
+            "content_blocks": [{"type": "text", "text": error_msg}],
+            "intent": "error",
+            "confidence": 0.0,
+            "workflow_type": "custom_stategraph",
+            "features_used": ["error_handling"]
+        }
+    
     async def process_message(self, message: str, session_id: str = "default") -> Dict[str, Any]:
         """Process message using custom workflow."""
         try:
-            config = {"configurable": {"thread_id": session_id}}
-            
-            # Initialize state
-            initial_state = {
-                "messages": [{"role": "user", "content": message}],
-                "intent": "",
-                "cart": [],
-                "confidence": 0.0,
-                "needs_clarification": False,
-                "order_ready": False,
-                "session_id": session_id
-            }
+            config = {"configurable": {"thread_id": f"workflow:{session_id}"}}
             
             # Run workflow
-            result = self.workflow.invoke(initial_state, config=config)
-            
-            # Extract response
-            response_message = result["messages"][-1]["content"]
-            
-            return {
-                "response": response_message,
-                "content_blocks": [
-                    {"type": "text", "text": response_message},
-                    {"type": "workflow", "workflow": "Custom StateGraph with conditional edges"}
-                ],
-                "intent": result["intent"],
-                "confidence": result["confidence"],
-                "workflow_type": "custom_stategraph",
-                "features_used": ["conditional_edges", "custom_routing", "state_management"]
-            }
+            result = await self.workflow.ainvoke(self._initial_state(message, session_id), config=config)
+            return self._build_result(result)
             
         except Exception as e:
-            error_msg = f"Custom workflow error: {str(e)}"
-            return {
-                "response": error_msg,
-                "content_blocks": [{"type": "text", "text": error_msg}],
-                "intent": "error",
-                "confidence": 0.0,
-                "workflow_type": "custom_stategraph",
-                "features_used": ["error_handling"]
-            }
+            return self._error_result(e)
+    
+    async def stream_message(self, message: str, session_id: str = "default") -> AsyncIterator[Dict[str, Any]]:
+        """Stream tool frames while the workflow runs, ending with a "final" frame."""
+        try:
+            config = {"configurable": {"thread_id": f"workflow:{session_id}"}}
+            stream = AgentEventStream(self.workflow, self._initial_state(message, session_id), config)
+            async for frame in stream.frames():
+                yield frame
+            result = self._build_result(stream.final_state)
+        except Exception as e:
+            result = self._error_result(e)
+        yield {"type": "final", **result}
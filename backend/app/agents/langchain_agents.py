@@ -1,7 +1,7 @@
 from langchain.tools import tool
 from langchain_core.messages import HumanMessage, AIMessage
 from app.tools.langchain_tools import get_menu_items, get_item_recommendations
-from app.core.bedrock import get_haiku_response
+from app.core.bedrock import generate
 import asyncio
 
 # Define tools using LangChain's @tool decorator
@@ -88,19 +88,26 @@ class SimpleAgent:
                     
                     # Format response with tool result
                     prompt = f"{self.system_prompt}\n\nUser: {user_input}\n\nTool Result: {result}\n\nProvide a helpful response:"
-                    response = get_haiku_response(prompt)
+                    response = await self._generate(prompt)
                 except Exception as e:
                     response = f"I had trouble using that tool. {str(e)}"
             else:
                 # Direct AI response
                 prompt = f"{self.system_prompt}\n\nUser: {user_input}\n\nProvide a helpful response:"
-                response = get_haiku_response(prompt)
+                response = await self._generate(prompt)
             
             return {"output": response}
             
         except Exception as e:
             return {"output": f"I'm having trouble processing your request. Error: {str(e)}"}
     
+    async def _generate(self, prompt):
+        """Generate a reply, with a friendly message when the model call fails"""
+        llm_response = await generate(prompt)
+        if not llm_response.ok:
+            return "I'm having trouble connecting to the AI service. Please try again in a moment."
+        return llm_response.text
+    
     def _should_use_tool(self, tool_name, user_input):
         """Determine if a tool should be used based on user input"""
         keywords = {
@@ -1,6 +1,6 @@
 from typing import List, Dict
-from app.core.bedrock import get_haiku_response
-from app.models.menu import MenuItem
+from app.core.bedrock import generate
+from app.core.catalog import menu_catalog
 
 class MenuAgent:
     def __init__(self):
@@ -22,12 +22,9 @@ Customer message: "{message}"
 Respond naturally and helpfully about our menu items. If they ask about the menu, show items with prices. If they ask about specific categories like coffee or pastries, filter accordingly. Be friendly and conversational."""
 
             # Try AI first, fallback to rules
-            try:
-                ai_response = get_haiku_response(prompt)
-                if "error" not in ai_response.lower():
-                    return ai_response
-            except:
-                pass
+            llm_response = await generate(prompt)
+            if llm_response.ok:
+                return llm_response.text
             
             # Fallback to rule-based logic
             if "menu" in message.lower():
@@ -49,9 +46,6 @@ Respond naturally and helpfully about our menu items. If they ask about the menu
             return "I'm having trouble accessing the menu right now. Please try again."
     
     async def _get_menu_items(self, category: str = None) -> List[Dict]:
-        query = MenuItem.all()
-        if category:
-            query = query.filter(category__icontains=category)
-        items = await query.filter(available=True)
-        return [{"id": item.id, "name": item.name, "description": item.description, 
-                 "price": float(item.price), "category": item.category} for item in items]
+        menu = await menu_catalog.get()
+        items = menu.in_category(category) if category else menu.items
+        return [item.to_dict() for item in items]
@@ -1,56 +1,61 @@
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, Optional
 from langchain.agents import create_agent
 from langchain.agents.middleware import SummarizationMiddleware, before_model
-from langchain.tools import tool
+from langchain.tools import ToolRuntime, tool
 from langchain_aws import ChatBedrock
-from langgraph.checkpoint.memory import InMemorySaver
-from langchain.messages import RemoveMessage
+from app.agents.streaming import AgentEventStream
+from app.core.cart_store import cart_store, session_id_from_config
+from app.core.catalog import menu_catalog
+from app.core.commands import command_parser, execute_command
+from app.core.orders import cart_summary, confirm_order
+from app.core.response_cache import response_cache
+from app.memory.checkpointer import checkpointer
+from langchain.messages import AIMessage, HumanMessage, RemoveMessage
 from langgraph.graph.message import REMOVE_ALL_MESSAGES
 import json
 
 # Define tools as standalone functions
 @tool
-def get_menu_tool() -> str:
+async def get_menu_tool() -> str:
     """Get all available menu items."""
     try:
-        menu_items = [
-            {"name": "Espresso", "price": 2.50, "description": "Rich, bold shot"},
-            {"name": "Americano", "price": 3.00, "description": "Espresso with hot water"},
-            {"name": "Latte", "price": 4.50, "description": "Espresso with steamed milk"},
-            {"name": "Cappuccino", "price": 4.00, "description": "Equal parts espresso, milk, foam"},
-            {"name": "Mocha", "price": 5.00, "description": "Espresso with chocolate"},
-            {"name": "Croissant", "price": 3.50, "description": "Buttery French pastry"},
-            {"name": "Blueberry Muffin", "price": 3.00, "description": "Fresh baked muffin"}
-        ]
+        menu = await menu_catalog.get()
         # Return formatted text instead of JSON for better display
-        menu_text = "☕ Our Menu:\n\n"
-        for item in menu_items:
-            menu_text += f"• {item['name']} - ${item['price']:.2f}\n"
-            menu_text += f"  {item['description']}\n\n"
-        return menu_text
+        return "☕ Our Menu:\n\n" + menu.menu_display
     except Exception as e:
         return f"Error getting menu: {str(e)}"
 
 @tool
-def add_to_cart_tool(item_name: str, quantity: int = 1) -> str:
+async def add_to_cart_tool(item_name: str, quantity: int = 1, runtime: ToolRuntime = None) -> str:
     """Add items to the customer's cart."""
-    return f"Added {quantity}x {item_name} to your cart!"
+    item = (await menu_catalog.get()).lookup(item_name)
+    if not item:
+        return f"Sorry, we don't have {item_name} on the menu."
+    await cart_store.add(session_id_from_config(runtime.config), item.id, quantity)
+    return f"Added {quantity}x {item.name} to your cart!"
 
 @tool
-def show_cart_tool() -> str:
+async def show_cart_tool(runtime: ToolRuntime = None) -> str:
     """Show current cart contents."""
-    return "Your cart: 1x Latte ($4.50), Total: $4.50"
+    return await cart_summary(session_id_from_config(runtime.config))
 
 @tool
-def confirm_order_tool() -> str:
+async def confirm_order_tool(runtime: ToolRuntime = None) -> str:
     """Confirm and process the order."""
-    return """Order confirmed! ☕
-    
-Your order:
-- 1x Latte - $4.50
-Total: $4.50
+    return await confirm_order(session_id_from_config(runtime.config))
+
+# Tools whose output only depends on the menu, safe to replay from the response cache
+CACHE_SAFE_TOOLS = {"get_menu_tool"}
 
-Your order will be ready in 5-10 minutes. Thank you for choosing Coffee and AI!"""
+def cacheable_turn(messages) -> bool:
+    """True for a conversation's first turn that only read the menu, so its answer stands on its own."""
+    if sum(1 for message in messages if isinstance(message, HumanMessage)) != 1:
+        return False
+    return all(
+        call["name"] in CACHE_SAFE_TOOLS
+        for message in messages if isinstance(message, AIMessage)
+        for call in message.tool_calls
+    )
 
 # Custom middleware for message trimming
 @before_model
@@ -74,10 +79,11 @@ def trim_messages_middleware(state, runtime):
 
 class ModernBaristaAgent:
     def __init__(self, model_provider: str = "bedrock", model_name: str = None):
-        self.checkpointer = InMemorySaver()
-        self.cart_storage = {}
+        # Shared checkpointer so conversation history survives across requests and replicas
+        self.checkpointer = checkpointer
         self.model_provider = model_provider
         self.model_name = model_name
+        self.cache_model = f"{model_provider}:{model_name or 'default'}"
         
         # Initialize model using factory
         from app.core.model_factory import get_model
@@ -110,54 +116,112 @@ class ModernBaristaAgent:
             checkpointer=self.checkpointer
         )
     
+    def _build_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn the final graph state into the response payload."""
+        # Extract the last AI message
+        last_message = result["messages"][-1]
+        
+        # Get the raw content
+        content = last_message.content
+        
+        # Get content_blocks - LangChain v1 feature
+        content_blocks = getattr(last_message, 'content_blocks', None)
+        
+        # Parse content to separate thinking from response
+        response_text = content
+        
+        # Check if content has thinking tags
+        if '<thinking>' in content and '</thinking>' in content:
+            # Extract thinking and response parts
+            thinking_start = content.find('<thinking>')
+            thinking_end = content.find('</thinking>') + len('</thinking>')
+            thinking_text = content[thinking_start + len('<thinking>'):thinking_end - len('</thinking>')]
+            response_text = content[thinking_end:].strip()
+            
+            # Create structured content blocks
+            content_blocks = [
+                {"type": "reasoning", "reasoning": thinking_text},
+                {"type": "text", "text": response_text}
+            ]
+        else:
+            # If no content_blocks, create default text block
+            if not content_blocks:
+                content_blocks = [{"type": "text", "text": content}]
+        
+        return {
+            "response": response_text,
+            "content_blocks": content_blocks
+        }
+    
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        error_msg = f"I'm having some technical difficulties. Please try again. Error: {str(e)}"
+        return {
+            "response": error_msg,
+            "content_blocks": [{"type": "text", "text": error_msg}]
+        }
+    
+    async def _record_exchange(self, config: Dict[str, Any], message: str, response: str) -> None:
+        """Add a turn answered without the model to the thread, as if the model had replied."""
+        await self.agent.aupdate_state(
+            config,
+            {"messages": [HumanMessage(content=message), AIMessage(content=response)]},
+            as_node="model"
+        )
+    
+    async def _local_result(self, message: str, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Answer confident cart commands and cached questions without calling the model."""
+        command = command_parser.parse(message, await menu_catalog.get())
+        if command.confident:
+            response = await execute_command(command, session_id_from_config(config))
+            result = {"response": response, "content_blocks": [{"type": "text", "text": response}]}
+        else:
+            result = await response_cache.get("modern", self.cache_model, message)
+        if result is not None:
+            await self._record_exchange(config, message, result["response"])
+        return result
+    
+    async def _cache_result(self, message: str, state: Dict[str, Any], result: Dict[str, Any]) -> None:
+        if cacheable_turn(state["messages"]):
+            await response_cache.put("modern", self.cache_model, message, result)
+    
     async def process_message(self, message: str, session_id: str = "default") -> Dict[str, Any]:
         """Process message using modern LangChain v1 agent with content_blocks support."""
         try:
-            config = {"configurable": {"thread_id": session_id}}
+            config = {"configurable": {"thread_id": f"modern:{session_id}"}}
+            
+            local = await self._local_result(message, config)
+            if local is not None:
+                return local
             
-            result = self.agent.invoke(
+            result = await self.agent.ainvoke(
                 {"messages": [{"role": "user", "content": message}]},
                 config=config
             )
+            payload = self._build_result(result)
+            await self._cache_result(message, result, payload)
+            return payload
             
-            # Extract the last AI message
-            last_message = result["messages"][-1]
-            
-            # Get the raw content
-            content = last_message.content
-            
-            # Get content_blocks - LangChain v1 feature
-            content_blocks = getattr(last_message, 'content_blocks', None)
-            
-            # Parse content to separate thinking from response
-            response_text = content
-            
-            # Check if content has thinking tags
-            if '<thinking>' in content and '</thinking>' in content:
-                # Extract thinking and response parts
-                thinking_start = content.find('<thinking>')
-                thinking_end = content.find('</thinking>') + len('</thinking>')
-                thinking_text = content[thinking_start + len('<thinking>'):thinking_end - len('</thinking>')]
-                response_text = content[thinking_end:].strip()
-                
-                # Create structured content blocks
-                content_blocks = [
-                    {"type": "reasoning", "reasoning": thinking_text},
-                    {"type": "text", "text": response_text}
-                ]
-            else:
-                # If no content_blocks, create default text block
-                if not content_blocks:
-                    content_blocks = [{"type": "text", "text": content}]
-            
-            return {
-                "response": response_text,
-                "content_blocks": content_blocks
-            }
-            
         except Exception as e:
-            error_msg = f"I'm having some technical difficulties. Please try again. Error: {str(e)}"
-            return {
-                "response": error_msg,
-                "content_blocks": [{"type": "text", "text": error_msg}]
-            }
+            return self._error_result(e)
+    
+    async def stream_message(self, message: str, session_id: str = "default") -> AsyncIterator[Dict[str, Any]]:
+        """Stream token, reasoning and tool frames, ending with a "final" frame."""
+        try:
+            config = {"configurable": {"thread_id": f"modern:{session_id}"}}
+            local = await self._local_result(message, config)
+            if local is not None:
+                yield {"type": "token", "text": local["response"]}
+                yield {"type": "final", **local}
+                return
+            stream = AgentEventStream(
+                self.agent,
+                {"messages": [{"role": "user", "content": message}]},
+                config
+            )
+            async for frame in stream.frames():
+                yield frame
+            result = self._build_result(stream.final_state)
+            await self._cache_result(message, stream.final_state, result)
+        except Exception as e:
+            result = self._error_result(e)
+        yield {"type": "final", **result}
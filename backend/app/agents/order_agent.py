@@ -1,6 +1,9 @@
 from typing import Dict, List
-from app.models.menu import MenuItem
-from app.core.bedrock import get_haiku_response
+from app.core.cart_store import cart_store
+from app.core.catalog import menu_catalog
+from app.core.commands import command_parser, execute_command
+from app.core.pricing import price_cart
+from app.core.bedrock import generate
 import re
 
 class OrderAgent:
@@ -9,12 +12,16 @@ class OrderAgent:
     
     async def process(self, message: str, context: Dict) -> str:
         session_id = context.get("session_id", "default")
-        cart_storage = context.get("cart_storage", {})
         
         try:
             # Get menu for AI context
-            menu_items = await MenuItem.filter(available=True)
-            menu_context = "\n".join([f"- {item.name}: ${float(item.price):.2f}" for item in menu_items])
+            menu = await menu_catalog.get()
+            menu_context = menu.price_prompt
+            
+            # Unambiguous commands do not need the model
+            command = command_parser.parse(message, menu)
+            if command.confident and command.verb in ("add", "remove", "show_cart"):
+                return await execute_command(command, session_id)
             
             # Use AI for intent detection and item extraction
             prompt = f"""You are a barista assistant handling orders. Available items:
@@ -32,49 +39,44 @@ Analyze the message and respond with ONE of these actions:
 Only respond with the action, nothing else."""
 
             try:
-                ai_response = get_haiku_response(prompt)
+                llm_response = await generate(prompt, max_tokens=100)
+                ai_response = llm_response.text.strip() if llm_response.ok else ""
                 
                 if ai_response.startswith("ADD:"):
                     items_to_add = ai_response.replace("ADD:", "").strip().split(",")
-                    return await self._handle_add_to_cart_ai(items_to_add, session_id, cart_storage)
+                    return await self._handle_add_to_cart_ai(items_to_add, session_id)
                 elif ai_response.startswith("SHOW_CART"):
-                    return await self._show_cart(session_id, cart_storage)
+                    return await self._show_cart(session_id)
                 elif ai_response.startswith("REMOVE:"):
                     items_to_remove = ai_response.replace("REMOVE:", "").strip().split(",")
-                    return await self._handle_remove_from_cart_ai(items_to_remove, session_id, cart_storage)
+                    return await self._handle_remove_from_cart_ai(items_to_remove, session_id)
             except:
                 pass
             
             # Fallback to rule-based logic
             if any(word in message.lower() for word in ["add", "order", "get", "want"]):
-                return await self._handle_add_to_cart(message, session_id, cart_storage)
+                return await self._handle_add_to_cart(message, session_id)
             elif any(word in message.lower() for word in ["cart", "order", "total"]):
-                return await self._show_cart(session_id, cart_storage)
+                return await self._show_cart(session_id)
             elif any(word in message.lower() for word in ["remove", "delete", "cancel"]):
-                return await self._handle_remove_from_cart(message, session_id, cart_storage)
+                return await self._handle_remove_from_cart(message, session_id)
             else:
                 return "I can help you add items to your order! Try saying 'add a latte' or 'show my cart'."
                 
         except Exception as e:
             return "I'm having trouble with your order. Please try again."
     
-    async def _handle_add_to_cart_ai(self, items_to_add: List[str], session_id: str, cart_storage: Dict) -> str:
-        menu_items = await MenuItem.filter(available=True)
+    async def _handle_add_to_cart_ai(self, items_to_add: List[str], session_id: str) -> str:
+        menu = await menu_catalog.get()
         added_items = []
         
         for item_text in items_to_add:
             item_text = item_text.strip()
-            for item in menu_items:
+            for item in menu.items:
                 if item.name.lower() in item_text.lower():
-                    if session_id not in cart_storage:
-                        cart_storage[session_id] = {}
-                    
-                    if item.id in cart_storage[session_id]:
-                        cart_storage[session_id][item.id] += 1
-                    else:
-                        cart_storage[session_id][item.id] = 1
+                    await cart_store.add(session_id, item.id)
                     
-                    added_items.append(f"1x {item.name} (${float(item.price):.2f} each)")
+                    added_items.append(f"1x {item.name} (${item.price:.2f} each)")
                     break
         
         if added_items:
@@ -82,59 +84,51 @@ Only respond with the action, nothing else."""
         else:
             return "I couldn't find those items on our menu. Try asking 'show menu' to see what's available."
     
-    async def _handle_add_to_cart(self, message: str, session_id: str, cart_storage: Dict) -> str:
-        menu_items = await MenuItem.filter(available=True)
+    async def _handle_add_to_cart(self, message: str, session_id: str) -> str:
+        menu = await menu_catalog.get()
         added_items = []
         
-        for item in menu_items:
+        for item in menu.items:
             if item.name.lower() in message.lower():
                 quantity = 1
                 quantity_match = re.search(r'(\d+)\s*' + re.escape(item.name.lower()), message.lower())
                 if quantity_match:
                     quantity = int(quantity_match.group(1))
                 
-                if session_id not in cart_storage:
-                    cart_storage[session_id] = {}
-                
-                if item.id in cart_storage[session_id]:
-                    cart_storage[session_id][item.id] += quantity
-                else:
-                    cart_storage[session_id][item.id] = quantity
+                await cart_store.add(session_id, item.id, quantity)
                 
-                added_items.append(f"{quantity}x {item.name} (${float(item.price):.2f} each)")
+                added_items.append(f"{quantity}x {item.name} (${item.price:.2f} each)")
         
         if added_items:
             return f"Added to your order:\n• " + "\n• ".join(added_items) + "\n\nSay 'show cart' to see your total!"
         else:
             return "I couldn't find that item on our menu. Try asking 'show menu' to see what's available."
     
-    async def _show_cart(self, session_id: str, cart_storage: Dict) -> str:
-        if session_id not in cart_storage or not cart_storage[session_id]:
+    async def _show_cart(self, session_id: str) -> str:
+        cart = await cart_store.get(session_id)
+        if not cart.items:
             return "Your cart is empty. Add some items by saying something like 'add a latte'!"
         
-        cart = cart_storage[session_id]
-        total = 0
+        priced = await price_cart(cart.items)
         cart_display = "Your order:\n\n"
         
-        for item_id, quantity in cart.items():
-            item = await MenuItem.get(id=item_id)
-            item_total = float(item.price) * quantity
-            total += item_total
-            cart_display += f"• {quantity}x {item.name} - ${item_total:.2f}\n"
+        for line in priced.lines:
+            cart_display += f"• {line.quantity}x {line.name} - ${line.line_total:.2f}\n"
         
-        cart_display += f"\nTotal: ${total:.2f}\n\nSay 'confirm order' to place your order!"
+        cart_display += f"\nTotal: ${priced.subtotal:.2f}\n\nSay 'confirm order' to place your order!"
         return cart_display
     
-    async def _handle_remove_from_cart(self, message: str, session_id: str, cart_storage: Dict) -> str:
-        if session_id not in cart_storage:
+    async def _handle_remove_from_cart(self, message: str, session_id: str) -> str:
+        cart = await cart_store.get(session_id)
+        if not cart.items:
             return "Your cart is empty."
         
-        menu_items = await MenuItem.filter(available=True)
+        menu = await menu_catalog.get()
         removed_items = []
         
-        for item in menu_items:
-            if item.name.lower() in message.lower() and item.id in cart_storage[session_id]:
-                del cart_storage[session_id][item.id]
+        for item in menu.items:
+            if item.name.lower() in message.lower() and str(item.id) in cart.items:
+                await cart_store.remove(session_id, item.id)
                 removed_items.append(item.name)
         
         if removed_items:
@@ -142,18 +136,19 @@ Only respond with the action, nothing else."""
         else:
             return "I couldn't find that item in your cart."
     
-    async def _handle_remove_from_cart_ai(self, items_to_remove: List[str], session_id: str, cart_storage: Dict) -> str:
-        if session_id not in cart_storage:
+    async def _handle_remove_from_cart_ai(self, items_to_remove: List[str], session_id: str) -> str:
+        cart = await cart_store.get(session_id)
+        if not cart.items:
             return "Your cart is empty."
         
-        menu_items = await MenuItem.filter(available=True)
+        menu = await menu_catalog.get()
         removed_items = []
         
         for item_text in items_to_remove:
             item_text = item_text.strip()
-            for item in menu_items:
-                if item.name.lower() in item_text.lower() and item.id in cart_storage[session_id]:
-                    del cart_storage[session_id][item.id]
+            for item in menu.items:
+                if item.name.lower() in item_text.lower() and str(item.id) in cart.items:
+                    await cart_store.remove(session_id, item.id)
                     removed_items.append(item.name)
                     break
         
@@ -0,0 +1,136 @@
+"""
+Process-wide Agent Registry
+Builds each (agent_type, provider, model_name) agent once and shares it across requests
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Maximum number of distinct agent/model combinations kept alive per process
+AGENT_REGISTRY_SIZE = int(os.getenv("AGENT_REGISTRY_SIZE", "8"))
+
+# Agents built at startup, as comma separated "agent_type:provider:model_name" specs
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "modern:bedrock,advanced:bedrock,workflow,deepagents:bedrock")
+
+AGENT_TYPES = ("modern", "advanced", "workflow", "deepagents")
+
+AgentKey = Tuple[str, Optional[str], Optional[str]]
+
+
+def _build_agent(agent_type: str, model_provider: Optional[str], model_name: Optional[str]) -> Any:
+    """Construct a new agent instance (model client, tools and compiled graph)"""
+    if agent_type == "deepagents":
+        from app.agents.deep_coordinator import DeepCoordinatorAgent
+        return DeepCoordinatorAgent(model_provider=model_provider, model_name=model_name)
+    elif agent_type == "advanced":
+        from app.agents.advanced_agent import AdvancedBaristaAgent
+        return AdvancedBaristaAgent(model_provider=model_provider, model_name=model_name)
+    elif agent_type == "workflow":
+        from app.agents.custom_workflow import CustomWorkflowAgent
+        return CustomWorkflowAgent()
+    else:
+        from app.agents.modern_agent import ModernBaristaAgent
+        return ModernBaristaAgent(model_provider=model_provider, model_name=model_name)
+
+
+class AgentRegistry:
+    """LRU cache of long-lived agents keyed by (agent_type, provider, model_name)"""
+
+    def __init__(self, max_size: int = AGENT_REGISTRY_SIZE):
+        self.max_size = max(1, max_size)
+        self._agents: "OrderedDict[AgentKey, Any]" = OrderedDict()
+        self._locks: Dict[AgentKey, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(agent_type: str, model_provider: Optional[str] = None, model_name: Optional[str] = None) -> AgentKey:
+        """Normalize request parameters into a registry key"""
+        if agent_type not in AGENT_TYPES:
+            agent_type = "modern"
+        # The workflow agent is rule-based and does not depend on the model selection
+        if agent_type == "workflow":
+            return ("workflow", None, None)
+        return (agent_type, model_provider or "bedrock", model_name or None)
+
+    async def get(self, agent_type: str, model_provider: Optional[str] = None, model_name: Optional[str] = None) -> Any:
+        """Return the shared agent for this combination, building it on first use"""
+        key = self.make_key(agent_type, model_provider, model_name)
+
+        agent = self._agents.get(key)
+        if agent is not None:
+            self._agents.move_to_end(key)
+            self.hits += 1
+            return agent
+
+        # One build per key even when several requests miss at the same time
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            agent = self._agents.get(key)
+            if agent is not None:
+                self._agents.move_to_end(key)
+                self.hits += 1
+                return agent
+
+            self.misses += 1
+            # Model clients and graph compilation are synchronous, keep them off the event loop
+            agent = await asyncio.to_thread(_build_agent, *key)
+            self._agents[key] = agent
+
+            while len(self._agents) > self.max_size:
+                evicted_key, _ = self._agents.popitem(last=False)
+                self._locks.pop(evicted_key, None)
+                self.evictions += 1
+                print(f"[AGENT REGISTRY] Evicted agent {evicted_key}")
+
+        return agent
+
+    async def warm_up(self, specs: List[AgentKey]) -> None:
+        """Build agents ahead of the first request"""
+        for agent_type, model_provider, model_name in specs:
+            try:
+                await self.get(agent_type, model_provider, model_name)
+                print(f"[AGENT REGISTRY] Warmed up {agent_type} ({model_provider or 'default'}/{model_name or 'default'})")
+            except Exception as e:
+                print(f"[AGENT REGISTRY] Warm-up failed for {agent_type}: {str(e)}")
+
+    def clear(self) -> None:
+        """Drop all cached agents"""
+        self._agents.clear()
+        self._locks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Registry statistics for the metrics endpoint"""
+        return {
+            "size": len(self._agents),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "agents": [
+                {"agent_type": key[0], "provider": key[1], "model": key[2] or "default"}
+                for key in self._agents.keys()
+            ]
+        }
+
+
+def parse_warmup_specs(value: str = AGENT_WARMUP) -> List[AgentKey]:
+    """Parse "agent_type:provider:model_name" specs, provider and model are optional"""
+    specs = []
+    for spec in value.split(","):
+        spec = spec.strip()
+        if not spec:
+            continue
+        # Model IDs such as "amazon.nova-lite-v1:0" contain colons themselves
+        parts = spec.split(":", 2)
+        agent_type = parts[0]
+        model_provider = parts[1] if len(parts) > 1 and parts[1] else None
+        model_name = parts[2] if len(parts) > 2 and parts[2] else None
+        specs.append((agent_type, model_provider, model_name))
+    return specs
+
+
+# Global registry instance
+agent_registry = AgentRegistry()
@@ -0,0 +1,138 @@
+"""
+Streaming helpers
+Turn LangGraph astream_events output into small frames for websocket/SSE clients
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+
+class ThinkingStreamParser:
+    """Split streamed text into answer tokens and <thinking> reasoning.
+
+    Tags may arrive split across chunks, so a possible partial tag is held back
+    until the next chunk decides it.
+    """
+
+    OPEN_TAG = "<thinking>"
+    CLOSE_TAG = "</thinking>"
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_thinking = False
+
+    def _kind(self) -> str:
+        return "reasoning" if self._in_thinking else "token"
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Consume a chunk and return (kind, text) pieces ready to send"""
+        self._buffer += text
+        pieces = []
+        while self._buffer:
+            tag = self.CLOSE_TAG if self._in_thinking else self.OPEN_TAG
+            index = self._buffer.find(tag)
+            if index >= 0:
+                if index:
+                    pieces.append((self._kind(), self._buffer[:index]))
+                self._buffer = self._buffer[index + len(tag):]
+                self._in_thinking = not self._in_thinking
+                continue
+
+            # Hold back the longest suffix that could still become the tag
+            keep = 0
+            for size in range(min(len(tag) - 1, len(self._buffer)), 0, -1):
+                if tag.startswith(self._buffer[-size:]):
+                    keep = size
+                    break
+            ready = self._buffer[:len(self._buffer) - keep]
+            if ready:
+                pieces.append((self._kind(), ready))
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+        return pieces
+
+    def flush(self) -> List[Tuple[str, str]]:
+        """Return whatever is still buffered at the end of the stream"""
+        pieces = [(self._kind(), self._buffer)] if self._buffer else []
+        self._buffer = ""
+        return pieces
+
+
+def chunk_pieces(content: Any) -> List[Tuple[str, str]]:
+    """Extract (kind, text) pieces from a chat model chunk's content"""
+    if isinstance(content, str):
+        return [("text", content)] if content else []
+
+    pieces = []
+    for block in content or []:
+        if isinstance(block, str):
+            pieces.append(("text", block))
+            continue
+        if not isinstance(block, dict):
+            continue
+        block_type = block.get("type")
+        if block_type == "text" and block.get("text"):
+            pieces.append(("text", block["text"]))
+        elif block_type == "reasoning_content":
+            # Bedrock Converse reasoning blocks
+            reasoning = block.get("reasoning_content", {})
+            if reasoning.get("text"):
+                pieces.append(("reasoning", reasoning["text"]))
+        elif block_type in ("reasoning", "thinking"):
+            if block.get(block_type):
+                pieces.append(("reasoning", block[block_type]))
+    return pieces
+
+
+def _is_top_level_model(event: Dict[str, Any]) -> bool:
+    """True for the agent's own model node, not summarization or subagent calls"""
+    metadata = event.get("metadata", {})
+    return metadata.get("langgraph_node") == "model" and "|" not in metadata.get("langgraph_checkpoint_ns", "")
+
+
+def _tool_output(output: Any) -> str:
+    if hasattr(output, "content"):
+        return str(output.content)
+    return str(output)
+
+
+class AgentEventStream:
+    """Iterate over a graph run as frames, keeping the final graph state.
+
+    Frames are dicts with a "type" of "token", "reasoning", "tool_start" or "tool_end".
+    After iteration, ``final_state`` holds the graph output, just like ``ainvoke``.
+    """
+
+    def __init__(self, graph: Any, graph_input: Any, config: Optional[Dict[str, Any]] = None):
+        self.graph = graph
+        self.graph_input = graph_input
+        self.config = config
+        self.final_state: Any = None
+
+    async def frames(self) -> AsyncIterator[Dict[str, Any]]:
+        parser = ThinkingStreamParser()
+        async for event in self.graph.astream_events(self.graph_input, config=self.config, version="v2"):
+            kind = event["event"]
+
+            if kind == "on_chat_model_stream" and _is_top_level_model(event):
+                for piece_kind, text in chunk_pieces(event["data"]["chunk"].content):
+                    if piece_kind == "reasoning":
+                        yield {"type": "reasoning", "text": text}
+                        continue
+                    for frame_kind, frame_text in parser.feed(text):
+                        yield {"type": frame_kind, "text": frame_text}
+
+            elif kind == "on_chat_model_end" and _is_top_level_model(event):
+                # A model turn ended (for example before a tool call), release held-back text
+                for frame_kind, frame_text in parser.flush():
+                    yield {"type": frame_kind, "text": frame_text}
+
+            elif kind == "on_tool_start":
+                yield {"type": "tool_start", "tool": event["name"], "input": event["data"].get("input")}
+
+            elif kind == "on_tool_end":
+                yield {"type": "tool_end", "tool": event["name"], "output": _tool_output(event["data"].get("output"))}
+
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                self.final_state = event["data"].get("output")
+
+        for frame_kind, frame_text in parser.flush():
+            yield {"type": frame_kind, "text": frame_text}
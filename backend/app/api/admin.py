@@ -1,18 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
 from app.models.user import User, UserResponse
 from app.models.order import Order, OrderStatus
 from app.core.security import get_current_admin_user
 from app.core.email import (
-    send_order_ready_email,
     send_admin_notification,
     send_email
 )
-from app.core.slack import send_order_ready_notification
+from app.core.email_jobs import email_jobs, job_progress
+from app.core.email_templates import ANNOUNCEMENT, Markup
+from app.core.principals import principal_cache
+from app.core.pagination import fetch_page, page_response, page_size, parse_fields
+from app.core.admin_stats import admin_stats
+from app.models.email_job import EmailJob
+from app.core.orders import customer_display_name
+from app.core.outbox import outbox
 from pydantic import BaseModel, EmailStr
+import os
 
 router = APIRouter()
 
+# Users per page of the admin user listing, and the most a client may ask for
+ADMIN_USERS_PAGE_SIZE = int(os.getenv("ADMIN_USERS_PAGE_SIZE", "100"))
+ADMIN_USERS_MAX_PAGE_SIZE = int(os.getenv("ADMIN_USERS_MAX_PAGE_SIZE", "500"))
+
+USER_FIELDS = list(UserResponse.model_fields)
+
 class EmailNotification(BaseModel):
     to_email: EmailStr
     subject: str
@@ -29,13 +42,24 @@ class OrderStatusUpdate(BaseModel):
 
 @router.get("/users", response_model=List[UserResponse])
 async def get_all_users(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, description=f"Page size (default {ADMIN_USERS_PAGE_SIZE}, max {ADMIN_USERS_MAX_PAGE_SIZE})"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging; use cursor instead"),
     current_admin: User = Depends(get_current_admin_user)
 ):
-    """Get all users (admin only)"""
-    users = await User.all().offset(skip).limit(limit)
-    return [UserResponse.from_orm(user) for user in users]
+    """Get all users, oldest first (admin only)"""
+    queryset = User.all()
+    if skip and not cursor:
+        queryset = queryset.offset(skip)
+    rows, next_cursor = await fetch_page(
+        queryset,
+        cursor,
+        page_size(limit, ADMIN_USERS_PAGE_SIZE, ADMIN_USERS_MAX_PAGE_SIZE),
+        parse_fields(fields, USER_FIELDS),
+        descending=False
+    )
+    return page_response(rows, next_cursor)
 
 @router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user_by_id(
@@ -66,6 +90,8 @@ async def activate_user(
     
     user.is_active = True
     await user.save()
+    await principal_cache.invalidate(user.username)
+    admin_stats.notify()
     
     return {"message": f"User {user.username} activated successfully"}
 
@@ -89,7 +115,11 @@ async def deactivate_user(
         )
     
     user.is_active = False
+    # Revoke outstanding tokens; the user signs in again once reactivated
+    user.token_version += 1
     await user.save()
+    await principal_cache.invalidate(user.username)
+    admin_stats.notify()
     
     return {"message": f"User {user.username} deactivated successfully"}
 
@@ -99,39 +129,14 @@ async def send_email_to_user(
     current_admin: User = Depends(get_current_admin_user)
 ):
     """Send email to a specific user (admin only)"""
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: linear-gradient(135deg, #6B4423 0%, #8B6F47 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-            .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
-            .footer {{ text-align: center; margin-top: 30px; color: #666; font-size: 12px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>☕ Coffee and AI</h1>
-            </div>
-            <div class="content">
-                <p>{email_data.message}</p>
-            </div>
-            <div class="footer">
-                <p>© 2024 Coffee and AI. All rights reserved.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+    # The message is written by an admin and may contain HTML
+    email = ANNOUNCEMENT.render(subject=email_data.subject, message=Markup(email_data.message))
     
     success = await send_email(
         email_data.to_email,
-        email_data.subject,
-        html_content,
-        email_data.message
+        email.subject,
+        email.html,
+        email.text
     )
     
     if not success:
@@ -147,69 +152,47 @@ async def send_bulk_email(
     email_data: BulkEmailNotification,
     current_admin: User = Depends(get_current_admin_user)
 ):
-    """Send email to multiple users (admin only)"""
-    users = await User.filter(id__in=email_data.user_ids, is_active=True)
+    """Queue an email to multiple users; progress at GET /email/jobs/{job_id} (admin only)"""
+    # Rendered once for the whole job; recipients only differ in the To header
+    email = ANNOUNCEMENT.render(subject=email_data.subject, message=Markup(email_data.message))
+    
+    job = await email_jobs.create(
+        email_data.user_ids,
+        email.subject,
+        email.html,
+        email.text,
+        created_by=current_admin
+    )
     
-    if not users:
+    if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No active users found with provided IDs"
         )
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: linear-gradient(135deg, #6B4423 0%, #8B6F47 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-            .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
-            .footer {{ text-align: center; margin-top: 30px; color: #666; font-size: 12px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>☕ Coffee and AI</h1>
-            </div>
-            <div class="content">
-                <p>{email_data.message}</p>
-            </div>
-            <div class="footer">
-                <p>© 2024 Coffee and AI. All rights reserved.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    sent_count = 0
-    failed_count = 0
-    
-    for user in users:
-        try:
-            success = await send_email(
-                user.email,
-                email_data.subject,
-                html_content,
-                email_data.message
-            )
-            if success:
-                sent_count += 1
-            else:
-                failed_count += 1
-        except Exception as e:
-            print(f"Failed to send email to {user.email}: {str(e)}")
-            failed_count += 1
-    
     return {
-        "message": f"Bulk email completed",
-        "sent": sent_count,
-        "failed": failed_count,
-        "total": len(users)
+        "message": "Bulk email queued",
+        "job_id": job.id,
+        "status": job.status,
+        "total": job.total
     }
 
+@router.get("/email/jobs/{job_id}")
+async def get_email_job(
+    job_id: int,
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """Live progress of a bulk email job (admin only)"""
+    job = await EmailJob.get_or_none(id=job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Email job not found"
+        )
+    
+    return job_progress(job)
+
 @router.put("/orders/{order_id}/status")
 async def update_order_status(
     order_id: int,
@@ -227,30 +210,33 @@ async def update_order_status(
     
     old_status = order.status
     order.status = status_update.status
-    await order.save()
     
-    # If order is ready, send notification email and Slack
+    customer = order.customer
+    user = None
     if status_update.status == OrderStatus.READY:
-        customer = await order.customer
         user = await User.get_or_none(email=customer.session_id)
+    
+    async with outbox.transaction() as connection:
+        await order.save(using_db=connection)
         
-        # Send Slack notification
-        try:
-            customer_name = customer.session_id.split('@')[0] if '@' in customer.session_id else customer.session_id[:8]
-            await send_order_ready_notification(order.id, customer_name)
-        except Exception as e:
-            print(f"Failed to send Slack notification: {str(e)}")
-        
-        # Send email if user is registered
-        if user:
-            try:
-                await send_order_ready_email(
-                    user.email,
-                    user.username,
-                    order.id
+        # If order is ready, queue the Slack and email notifications with the status change
+        if status_update.status == OrderStatus.READY:
+            await outbox.enqueue(
+                "slack.order_ready",
+                {"order_id": order.id, "customer": customer_display_name(customer.session_id)},
+                idempotency_key=f"order:{order.id}:slack_ready",
+                connection=connection
+            )
+            
+            # Email if user is registered
+            if user:
+                await outbox.enqueue(
+                    "email.order_ready",
+                    {"user_email": user.email, "username": user.username, "order_id": order.id},
+                    idempotency_key=f"order:{order.id}:email_ready",
+                    connection=connection
                 )
-            except Exception as e:
-                print(f"Failed to send order ready email: {str(e)}")
+    admin_stats.notify()
     
     return {
         "message": f"Order status updated from {old_status} to {status_update.status}",
@@ -260,16 +246,5 @@ async def update_order_status(
 
 @router.get("/stats")
 async def get_admin_stats(current_admin: User = Depends(get_current_admin_user)):
-    """Get admin dashboard statistics"""
-    total_users = await User.all().count()
-    active_users = await User.filter(is_active=True).count()
-    total_orders = await Order.all().count()
-    pending_orders = await Order.filter(status=OrderStatus.PENDING).count()
-    
-    return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "inactive_users": total_users - active_users,
-        "total_orders": total_orders,
-        "pending_orders": pending_orders
-    }
+    """Get admin dashboard statistics (refreshed in the background, see generated_at)"""
+    return await admin_stats.get()
@@ -3,15 +3,15 @@ from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta, datetime
 from app.models.user import User, UserCreate, UserLogin, UserResponse, Token, UserUpdate
 from app.core.security import (
-    verify_password,
-    get_password_hash,
+    password_hasher,
     create_access_token,
     get_current_user,
     get_current_active_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
-from app.core.email import send_welcome_email
-from app.core.slack import send_new_user_notification
+from app.core.outbox import outbox
+from app.core.principals import principal_cache
+from app.core.admin_stats import admin_stats
 
 router = APIRouter()
 
@@ -34,25 +34,30 @@ async def register(user_data: UserCreate):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    user = await User.create(
-        email=user_data.email,
-        username=user_data.username,
-        full_name=user_data.full_name,
-        hashed_password=hashed_password
-    )
-    
-    # Send welcome email (non-blocking)
-    try:
-        await send_welcome_email(user.email, user.username)
-    except Exception as e:
-        print(f"Failed to send welcome email: {str(e)}")
-    
-    # Send Slack notification (non-blocking)
-    try:
-        await send_new_user_notification(user.username, user.email)
-    except Exception as e:
-        print(f"Failed to send Slack notification: {str(e)}")
+    hashed_password = await password_hasher.hash(user_data.password)
+    async with outbox.transaction() as connection:
+        user = await User.create(
+            email=user_data.email,
+            username=user_data.username,
+            full_name=user_data.full_name,
+            hashed_password=hashed_password,
+            using_db=connection
+        )
+        
+        # Welcome email and Slack notification are delivered after commit by the outbox
+        await outbox.enqueue(
+            "email.welcome",
+            {"user_email": user.email, "username": user.username},
+            idempotency_key=f"user:{user.id}:email_welcome",
+            connection=connection
+        )
+        await outbox.enqueue(
+            "slack.new_user",
+            {"username": user.username, "email": user.email},
+            idempotency_key=f"user:{user.id}:slack_new_user",
+            connection=connection
+        )
+    admin_stats.notify()
     
     return UserResponse.from_orm(user)
 
@@ -66,8 +71,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     if not user:
         user = await User.get_or_none(email=form_data.username)
     
-    # Verify user exists and password is correct
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # Verify user exists and password is correct (bcrypt runs off the event loop)
+    valid, new_hash = await password_hasher.verify(form_data.password, user.hashed_password) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username/email or password",
@@ -80,14 +86,16 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             detail="Inactive user"
         )
     
-    # Update last login
+    # Update last login, upgrading the stored hash if the bcrypt cost changed
     user.last_login = datetime.utcnow()
+    if new_hash:
+        user.hashed_password = new_hash
     await user.save()
     
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "ver": user.token_version}, expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -117,9 +125,20 @@ async def update_current_user(
         current_user.full_name = user_update.full_name
     
     if user_update.password:
-        current_user.hashed_password = get_password_hash(user_update.password)
+        current_user.hashed_password = await password_hasher.hash(user_update.password)
+        # Sign out every session that used the old password
+        current_user.token_version += 1
     
-    await current_user.save()
+    # Only the edited columns, so a cached copy cannot overwrite newer ones
+    update_fields = ["updated_at"]
+    if user_update.email:
+        update_fields.append("email")
+    if user_update.full_name is not None:
+        update_fields.append("full_name")
+    if user_update.password:
+        update_fields += ["hashed_password", "token_version"]
+    await current_user.save(update_fields=update_fields)
+    await principal_cache.invalidate(current_user.username)
     return UserResponse.from_orm(current_user)
 
 @router.post("/logout")
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.agents.modern_agent import ModernBaristaAgent
-from app.agents.advanced_agent import AdvancedBaristaAgent
-from app.agents.custom_workflow import CustomWorkflowAgent
-from app.agents.deep_coordinator import DeepCoordinatorAgent
+from app.agents.registry import agent_registry
+from app.core.cart_store import cart_store
+from app.core.pricing import price_cart
+import asyncio
 import json
+import os
 import uuid
 
+# Idle seconds before an SSE comment heartbeat is sent to keep proxies from closing the stream
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# How often an idle SSE stream checks whether the client went away
+SSE_DISCONNECT_POLL_SECONDS = 1.0
+
 router = APIRouter()
 
 class ChatMessage(BaseModel):
@@ -18,8 +25,7 @@ class ChatMessage(BaseModel):
     user_context: dict = None
     user_email: str = None  # Email of logged-in user (for order notifications)
 
-@router.post("/chat")
-async def chat_endpoint(chat_message: ChatMessage):
+def _resolve_session_id(chat_message: ChatMessage) -> str:
     # Use user's email as session_id if logged in, otherwise use random session_id
     if chat_message.user_email:
         session_id = chat_message.user_email
@@ -27,86 +33,93 @@ async def chat_endpoint(chat_message: ChatMessage):
     else:
         session_id = chat_message.session_id or str(uuid.uuid4())
         print(f"[CHAT DEBUG] Using random session_id: {session_id}")
+    return session_id
+
+@router.post("/chat")
+async def chat_endpoint(chat_message: ChatMessage):
+    session_id = _resolve_session_id(chat_message)
     
-    # Create agents with selected model
-    model_provider = chat_message.model_provider or "bedrock"
-    model_name = chat_message.model_name
-    
-    # Route to different agents based on type
-    if chat_message.agent_type == "deepagents":
+    # Shared agents for the selected model, built once per process
+    result = await _run_agent(
+        chat_message.agent_type, chat_message.message, session_id,
+        chat_message.model_provider or "bedrock", chat_message.model_name, chat_message.user_context
+    )
+    return _response_payload(result, session_id, chat_message.agent_type)
+
+async def _calculate_cart_total(cart: dict) -> float:
+    """Helper to calculate the cart total before tax (as the agents show it) in a single pricing pass"""
+    try:
+        return (await price_cart(cart)).subtotal
+    except Exception:
+        return 0.0
+
+@router.get("/models")
+async def get_available_models():
+    """Get list of all available models"""
+    from app.core.model_factory import get_available_models
+    return {
+        "models": get_available_models(),
+        "default": {
+            "provider": "bedrock",
+            "model": "amazon.nova-lite-v1:0"
+        }
+    }
+
+def _model_info(agent_type: str, model_provider: str, model_name: str = None) -> dict:
+    if agent_type == "workflow":
+        return {"provider": "workflow", "model": "rule-based"}
+    return {"provider": model_provider, "model": model_name or "default"}
+
+async def _deep_result(response: str, session_id: str, model_provider: str, model_name: str = None) -> dict:
+    """Wrap a deep agent's text response with its cart state"""
+    cart = (await cart_store.get(session_id)).items
+    total = await _calculate_cart_total(cart)
+    return {
+        "response": response,
+        "content_blocks": [{"type": "text", "text": response}],
+        "model_info": _model_info("deepagents", model_provider, model_name),
+        "structured_output": {
+            "agent_type": "deepagents",
+            "features_used": ["planning", "subagents", "tools"],
+            "cart_state": dict(cart),
+            "total": float(total)
+        }
+    }
+
+async def _run_agent(agent_type: str, message: str, session_id: str, model_provider: str,
+                     model_name: str = None, user_context: dict = None) -> dict:
+    """Route a message to the selected agent and return its result with model_info"""
+    if agent_type == "deepagents":
         try:
-            deep_agent = DeepCoordinatorAgent(
-                model_provider=model_provider,
-                model_name=model_name
-            )
-            response = await deep_agent.process_message(chat_message.message, session_id)
-            cart = deep_agent.cart_storage.get(session_id, {})
-            total = await _calculate_cart_total(cart)
-            return {
-                "response": str(response),
-                "content_blocks": [{"type": "text", "text": str(response)}],
-                "session_id": session_id,
-                "agent_type": "deepagents",
-                "model_info": {
-                    "provider": model_provider,
-                    "model": model_name or "default"
-                },
-                "structured_output": {
-                    "agent_type": "deepagents",
-                    "features_used": ["planning", "subagents", "tools"],
-                    "cart_state": dict(cart),
-                    "total": float(total)
-                }
-            }
+            deep_agent = await agent_registry.get("deepagents", model_provider, model_name)
+            response = await deep_agent.process_message(message, session_id)
+            return await _deep_result(str(response), session_id, model_provider, model_name)
         except Exception as e:
             return {
                 "response": f"DeepAgent error: {str(e)}",
                 "content_blocks": [{"type": "text", "text": f"DeepAgent error: {str(e)}"}],
-                "session_id": session_id,
-                "agent_type": "deepagents",
-                "model_info": {
-                    "provider": model_provider,
-                    "model": model_name or "default"
-                },
+                "model_info": _model_info(agent_type, model_provider, model_name),
                 "structured_output": {"error": str(e)}
             }
-    elif chat_message.agent_type == "advanced":
-        advanced_agent = AdvancedBaristaAgent(
-            model_provider=model_provider,
-            model_name=model_name
-        )
-        result = await advanced_agent.process_message(
-            chat_message.message, 
-            session_id, 
-            chat_message.user_context
-        )
-        result["model_info"] = {
-            "provider": model_provider,
-            "model": model_name or "default"
-        }
-    elif chat_message.agent_type == "workflow":
-        workflow_agent = CustomWorkflowAgent()
-        result = await workflow_agent.process_message(chat_message.message, session_id)
-        result["model_info"] = {
-            "provider": "workflow",
-            "model": "rule-based"
-        }
+    elif agent_type == "advanced":
+        advanced_agent = await agent_registry.get("advanced", model_provider, model_name)
+        result = await advanced_agent.process_message(message, session_id, user_context)
+    elif agent_type == "workflow":
+        workflow_agent = await agent_registry.get("workflow")
+        result = await workflow_agent.process_message(message, session_id)
     else:
-        modern_agent = ModernBaristaAgent(
-            model_provider=model_provider,
-            model_name=model_name
-        )
-        result = await modern_agent.process_message(chat_message.message, session_id)
-        result["model_info"] = {
-            "provider": model_provider,
-            "model": model_name or "default"
-        }
-    
+        modern_agent = await agent_registry.get("modern", model_provider, model_name)
+        result = await modern_agent.process_message(message, session_id)
+    result["model_info"] = _model_info(agent_type, model_provider, model_name)
+    return result
+
+def _response_payload(result: dict, session_id: str, agent_type: str) -> dict:
     return {
         "response": result["response"],
         "content_blocks": result["content_blocks"],
         "session_id": session_id,
-        "agent_type": chat_message.agent_type,
+        "agent_type": agent_type,
+        "model_info": result.get("model_info"),
         "structured_output": result.get("structured_output"),
         "cart_state": result.get("cart_state", []),
         "total": result.get("total", 0.0),
@@ -114,29 +127,90 @@ async def chat_endpoint(chat_message: ChatMessage):
         "confidence": result.get("confidence")
     }
 
-async def _calculate_cart_total(cart: dict) -> float:
-    """Helper to calculate cart total"""
-    try:
-        from app.models.menu import MenuItem
-        total = 0
-        for item_id, quantity in cart.items():
-            item = await MenuItem.get(id=int(item_id))
-            total += float(item.price) * quantity
-        return total
-    except:
-        return 0.0
+async def _stream_agent(agent_type: str, message: str, session_id: str, model_provider: str,
+                        model_name: str = None, user_context: dict = None, response_session_id: str = None):
+    """Yield token/reasoning/tool frames, then one "final" frame with the full response payload"""
+    if agent_type == "deepagents":
+        agent = await agent_registry.get("deepagents", model_provider, model_name)
+        frames = agent.stream_message(message, session_id)
+    elif agent_type == "advanced":
+        agent = await agent_registry.get("advanced", model_provider, model_name)
+        frames = agent.stream_message(message, session_id, user_context)
+    elif agent_type == "workflow":
+        agent = await agent_registry.get("workflow")
+        frames = agent.stream_message(message, session_id)
+    else:
+        agent = await agent_registry.get("modern", model_provider, model_name)
+        frames = agent.stream_message(message, session_id)
 
-@router.get("/models")
-async def get_available_models():
-    """Get list of all available models"""
-    from app.core.model_factory import get_available_models
-    return {
-        "models": get_available_models(),
-        "default": {
-            "provider": "bedrock",
-            "model": "amazon.nova-lite-v1:0"
-        }
-    }
+    async for frame in frames:
+        if frame["type"] != "final":
+            yield frame
+            continue
+        if agent_type == "deepagents":
+            result = await _deep_result(frame["response"], session_id, model_provider, model_name)
+        else:
+            result = {key: value for key, value in frame.items() if key != "type"}
+            result["model_info"] = _model_info(agent_type, model_provider, model_name)
+        yield {"type": "final", **_response_payload(result, response_session_id or session_id, agent_type)}
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(chat_message: ChatMessage, request: Request):
+    """Server-Sent Events variant of /chat.
+
+    Events are named after the frame type (token, reasoning, tool_start, tool_end,
+    final, error). When the client disconnects the agent run is cancelled, which
+    stops the upstream model call instead of letting it finish unread.
+    """
+    session_id = _resolve_session_id(chat_message)
+    model_provider = chat_message.model_provider or "bedrock"
+    
+    async def event_stream():
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def produce():
+            try:
+                async for frame in _stream_agent(
+                    chat_message.agent_type, chat_message.message, session_id, model_provider,
+                    chat_message.model_name, chat_message.user_context
+                ):
+                    await queue.put(frame)
+            except Exception as e:
+                await queue.put({"type": "error", "error": str(e), "session_id": session_id})
+            finally:
+                await queue.put(None)
+        
+        producer = asyncio.create_task(produce())
+        loop = asyncio.get_running_loop()
+        last_sent = loop.time()
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=SSE_DISCONNECT_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        print(f"[SSE] Client disconnected, cancelling stream for session {session_id}")
+                        break
+                    if loop.time() - last_sent >= SSE_HEARTBEAT_SECONDS:
+                        last_sent = loop.time()
+                        yield ": heartbeat\n\n"
+                    continue
+                if frame is None:
+                    break
+                last_sent = loop.time()
+                yield _sse_event(frame["type"], frame)
+        finally:
+            # Runs on normal completion, on disconnect and when the response task is cancelled
+            producer.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
@@ -156,68 +230,24 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             # Use user email as session_id if provided
             actual_session_id = user_email if user_email else session_id
             
-            # Route to appropriate agent with model selection
-            if agent_type == "deepagents":
-                deep_agent = DeepCoordinatorAgent(
-                    model_provider=model_provider,
-                    model_name=model_name
-                )
-                response = await deep_agent.process_message(message, actual_session_id)
-                cart = deep_agent.cart_storage.get(actual_session_id, {})
-                total = await _calculate_cart_total(cart)
-                result = {
-                    "response": response,
-                    "content_blocks": [{"type": "text", "text": response}],
-                    "model_info": {
-                        "provider": model_provider,
-                        "model": model_name or "default"
-                    },
-                    "structured_output": {
-                        "agent_type": "deepagents",
-                        "features_used": ["planning", "subagents", "tools"],
-                        "cart_state": dict(cart),
-                        "total": float(total)
-                    }
-                }
-            elif agent_type == "advanced":
-                advanced_agent = AdvancedBaristaAgent(
-                    model_provider=model_provider,
-                    model_name=model_name
-                )
-                result = await advanced_agent.process_message(message, actual_session_id, user_context)
-                result["model_info"] = {
-                    "provider": model_provider,
-                    "model": model_name or "default"
-                }
-            elif agent_type == "workflow":
-                workflow_agent = CustomWorkflowAgent()
-                result = await workflow_agent.process_message(message, actual_session_id)
-                result["model_info"] = {
-                    "provider": "workflow",
-                    "model": "rule-based"
-                }
-            else:
-                modern_agent = ModernBaristaAgent(
-                    model_provider=model_provider,
-                    model_name=model_name
-                )
-                result = await modern_agent.process_message(message, actual_session_id)
-                result["model_info"] = {
-                    "provider": model_provider,
-                    "model": model_name or "default"
-                }
+            # Streaming mode: send frames as they are produced, ending with a "final" frame
+            if message_data.get("stream"):
+                try:
+                    async for frame in _stream_agent(
+                        agent_type, message, actual_session_id, model_provider,
+                        model_name, user_context, response_session_id=session_id
+                    ):
+                        await websocket.send_text(json.dumps(frame, default=str))
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:
+                    # Report the failed run like /chat/stream does and keep the socket open
+                    await websocket.send_text(json.dumps({"type": "error", "error": str(e), "session_id": session_id}))
+                continue
             
-            await websocket.send_text(json.dumps({
-                "response": result["response"],
-                "content_blocks": result["content_blocks"],
-                "session_id": session_id,
-                "agent_type": agent_type,
-                "structured_output": result.get("structured_output"),
-                "cart_state": result.get("cart_state", []),
-                "total": result.get("total", 0.0),
-                "intent": result.get("intent"),
-                "confidence": result.get("confidence")
-            }))
+            # Route to appropriate agent with model selection
+            result = await _run_agent(agent_type, message, actual_session_id, model_provider, model_name, user_context)
+            await websocket.send_text(json.dumps(_response_payload(result, session_id, agent_type)))
             
     except WebSocketDisconnect:
         pass
@@ -1,23 +1,27 @@
+from dataclasses import asdict
 from fastapi import APIRouter, HTTPException
 from app.models.menu import MenuItem, MenuItemSchema
+from app.core.catalog import menu_catalog
 from typing import List
 
 router = APIRouter()
 
 @router.get("/menu", response_model=List[MenuItemSchema])
 async def get_menu():
-    items = await MenuItem.filter(available=True)
-    return [MenuItemSchema.from_orm(item) for item in items]
+    menu = await menu_catalog.get()
+    return menu.api_rows
 
 @router.get("/menu/{item_id}", response_model=MenuItemSchema)
 async def get_menu_item(item_id: int):
-    try:
-        item = await MenuItem.get(id=item_id)
-        return MenuItemSchema.from_orm(item)
-    except:
+    menu = await menu_catalog.get()
+    item = menu.get(item_id)
+    if item is None:
         raise HTTPException(status_code=404, detail="Menu item not found")
+    return asdict(item)
 
 @router.post("/menu", response_model=MenuItemSchema)
 async def create_menu_item(item: MenuItemSchema):
     menu_item = await MenuItem.create(**item.dict(exclude={"id"}))
+    # Refresh this process now; other replicas pick up the new version on their next poll
+    await menu_catalog.invalidate()
     return MenuItemSchema.from_orm(menu_item)
@@ -1,21 +1,44 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from app.models.order import Order, OrderSchema
 from app.models.customer import Customer
 from app.models.user import User
 from app.core.security import get_current_active_user
 from app.core.email import send_order_confirmation_email
+from app.core.pagination import fetch_page, page_response, page_size, parse_fields
 from typing import List, Optional
+import os
 
 router = APIRouter()
 
+# Orders per page of order history, and the most a client may ask for
+ORDER_HISTORY_PAGE_SIZE = int(os.getenv("ORDER_HISTORY_PAGE_SIZE", "20"))
+ORDER_HISTORY_MAX_PAGE_SIZE = int(os.getenv("ORDER_HISTORY_MAX_PAGE_SIZE", "100"))
+
+ORDER_FIELDS = list(OrderSchema.model_fields)
+
+async def order_history_page(customer_id: Optional[int], cursor: Optional[str], limit: Optional[int],
+                             fields: Optional[str]):
+    """Newest orders first, one page at a time; the next page's cursor is in X-Next-Cursor"""
+    selected = parse_fields(fields, ORDER_FIELDS)
+    if customer_id is None:
+        return page_response([], None)
+    rows, next_cursor = await fetch_page(
+        Order.filter(customer_id=customer_id),
+        cursor,
+        page_size(limit, ORDER_HISTORY_PAGE_SIZE, ORDER_HISTORY_MAX_PAGE_SIZE),
+        selected
+    )
+    return page_response(rows, next_cursor)
+
 @router.get("/orders/{session_id}", response_model=List[OrderSchema])
-async def get_orders(session_id: str):
-    try:
-        customer = await Customer.get(session_id=session_id)
-        orders = await Order.filter(customer=customer).order_by("-created_at")
-        return [OrderSchema.from_orm(order) for order in orders]
-    except:
-        return []
+async def get_orders(
+    session_id: str,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, description=f"Page size (default {ORDER_HISTORY_PAGE_SIZE}, max {ORDER_HISTORY_MAX_PAGE_SIZE})"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
+    customer = await Customer.get_or_none(session_id=session_id)
+    return await order_history_page(customer.id if customer else None, cursor, limit, fields)
 
 @router.get("/order/{order_id}", response_model=OrderSchema)
 async def get_order(order_id: int):
@@ -26,23 +49,22 @@ async def get_order(order_id: int):
         raise HTTPException(status_code=404, detail="Order not found")
 
 @router.get("/my-orders", response_model=List[OrderSchema])
-async def get_my_orders(current_user: User = Depends(get_current_active_user)):
-    """Get orders for authenticated user"""
+async def get_my_orders(
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, description=f"Page size (default {ORDER_HISTORY_PAGE_SIZE}, max {ORDER_HISTORY_MAX_PAGE_SIZE})"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get orders for authenticated user, newest first"""
     try:
-        print(f"[ORDER HISTORY DEBUG] Fetching orders for user: {current_user.email}")
-        
         # Find customer by email (using email as session_id for authenticated users)
         customer = await Customer.get_or_none(session_id=current_user.email)
         if not customer:
             print(f"[ORDER HISTORY DEBUG] No customer found with session_id: {current_user.email}")
-            return []
-        
-        print(f"[ORDER HISTORY DEBUG] Found customer ID: {customer.id}")
         
-        orders = await Order.filter(customer=customer).order_by("-created_at")
-        print(f"[ORDER HISTORY DEBUG] Found {len(orders)} orders")
-        
-        return [OrderSchema.from_orm(order) for order in orders]
+        return await order_history_page(customer.id if customer else None, cursor, limit, fields)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ORDER HISTORY DEBUG] Error fetching orders: {str(e)}")
         import traceback
@@ -0,0 +1,142 @@
+"""
+Admin dashboard statistics
+The dashboard figures are computed in the background and kept in memory, so a
+refresh of the admin screen is a dictionary read instead of a round of table scans.
+Writes that change a figure ask for an early refresh; the interval catches changes
+made on other replicas.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, List, Optional
+
+from tortoise import connections, timezone
+
+# Regular refresh of the dashboard snapshot (seconds)
+ADMIN_STATS_REFRESH_INTERVAL = float(os.getenv("ADMIN_STATS_REFRESH_INTERVAL", "30"))
+# Writes trigger a refresh at most this often (seconds)
+ADMIN_STATS_MIN_REFRESH_INTERVAL = float(os.getenv("ADMIN_STATS_MIN_REFRESH_INTERVAL", "2"))
+# Hours covered by the time-bucketed order and revenue series
+ADMIN_STATS_WINDOW_HOURS = int(os.getenv("ADMIN_STATS_WINDOW_HOURS", "24"))
+
+ORDER_BUCKET_SECONDS = 300
+REVENUE_BUCKET_SECONDS = 3600
+
+# All counters in one round trip
+COUNTS_SQL = """
+SELECT
+    (SELECT COUNT(*) FROM users) AS total_users,
+    (SELECT COUNT(*) FROM users WHERE is_active) AS active_users,
+    (SELECT COUNT(*) FROM orders) AS total_orders,
+    (SELECT COUNT(*) FROM orders WHERE status = 'pending') AS pending_orders
+"""
+
+
+def _bucket_start(moment: datetime, seconds: int) -> datetime:
+    epoch = int(moment.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=dt_timezone.utc)
+
+
+def _series(rows: List[tuple], since: datetime, until: datetime, seconds: int) -> List[Dict[str, Any]]:
+    """Orders and revenue per bucket from since to until, including empty buckets"""
+    buckets: Dict[datetime, List[float]] = {}
+    start = _bucket_start(since, seconds)
+    while start <= until:
+        buckets[start] = [0, 0.0]
+        start += timedelta(seconds=seconds)
+    for created_at, total in rows:
+        bucket = buckets.get(_bucket_start(created_at, seconds))
+        if bucket is not None:
+            bucket[0] += 1
+            bucket[1] += float(total)
+    return [
+        {"start": start.isoformat(), "orders": orders, "revenue": round(revenue, 2)}
+        for start, (orders, revenue) in buckets.items()
+    ]
+
+
+class AdminStats:
+    """In-memory dashboard snapshot refreshed in the background"""
+
+    def __init__(self, interval: float = ADMIN_STATS_REFRESH_INTERVAL,
+                 min_interval: float = ADMIN_STATS_MIN_REFRESH_INTERVAL):
+        self.interval = interval
+        self.min_interval = min_interval
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self.refreshes = 0
+        self.errors = 0
+        self.last_refresh_ms = 0.0
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Recompute the snapshot: one query for the counters, one for the recent orders"""
+        from app.models.order import Order
+        async with self._lock:
+            start = time.perf_counter()
+            now = timezone.now()
+            since = now - timedelta(hours=ADMIN_STATS_WINDOW_HOURS)
+
+            counts = (await connections.get("default").execute_query_dict(COUNTS_SQL))[0]
+            recent = await Order.filter(created_at__gte=since).values_list("created_at", "total")
+
+            total_users = counts["total_users"]
+            active_users = counts["active_users"]
+            self._snapshot = {
+                "total_users": total_users,
+                "active_users": active_users,
+                "inactive_users": total_users - active_users,
+                "total_orders": counts["total_orders"],
+                "pending_orders": counts["pending_orders"],
+                "orders_per_5_minutes": [
+                    {"start": bucket["start"], "orders": bucket["orders"]}
+                    for bucket in _series(recent, since, now, ORDER_BUCKET_SECONDS)
+                ],
+                "revenue_per_hour": _series(recent, since, now, REVENUE_BUCKET_SECONDS),
+                "generated_at": now.isoformat()
+            }
+            self.refreshes += 1
+            self.last_refresh_ms = (time.perf_counter() - start) * 1000
+            return self._snapshot
+
+    async def get(self) -> Dict[str, Any]:
+        """Current snapshot, computed on first use"""
+        if self._snapshot is None:
+            return await self.refresh()
+        return self._snapshot
+
+    def notify(self) -> None:
+        """Call after a write that changes a dashboard figure"""
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        """Background refresh loop, started on application startup"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+                # Coalesce a burst of writes into one refresh
+                await asyncio.sleep(self.min_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"[ADMIN STATS] Refresh failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Refresh statistics for the metrics endpoint"""
+        return {
+            "generated_at": self._snapshot["generated_at"] if self._snapshot else None,
+            "refreshes": self.refreshes,
+            "last_refresh_ms": round(self.last_refresh_ms, 1),
+            "errors": self.errors
+        }
+
+
+# Global dashboard snapshot
+admin_stats = AdminStats()
@@ -1,20 +1,88 @@
+import asyncio
 import boto3
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError, ConnectTimeoutError, ReadTimeoutError
 
-def get_bedrock_client():
+BEDROCK_MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "amazon.nova-lite-v1:0")
+# Text embedding model used by the conversation memory's Bedrock embedder
+BEDROCK_EMBEDDING_MODEL_ID = os.getenv("BEDROCK_EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
+# Maximum concurrent Bedrock calls per process (also the HTTP connection pool size)
+BEDROCK_MAX_CONCURRENCY = int(os.getenv("BEDROCK_MAX_CONCURRENCY", "16"))
+# Default per-call timeout in seconds
+BEDROCK_TIMEOUT_SECONDS = float(os.getenv("BEDROCK_TIMEOUT_SECONDS", "30"))
+
+@lru_cache(maxsize=8)
+def get_bedrock_client(read_timeout: float = BEDROCK_TIMEOUT_SECONDS):
+    """Shared bedrock-runtime client per read timeout, reused with its connection pool for the whole process"""
     return boto3.client(
         'bedrock-runtime',
         region_name=os.getenv('AWS_REGION', 'us-east-1'),
         aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        config=Config(
+            max_pool_connections=BEDROCK_MAX_CONCURRENCY,
+            connect_timeout=5,
+            read_timeout=read_timeout,
+            retries={"max_attempts": 2, "mode": "adaptive"}
+        )
     )
 
-def get_haiku_response(prompt: str) -> str:
-    """Get response from Amazon Nova Lite model"""
-    try:
-        client = get_bedrock_client()
-        
+@dataclass
+class LLMError:
+    """Structured failure of a model call"""
+    kind: str  # timeout, throttled, overloaded, service, invalid_response
+    message: str
+    retryable: bool = False
+
+@dataclass
+class LLMResponse:
+    """Result of generate(): either text or an error, never an error disguised as text"""
+    text: str = ""
+    error: Optional[LLMError] = None
+    latency_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class BedrockClient:
+    """Async facade over the shared boto3 client with bounded concurrency"""
+
+    def __init__(self, max_concurrency: int = BEDROCK_MAX_CONCURRENCY, timeout: float = BEDROCK_TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # boto3 is blocking, so calls run on a dedicated pool sized to the concurrency limit
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="bedrock")
+        self.in_flight = 0
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+
+    def _invoke(self, model_id: str, body: str, timeout: float) -> str:
+        response = get_bedrock_client(timeout).invoke_model(
+            modelId=model_id,
+            body=body,
+            contentType="application/json"
+        )
+        response_body = json.loads(response['body'].read())
+        return response_body['output']['message']['content'][0]['text']
+
+    async def generate(
+        self,
+        prompt: str,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        timeout: Optional[float] = None,
+        model_id: Optional[str] = None
+    ) -> LLMResponse:
+        """Generate a completion for a single user prompt"""
         body = json.dumps({
             "messages": [
                 {
@@ -23,19 +91,92 @@ def get_haiku_response(prompt: str) -> str:
                 }
             ],
             "inferenceConfig": {
-                "maxTokens": 1000,
-                "temperature": 0.7
+                "maxTokens": max_tokens,
+                "temperature": temperature
             }
         })
-        
-        response = client.invoke_model(
-            modelId="amazon.nova-lite-v1:0",
+
+        text, error, latency_ms = await self._call(self._invoke, model_id or BEDROCK_MODEL_ID, body, timeout)
+        return LLMResponse(text=text or "", error=error, latency_ms=latency_ms)
+
+    def _invoke_embedding(self, model_id: str, body: str, timeout: float) -> List[float]:
+        response = get_bedrock_client(timeout).invoke_model(
+            modelId=model_id,
             body=body,
             contentType="application/json"
         )
-        
-        response_body = json.loads(response['body'].read())
-        return response_body['output']['message']['content'][0]['text']
-        
-    except Exception as e:
-        return f"I'm having trouble connecting to the AI service. Error: {str(e)}"
+        return json.loads(response['body'].read())['embedding']
+
+    async def embed(self, text: str, dimensions: int = 512, timeout: Optional[float] = None,
+                    model_id: str = BEDROCK_EMBEDDING_MODEL_ID) -> Tuple[Optional[List[float]], Optional[LLMError]]:
+        """Normalized Titan text embedding, or the error that prevented it"""
+        body = json.dumps({"inputText": text, "dimensions": dimensions, "normalize": True})
+        embedding, error, _ = await self._call(self._invoke_embedding, model_id, body, timeout)
+        return embedding, error
+
+    async def _call(self, invoke, model_id: str, body: str, timeout: Optional[float]) -> Tuple[Any, Optional[LLMError], float]:
+        """Run a blocking invoke on the executor within the concurrency limit, mapping failures to LLMError.
+
+        A call that times out keeps running in its thread until botocore's read timeout
+        (the same per-call timeout) stops it, so its concurrency slot is only released
+        when the thread is done, not when the caller gives up waiting.
+        """
+        started = time.perf_counter()
+        error = None
+        result = None
+        timeout = timeout or self.timeout
+        try:
+            await self._semaphore.acquire()
+            self.in_flight += 1
+            self.calls += 1
+            try:
+                future = asyncio.get_running_loop().run_in_executor(self._executor, invoke, model_id, body, timeout)
+            except BaseException:
+                self._release()
+                raise
+            future.add_done_callback(self._release)
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except (asyncio.TimeoutError, ReadTimeoutError, ConnectTimeoutError) as e:
+            error = LLMError("timeout", str(e) or "Model call timed out", retryable=True)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code", "")
+            if code == "ThrottlingException":
+                error = LLMError("throttled", str(e), retryable=True)
+            elif code in ("ServiceUnavailableException", "ModelNotReadyException"):
+                error = LLMError("overloaded", str(e), retryable=True)
+            else:
+                error = LLMError("service", str(e))
+        except BotoCoreError as e:
+            error = LLMError("service", str(e), retryable=True)
+        except (KeyError, IndexError, ValueError) as e:
+            error = LLMError("invalid_response", f"Unexpected response format: {str(e)}")
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        if error:
+            self.errors[error.kind] = self.errors.get(error.kind, 0) + 1
+            print(f"[BEDROCK] {error.kind} error after {latency_ms:.0f}ms: {error.message}")
+        return result, error, latency_ms
+
+    def _release(self, future: Optional[asyncio.Future] = None) -> None:
+        """Free the concurrency slot once the executor thread has finished"""
+        self.in_flight -= 1
+        self._semaphore.release()
+        if future is not None and not future.cancelled():
+            # Mark the outcome as seen; a caller that timed out no longer reads it
+            future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Client statistics for the metrics endpoint"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "errors": dict(self.errors)
+        }
+
+# Global client instance
+bedrock_client = BedrockClient()
+
+async def generate(prompt: str, **kwargs) -> LLMResponse:
+    """Get a response from the default Bedrock model (Amazon Nova Lite)"""
+    return await bedrock_client.generate(prompt, **kwargs)
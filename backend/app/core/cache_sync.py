@@ -0,0 +1,83 @@
+"""
+Cross-replica cache invalidation
+Process-local caches are keyed by a version stamp in Postgres. Writers bump the
+stamp, and every replica polls it and reloads the caches whose stamp moved.
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict
+
+from tortoise.expressions import F
+
+# How often each replica checks the version stamps
+CACHE_SYNC_INTERVAL = float(os.getenv("CACHE_SYNC_INTERVAL", "5"))
+
+ReloadHandler = Callable[[int], Awaitable[None]]
+
+
+class CacheSync:
+    """Version stamp registry shared by the process-local caches"""
+
+    def __init__(self, interval: float = CACHE_SYNC_INTERVAL):
+        self.interval = interval
+        self._handlers: Dict[str, ReloadHandler] = {}
+        self._seen: Dict[str, int] = {}
+        self.reloads = 0
+        self.errors = 0
+
+    def register(self, name: str, handler: ReloadHandler) -> None:
+        """Call handler(version) whenever the named stamp changes"""
+        self._handlers[name] = handler
+
+    def mark_seen(self, name: str, version: int) -> None:
+        self._seen[name] = version
+
+    async def version(self, name: str) -> int:
+        from app.models.cache_version import CacheVersion
+        row = await CacheVersion.get_or_none(name=name)
+        return row.version if row else 0
+
+    async def bump(self, name: str) -> int:
+        """Advance a stamp after a write; other replicas reload on their next poll"""
+        from app.models.cache_version import CacheVersion
+        await CacheVersion.get_or_create(name=name)
+        await CacheVersion.filter(name=name).update(version=F("version") + 1)
+        return await self.version(name)
+
+    async def poll(self) -> None:
+        """Reload every registered cache whose stamp differs from the one last seen"""
+        from app.models.cache_version import CacheVersion
+        rows = await CacheVersion.filter(name__in=list(self._handlers)).values("name", "version")
+        versions = {row["name"]: row["version"] for row in rows}
+        for name, handler in self._handlers.items():
+            version = versions.get(name, 0)
+            if self._seen.get(name) == version:
+                continue
+            await handler(version)
+            self._seen[name] = version
+            self.reloads += 1
+
+    async def run(self) -> None:
+        """Background polling loop, started on application startup"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"[CACHE SYNC] Poll failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Sync statistics for the metrics endpoint"""
+        return {
+            "interval_seconds": self.interval,
+            "versions": dict(self._seen),
+            "reloads": self.reloads,
+            "errors": self.errors
+        }
+
+
+# Global sync instance
+cache_sync = CacheSync()
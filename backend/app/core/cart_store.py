@@ -0,0 +1,317 @@
+"""
+Cart store
+Carts shared by every agent type, keyed by chat session. The Postgres backend lets
+any replica serve any request; the in-memory backend suits single-process setups.
+"""
+import asyncio
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+
+from tortoise import timezone
+from tortoise.exceptions import IntegrityError
+
+# "postgres" (shared across replicas) or "memory" (per process)
+CART_STORE = os.getenv("CART_STORE", "postgres")
+# Carts untouched for longer than this are treated as empty and purged
+CART_TTL_SECONDS = int(os.getenv("CART_TTL_SECONDS", str(24 * 3600)))
+# Sessions kept by the in-memory backend before the least recently used are evicted
+CART_MAX_SESSIONS = int(os.getenv("CART_MAX_SESSIONS", "10000"))
+# How often expired carts are purged
+CART_PURGE_INTERVAL = int(os.getenv("CART_PURGE_INTERVAL", "300"))
+# Attempts at an optimistic update before giving up, with jittered backoff between them
+CART_UPDATE_ATTEMPTS = 10
+CART_RETRY_BACKOFF = 0.01
+
+
+class CartConflictError(Exception):
+    """A cart changed between read and write more often than we retry"""
+
+
+@dataclass
+class CartState:
+    items: Dict[str, int] = field(default_factory=dict)  # {item_id: quantity}
+    pending_order: Optional[Dict[str, Any]] = None
+    version: int = 0
+
+    def copy(self) -> "CartState":
+        pending = dict(self.pending_order) if self.pending_order is not None else None
+        return CartState(dict(self.items), pending, self.version)
+
+
+def session_id_from_config(config: Optional[Dict[str, Any]], default: str = "default") -> str:
+    """Chat session of an agent run; thread ids are "<agent_type>:<session_id>" """
+    thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+    if not thread_id:
+        return default
+    return thread_id.split(":", 1)[1] if ":" in thread_id else thread_id
+
+
+class CartStore(ABC):
+    """Atomic cart operations built on a backend's versioned update()"""
+
+    backend = "base"
+
+    def __init__(self, ttl_seconds: int = CART_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.conflicts = 0
+        self.purged = 0
+
+    @abstractmethod
+    async def get(self, session_id: str) -> CartState:
+        """The session's cart; an empty cart if it has none or it expired"""
+
+    @abstractmethod
+    async def update(self, session_id: str, mutate: Callable[[CartState], None],
+                     expected_version: Optional[int] = None) -> CartState:
+        """Apply mutate to a copy of the cart and store it with the next version.
+
+        Without expected_version a concurrent change is retried transparently; with
+        it, CartConflictError is raised if the cart moved on since it was read.
+        """
+
+    @abstractmethod
+    async def purge_expired(self) -> int:
+        """Delete expired carts and return how many were removed"""
+
+    async def add(self, session_id: str, item_id: Any, quantity: int = 1) -> CartState:
+        key = str(item_id)
+
+        def mutate(cart: CartState) -> None:
+            cart.items[key] = cart.items.get(key, 0) + quantity
+
+        return await self.update(session_id, mutate)
+
+    async def remove(self, session_id: str, item_id: Any, quantity: Optional[int] = None) -> CartState:
+        """Remove a quantity of an item, or the whole line when quantity is None"""
+        key = str(item_id)
+
+        def mutate(cart: CartState) -> None:
+            if key not in cart.items:
+                return
+            remaining = 0 if quantity is None else cart.items[key] - quantity
+            if remaining > 0:
+                cart.items[key] = remaining
+            else:
+                del cart.items[key]
+
+        return await self.update(session_id, mutate)
+
+    async def clear(self, session_id: str) -> CartState:
+        def mutate(cart: CartState) -> None:
+            cart.items.clear()
+
+        return await self.update(session_id, mutate)
+
+    async def replace(self, session_id: str, items: Dict[Any, int], expected_version: Optional[int] = None) -> CartState:
+        """Overwrite the cart contents, optionally only if it is still at expected_version"""
+        new_items = {str(key): quantity for key, quantity in items.items() if quantity > 0}
+
+        def mutate(cart: CartState) -> None:
+            cart.items = dict(new_items)
+
+        return await self.update(session_id, mutate, expected_version=expected_version)
+
+    async def checkout(self, session_id: str, hold_pending: bool = True) -> Dict[str, int]:
+        """Atomically take the cart's items and empty the cart.
+
+        With hold_pending the items are also kept as the cart's pending order until
+        pop_pending() collects them, for callers that create the order later.
+        Returns the checked-out items, or an empty dict if the cart was empty.
+        """
+        taken: Dict[str, int] = {}
+
+        def mutate(cart: CartState) -> None:
+            taken.clear()
+            if cart.items:
+                taken.update(cart.items)
+                if hold_pending:
+                    cart.pending_order = {"items": dict(cart.items)}
+                cart.items.clear()
+
+        await self.update(session_id, mutate)
+        return taken
+
+    async def pop_pending(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically take the pending order so exactly one caller creates it"""
+        taken: Dict[str, Any] = {}
+
+        def mutate(cart: CartState) -> None:
+            taken.clear()
+            if cart.pending_order is not None:
+                taken.update(cart.pending_order)
+                cart.pending_order = None
+
+        await self.update(session_id, mutate)
+        return taken or None
+
+    async def run_expiry(self, interval: int = CART_PURGE_INTERVAL) -> None:
+        """Background loop purging expired carts, started on application startup"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = await self.purge_expired()
+                if removed:
+                    print(f"[CART] Purged {removed} expired carts")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[CART] Purge failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Store statistics for the metrics endpoint"""
+        return {
+            "backend": self.backend,
+            "ttl_seconds": self.ttl_seconds,
+            "conflicts": self.conflicts,
+            "purged": self.purged
+        }
+
+
+class _MemoryEntry:
+    __slots__ = ("state", "touched")
+
+    def __init__(self, state: CartState):
+        self.state = state
+        self.touched = time.monotonic()
+
+
+class MemoryCartStore(CartStore):
+    """Per-process carts with LRU eviction. Updates never await, so they are atomic on the loop."""
+
+    backend = "memory"
+
+    def __init__(self, ttl_seconds: int = CART_TTL_SECONDS, max_sessions: int = CART_MAX_SESSIONS):
+        super().__init__(ttl_seconds)
+        self.max_sessions = max_sessions
+        self._carts: "OrderedDict[str, _MemoryEntry]" = OrderedDict()
+        self.evictions = 0
+
+    def _live(self, session_id: str) -> Optional[_MemoryEntry]:
+        entry = self._carts.get(session_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.touched > self.ttl_seconds:
+            del self._carts[session_id]
+            self.purged += 1
+            return None
+        return entry
+
+    async def get(self, session_id: str) -> CartState:
+        entry = self._live(session_id)
+        return entry.state.copy() if entry else CartState()
+
+    async def update(self, session_id: str, mutate: Callable[[CartState], None],
+                     expected_version: Optional[int] = None) -> CartState:
+        entry = self._live(session_id)
+        current = entry.state if entry else CartState()
+        if expected_version is not None and current.version != expected_version:
+            self.conflicts += 1
+            raise CartConflictError(f"Cart {session_id} is at version {current.version}, expected {expected_version}")
+
+        state = current.copy()
+        mutate(state)
+        state.version = current.version + 1
+        self._carts[session_id] = _MemoryEntry(state)
+        self._carts.move_to_end(session_id)
+        while len(self._carts) > self.max_sessions:
+            self._carts.popitem(last=False)
+            self.evictions += 1
+        return state.copy()
+
+    async def purge_expired(self) -> int:
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [session_id for session_id, entry in self._carts.items() if entry.touched < cutoff]
+        for session_id in expired:
+            del self._carts[session_id]
+        self.purged += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "sessions": len(self._carts),
+            "max_sessions": self.max_sessions,
+            "evictions": self.evictions
+        }
+
+
+class PostgresCartStore(CartStore):
+    """Carts in the carts table, updated with compare-and-set on the version column"""
+
+    backend = "postgres"
+
+    def _expired(self, row) -> bool:
+        return row.updated_at < timezone.now() - timedelta(seconds=self.ttl_seconds)
+
+    async def get(self, session_id: str) -> CartState:
+        from app.models.cart import Cart
+        row = await Cart.get_or_none(session_id=session_id)
+        if row is None or self._expired(row):
+            return CartState(version=row.version if row else 0)
+        return CartState(dict(row.items or {}), row.pending_order, row.version)
+
+    async def update(self, session_id: str, mutate: Callable[[CartState], None],
+                     expected_version: Optional[int] = None) -> CartState:
+        from app.models.cart import Cart
+        for attempt in range(CART_UPDATE_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(random.uniform(0, CART_RETRY_BACKOFF * attempt))
+            current = await self.get(session_id)
+            if expected_version is not None and current.version != expected_version:
+                self.conflicts += 1
+                raise CartConflictError(f"Cart {session_id} is at version {current.version}, expected {expected_version}")
+
+            state = current.copy()
+            mutate(state)
+            state.version = current.version + 1
+
+            if current.version == 0:
+                try:
+                    await Cart.create(
+                        session_id=session_id,
+                        items=state.items,
+                        pending_order=state.pending_order,
+                        version=state.version
+                    )
+                    return state
+                except IntegrityError:
+                    # Another request created the cart first
+                    self.conflicts += 1
+                    continue
+
+            updated = await Cart.filter(session_id=session_id, version=current.version).update(
+                items=state.items,
+                pending_order=state.pending_order,
+                version=state.version,
+                updated_at=timezone.now()
+            )
+            if updated:
+                return state
+            self.conflicts += 1
+            if expected_version is not None:
+                raise CartConflictError(f"Cart {session_id} changed during update")
+
+        raise CartConflictError(f"Cart {session_id} kept changing, gave up after {CART_UPDATE_ATTEMPTS} attempts")
+
+    async def purge_expired(self) -> int:
+        from app.models.cart import Cart
+        cutoff = timezone.now() - timedelta(seconds=self.ttl_seconds)
+        removed = await Cart.filter(updated_at__lt=cutoff).delete()
+        self.purged += removed
+        return removed
+
+
+def create_cart_store(backend: str = CART_STORE) -> CartStore:
+    if backend == "memory":
+        return MemoryCartStore()
+    return PostgresCartStore()
+
+
+# Global cart store shared by all agents
+cart_store = create_cart_store()
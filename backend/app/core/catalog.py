@@ -0,0 +1,156 @@
+"""
+Menu catalog cache
+The menu changes a few times a day but is read on almost every chat turn, so each
+process keeps an immutable snapshot with lookup indexes and pre-rendered prompt text.
+"""
+import asyncio
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.core.cache_sync import cache_sync
+
+MENU_CACHE_NAME = "menu"
+
+
+def normalize_name(name: str) -> str:
+    """Lookup key for item names: lowercase, punctuation dropped, single spaces"""
+    return " ".join(re.sub(r"[^a-z0-9 ]", " ", name.lower()).split())
+
+
+@dataclass(frozen=True)
+class CatalogItem:
+    id: int
+    name: str
+    description: str
+    price: float
+    category: str
+    available: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Shape used by the menu tools' JSON output"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "price": self.price,
+            "description": self.description,
+            "category": self.category
+        }
+
+
+class MenuSnapshot:
+    """Immutable view of the menu. Replaced as a whole on reload, never mutated."""
+
+    def __init__(self, items: List[CatalogItem], version: int = 0):
+        self.version = version
+        self.loaded_at = time.time()
+        # Every item, so lookups by id still work for items taken off the menu
+        self.all_by_id: Dict[int, CatalogItem] = {item.id: item for item in items}
+
+        self.items: Tuple[CatalogItem, ...] = tuple(item for item in items if item.available)
+        self.by_id: Dict[int, CatalogItem] = {item.id: item for item in self.items}
+        self.by_name: Dict[str, CatalogItem] = {normalize_name(item.name): item for item in self.items}
+        by_category: Dict[str, List[CatalogItem]] = {}
+        for item in self.items:
+            by_category.setdefault(item.category.lower(), []).append(item)
+        self.by_category: Dict[str, Tuple[CatalogItem, ...]] = {
+            category: tuple(members) for category, members in by_category.items()
+        }
+
+        # Pre-rendered prompt fragments
+        self.menu_prompt = "\n".join(
+            f"- {item.name}: ${item.price:.2f} - {item.description}" for item in self.items
+        )
+        self.price_prompt = "\n".join(f"- {item.name}: ${item.price:.2f}" for item in self.items)
+        self.menu_display = "".join(
+            f"• {item.name} - ${item.price:.2f}\n  {item.description}\n\n" for item in self.items
+        )
+        self.api_rows = [asdict(item) for item in self.items]
+
+    def get(self, item_id: int) -> Optional[CatalogItem]:
+        """Any item by id, including unavailable ones"""
+        return self.all_by_id.get(item_id)
+
+    def lookup(self, key: Union[int, str]) -> Optional[CatalogItem]:
+        """Available item by id or by name, tolerating case, punctuation and plurals"""
+        if isinstance(key, int) or (isinstance(key, str) and key.strip().isdigit()):
+            return self.by_id.get(int(key))
+        name = normalize_name(key)
+        item = self.by_name.get(name)
+        if item is None and name.endswith("es"):
+            item = self.by_name.get(name[:-2])
+        if item is None and name.endswith("s"):
+            item = self.by_name.get(name[:-1])
+        return item
+
+    def find_in_text(self, text: str) -> List[CatalogItem]:
+        """Available items whose name appears in free text, in menu order"""
+        text = f" {normalize_name(text)} "
+        return [item for name, item in self.by_name.items() if f" {name}" in text]
+
+    def in_category(self, category: str) -> Tuple[CatalogItem, ...]:
+        """Available items whose category contains the given text (case-insensitive)"""
+        category = category.lower()
+        if category in self.by_category:
+            return self.by_category[category]
+        return tuple(item for item in self.items if category in item.category.lower())
+
+
+class MenuCatalog:
+    """Holds the current snapshot and reloads it when the menu version changes"""
+
+    def __init__(self):
+        self._snapshot: Optional[MenuSnapshot] = None
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+
+    async def load(self, version: Optional[int] = None) -> MenuSnapshot:
+        """Read the menu from the database and swap in a new snapshot"""
+        from app.models.menu import MenuItem
+        async with self._lock:
+            if version is None:
+                version = await cache_sync.version(MENU_CACHE_NAME)
+            rows = await MenuItem.all().order_by("id")
+            items = [
+                CatalogItem(
+                    id=row.id,
+                    name=row.name,
+                    description=row.description,
+                    price=float(row.price),
+                    category=row.category,
+                    available=row.available
+                )
+                for row in rows
+            ]
+            self._snapshot = MenuSnapshot(items, version)
+            cache_sync.mark_seen(MENU_CACHE_NAME, version)
+            self.reloads += 1
+            print(f"[CATALOG] Loaded {len(items)} menu items (version {version})")
+            return self._snapshot
+
+    async def get(self) -> MenuSnapshot:
+        """Current snapshot, loaded on first use"""
+        if self._snapshot is None:
+            return await self.load()
+        return self._snapshot
+
+    async def invalidate(self) -> MenuSnapshot:
+        """Call after writing menu rows: bumps the shared version and reloads locally"""
+        version = await cache_sync.bump(MENU_CACHE_NAME)
+        return await self.load(version)
+
+    def stats(self) -> Dict[str, Any]:
+        """Catalog statistics for the metrics endpoint"""
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "items": len(snapshot.items) if snapshot else 0,
+            "reloads": self.reloads
+        }
+
+
+# Global catalog instance, reloaded by cache_sync when another replica changes the menu
+menu_catalog = MenuCatalog()
+cache_sync.register(MENU_CACHE_NAME, menu_catalog.load)
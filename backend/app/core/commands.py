@@ -0,0 +1,248 @@
+"""
+Cart command fast path
+Unambiguous cart commands ("add two lattes", "show cart", "confirm") are parsed
+locally and run straight against the cart store. The model is only asked when the
+parse is not confident: unknown or ambiguous items, negations, questions, or
+anything else that needs understanding rather than matching.
+"""
+import difflib
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.cart_store import CartState, cart_store
+from app.core.catalog import CatalogItem, MenuSnapshot, normalize_name
+from app.core.orders import cart_summary, confirm_order
+
+# Parses at or above this confidence skip the model (set above 1 to always ask the model)
+COMMAND_MIN_CONFIDENCE = float(os.getenv("COMMAND_MIN_CONFIDENCE", "0.85"))
+# Item names closer than this (0-1) to a menu item are treated as that item
+COMMAND_FUZZY_CUTOFF = 0.8
+# Larger quantities are double-checked by the model
+COMMAND_MAX_QUANTITY = 20
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "a couple of": 2, "couple of": 2
+}
+_NUMBER = r"\d+|" + "|".join(sorted((re.escape(word) for word in NUMBER_WORDS), key=len, reverse=True))
+
+POLITE_PREFIX = re.compile(r"^(?:(?:please|pls|hey|hi|hello|ok|okay|so|and|also|now|can you|could you)[\s,]+)+")
+POLITE_SUFFIX = re.compile(r"(?:[\s,]+(?:please|pls|thanks|thank you|too|as well))+$")
+CART_SUFFIX = re.compile(r"\s+(?:to|into|in|from|out of|off) (?:my|the) (?:cart|order)$")
+ARTICLE = re.compile(r"^(?:the|my|our|some)\s+")
+NEGATION = re.compile(r"\b(?:don'?t|do not|not|no|never|instead|without|except|but)\b")
+
+CONFIRM = re.compile(r"^(?:(?:confirm|checkout|check out)(?: (?:my|the))?(?: order)?|(?:place|complete)(?: (?:my|the))? order)$")
+CLEAR = re.compile(r"^(?:clear|empty|reset)(?: (?:my|the))? cart$")
+SHOW_CART = re.compile(
+    r"^(?:(?:show|view|see|check|display)(?: me)?(?: (?:my|the))? cart|"
+    r"what'?s in (?:my|the) cart|(?:my )?cart(?: total)?|cart contents)$"
+)
+ADD = re.compile(
+    r"^(?:add|get me|give me|get|i'?ll have|i'?ll take|i want|i'?d like|"
+    r"can i (?:get|have)|could i (?:get|have)|order|buy|put)\s+(?P<items>.+)$"
+)
+REMOVE = re.compile(r"^(?:remove|delete|drop|take out|take off)\s+(?P<items>.+)$")
+
+ITEM_SEPARATOR = re.compile(r"\s*(?:,|&|\band\b|\bplus\b)\s*")
+QUANTITY_PREFIX = re.compile(rf"^(?P<quantity>{_NUMBER})(?:\s*x)?\s+(?:(?:cups?|shots?|orders?) of\s+)?(?P<name>.+)$")
+QUANTITY_SUFFIX = re.compile(r"^(?P<name>.+?)\s*x\s*(?P<quantity>\d+)$")
+
+
+@dataclass(frozen=True)
+class CommandLine:
+    item: CatalogItem
+    quantity: int
+    explicit_quantity: bool
+
+
+@dataclass(frozen=True)
+class Command:
+    """A parsed cart command; verb is None when the message is not one"""
+    verb: Optional[str] = None  # add, remove, show_cart, clear, confirm
+    lines: Tuple[CommandLine, ...] = ()
+    confidence: float = 0.0
+
+    @property
+    def confident(self) -> bool:
+        return self.verb is not None and self.confidence >= COMMAND_MIN_CONFIDENCE
+
+    @property
+    def action(self) -> str:
+        """The command in the ADD:/REMOVE:/SHOW_CART form the order prompts ask the model for"""
+        if self.verb == "add":
+            return "ADD: " + ", ".join(f"{line.quantity}x {line.item.name}" for line in self.lines)
+        if self.verb == "remove":
+            return "REMOVE: " + ", ".join(line.item.name for line in self.lines)
+        return (self.verb or "clarify").upper()
+
+
+def _clean(text: str) -> str:
+    # Commas and ampersands survive as item separators ("espresso, mocha & a latte")
+    text = re.sub(r"[^a-z0-9'&, ]", " ", text.lower().replace("’", "'"))
+    text = re.sub(r"\s*,[\s,]*", ", ", re.sub(r"\s*&[\s&]*", " & ", text)).strip(" ,&")
+    text = " ".join(text.split())
+    text = POLITE_PREFIX.sub("", text)
+    return POLITE_SUFFIX.sub("", text).strip(" ,&")
+
+
+class CommandParser:
+    """Rule-based cart command parser with fuzzy item matching against the menu snapshot"""
+
+    def __init__(self):
+        # Fuzzy matches of the current snapshot, reset when the menu version changes
+        self._matches: Dict[str, Tuple[Optional[CatalogItem], float]] = {}
+        self._matches_version: Optional[int] = None
+        self.fast = 0
+        self.to_model = 0
+        self.not_commands = 0
+
+    def _match(self, name: str, menu: MenuSnapshot) -> Tuple[Optional[CatalogItem], float]:
+        """Menu item for a name and how sure we are about it"""
+        item = menu.lookup(name)
+        if item is not None:
+            return item, 1.0
+        if self._matches_version != menu.version:
+            self._matches = {}
+            self._matches_version = menu.version
+        key = normalize_name(name)
+        if key not in self._matches:
+            scores = sorted(
+                ((difflib.SequenceMatcher(None, key, candidate).ratio(), candidate) for candidate in menu.by_name),
+                reverse=True
+            )
+            result: Tuple[Optional[CatalogItem], float] = (None, 0.0)
+            if scores and scores[0][0] >= COMMAND_FUZZY_CUTOFF:
+                best_score, best = scores[0]
+                # Two names about as close as each other: ambiguous, let the model ask
+                if len(scores) > 1 and best_score - scores[1][0] < 0.05:
+                    best_score = min(best_score, COMMAND_MIN_CONFIDENCE - 0.01)
+                result = (menu.by_name[best], best_score)
+            if len(self._matches) < 1000:
+                self._matches[key] = result
+            return result
+        return self._matches[key]
+
+    def _lines(self, text: str, menu: MenuSnapshot) -> Tuple[Tuple[CommandLine, ...], float]:
+        lines: List[CommandLine] = []
+        confidence = 1.0
+        for part in ITEM_SEPARATOR.split(CART_SUFFIX.sub("", text)):
+            if not part:
+                continue
+            quantity, explicit, name = 1, False, part
+            match = QUANTITY_PREFIX.match(part) or QUANTITY_SUFFIX.match(part)
+            if match:
+                word = match.group("quantity")
+                quantity = int(word) if word.isdigit() else NUMBER_WORDS[word]
+                explicit = True
+                name = match.group("name")
+            item, score = self._match(ARTICLE.sub("", name), menu)
+            if item is None or not 0 < quantity <= COMMAND_MAX_QUANTITY:
+                return (), 0.0
+            lines.append(CommandLine(item, quantity, explicit))
+            confidence = min(confidence, score)
+        return tuple(lines), confidence
+
+    def _parse(self, message: str, menu: MenuSnapshot) -> Command:
+        text = _clean(message)
+        if not text:
+            return Command()
+        if CONFIRM.match(text):
+            return Command("confirm", confidence=1.0)
+        if CLEAR.match(text):
+            return Command("clear", confidence=1.0)
+        if SHOW_CART.match(text):
+            return Command("show_cart", confidence=1.0)
+
+        for verb, pattern in (("add", ADD), ("remove", REMOVE)):
+            match = pattern.match(text)
+            if match:
+                if NEGATION.search(text):
+                    return Command(verb)
+                lines, confidence = self._lines(match.group("items"), menu)
+                return Command(verb, lines, confidence) if lines else Command(verb)
+
+        # A counted item list ("2 lattes and a mocha") is an order, unless it is a question
+        if QUANTITY_PREFIX.match(text) and not NEGATION.search(text) and "?" not in message:
+            lines, confidence = self._lines(text, menu)
+            if lines:
+                return Command("add", lines, confidence)
+        return Command()
+
+    def parse(self, message: str, menu: MenuSnapshot) -> Command:
+        """Parse a chat message into a cart command"""
+        command = self._parse(message, menu)
+        if command.confident:
+            self.fast += 1
+        elif command.verb is not None:
+            self.to_model += 1
+        else:
+            self.not_commands += 1
+        return command
+
+    def stats(self) -> Dict[str, Any]:
+        """Fast path statistics for the metrics endpoint"""
+        commands = self.fast + self.to_model
+        return {
+            "fast": self.fast,
+            "to_model": self.to_model,
+            "not_commands": self.not_commands,
+            "fast_ratio": round(self.fast / commands, 3) if commands else 0.0,
+            "min_confidence": COMMAND_MIN_CONFIDENCE
+        }
+
+
+async def execute_command(command: Command, session_id: str) -> str:
+    """Run a confident command against the session's cart and describe the result"""
+    if command.verb == "add":
+        def mutate(cart: CartState) -> None:
+            for line in command.lines:
+                key = str(line.item.id)
+                cart.items[key] = cart.items.get(key, 0) + line.quantity
+
+        # All lines in one cart write
+        await cart_store.update(session_id, mutate)
+        added = " and ".join(f"{line.quantity}x {line.item.name}" for line in command.lines)
+        return f"Added {added} to your cart! Say 'show cart' to see your total."
+
+    if command.verb == "remove":
+        removed = []
+        missing = []
+
+        def mutate(cart: CartState) -> None:
+            removed.clear()
+            missing.clear()
+            for line in command.lines:
+                key = str(line.item.id)
+                if key not in cart.items:
+                    missing.append(line.item.name)
+                    continue
+                remaining = cart.items[key] - line.quantity if line.explicit_quantity else 0
+                if remaining > 0:
+                    cart.items[key] = remaining
+                else:
+                    del cart.items[key]
+                removed.append(line.item.name)
+
+        await cart_store.update(session_id, mutate)
+        parts = []
+        if removed:
+            parts.append(f"Removed {', '.join(removed)} from your cart.")
+        if missing:
+            parts.append(f"{', '.join(missing)} {'is' if len(missing) == 1 else 'are'} not in your cart.")
+        return " ".join(parts)
+
+    if command.verb == "clear":
+        await cart_store.clear(session_id)
+        return "Your cart is now empty."
+
+    if command.verb == "confirm":
+        return await confirm_order(session_id)
+
+    return await cart_summary(session_id)
+
+
+# Global command parser
+command_parser = CommandParser()
@@ -0,0 +1,107 @@
+"""
+Instrumented asyncpg pool
+A Tortoise engine ("app.core.db_pool") wrapping the stock asyncpg client so that
+waiting for a pooled connection is bounded and measured: an exhausted pool fails
+fast with a clear error instead of surfacing as a request timeout somewhere else.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+import asyncpg
+from tortoise.backends.asyncpg.client import AsyncpgDBClient
+from tortoise.exceptions import DBConnectionError
+
+# Seconds a query waits for a free connection before failing with a pool-exhausted error
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10"))
+
+
+class PoolExhaustedError(DBConnectionError):
+    """No pooled connection became free within DB_POOL_ACQUIRE_TIMEOUT"""
+
+
+class PoolMetrics:
+    """Acquire statistics of the process' database pool"""
+
+    def __init__(self):
+        self.pool: Optional[asyncpg.Pool] = None
+        self.waiting = 0
+        self.acquires = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float) -> None:
+        self.acquires += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics for the metrics and readiness endpoints"""
+        pool = self.pool
+        if pool is None:
+            return {"connected": False}
+        size = pool.get_size()
+        idle = pool.get_idle_size()
+        max_size = pool.get_max_size()
+        in_use = size - idle
+        return {
+            "connected": True,
+            "min_size": pool.get_min_size(),
+            "max_size": max_size,
+            "size": size,
+            "idle": idle,
+            "in_use": in_use,
+            "waiting": self.waiting,
+            "saturation": round(in_use / max_size, 3) if max_size else 0.0,
+            "acquires": self.acquires,
+            "acquire_timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.acquires * 1000, 2) if self.acquires else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2)
+        }
+
+
+class InstrumentedPool:
+    """asyncpg pool whose acquire() is timed and bounded; everything else is passed through"""
+
+    def __init__(self, pool: asyncpg.Pool, metrics: PoolMetrics, acquire_timeout: float = DB_POOL_ACQUIRE_TIMEOUT):
+        self._pool = pool
+        self._metrics = metrics
+        self.acquire_timeout = acquire_timeout
+
+    async def acquire(self):
+        metrics = self._metrics
+        start = time.perf_counter()
+        metrics.waiting += 1
+        try:
+            connection = await self._pool.acquire(timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            metrics.timeouts += 1
+            raise PoolExhaustedError(
+                f"Database pool exhausted: all {self._pool.get_max_size()} connections busy "
+                f"for {self.acquire_timeout:g}s ({metrics.waiting - 1} other queries waiting)"
+            )
+        finally:
+            metrics.waiting -= 1
+        metrics.record(time.perf_counter() - start)
+        return connection
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pool, name)
+
+
+class PooledAsyncpgClient(AsyncpgDBClient):
+    """Stock asyncpg client using an InstrumentedPool"""
+
+    async def create_pool(self, **kwargs) -> InstrumentedPool:
+        pool = await super().create_pool(**kwargs)
+        db_pool_metrics.pool = pool
+        return InstrumentedPool(pool, db_pool_metrics)
+
+
+# Global pool metrics
+db_pool_metrics = PoolMetrics()
+
+# Tortoise looks up the client class of an engine module under this name
+client_class = PooledAsyncpgClient
@@ -1,9 +1,15 @@
+import asyncio
 import os
+import time
 import aiosmtplib
+from dataclasses import dataclass
+from email.message import Message
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 from datetime import datetime
+from app.core import email_templates
+from app.core.email_templates import RenderedEmail
 
 # SMTP Configuration
 SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
@@ -13,6 +19,186 @@ SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_FROM_EMAIL = os.getenv("SMTP_FROM_EMAIL", SMTP_USER)
 SMTP_FROM_NAME = os.getenv("SMTP_FROM_NAME", "Coffee and AI")
 
+# Authenticated SMTP sessions kept open per process
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+# Messages sent over one session before it is replaced (providers cap this)
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+# Idle sessions older than this are closed instead of reused (servers drop them)
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "60"))
+# Provider send rate limit in messages per second, 0 for none
+SMTP_RATE_LIMIT = float(os.getenv("SMTP_RATE_LIMIT", "10"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+# Errors after which a session cannot be reused
+_CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    ConnectionError,
+    OSError
+)
+
+
+@dataclass
+class DeliveryResult:
+    """Outcome of one message of a batch"""
+    email: str
+    sent: bool
+    error: Optional[str] = None
+
+
+class _RateLimiter:
+    """Spaces sends evenly so a batch never exceeds the provider's rate"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(time.monotonic(), self._next) + 1.0 / self.rate
+
+
+class _PooledConnection:
+    __slots__ = ("smtp", "messages", "last_used")
+
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+    """Reuses authenticated SMTP sessions so each message skips connect, STARTTLS and AUTH"""
+
+    def __init__(
+        self,
+        size: int = SMTP_POOL_SIZE,
+        max_messages: int = SMTP_MAX_MESSAGES_PER_CONNECTION,
+        idle_timeout: float = SMTP_IDLE_TIMEOUT,
+        rate_limit: float = SMTP_RATE_LIMIT
+    ):
+        self.size = size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[_PooledConnection] = []
+        self._rate = _RateLimiter(rate_limit)
+        self.open_connections = 0
+        self.connects = 0
+        self.reconnects = 0
+        self.sent = 0
+        self.failed = 0
+
+    async def _connect(self) -> _PooledConnection:
+        smtp = aiosmtplib.SMTP(hostname=SMTP_HOST, port=SMTP_PORT, start_tls=True, timeout=SMTP_TIMEOUT)
+        await smtp.connect()
+        try:
+            if SMTP_USER:
+                await smtp.login(SMTP_USER, SMTP_PASSWORD)
+        except Exception:
+            smtp.close()
+            raise
+        self.open_connections += 1
+        self.connects += 1
+        return _PooledConnection(smtp)
+
+    async def _close(self, conn: _PooledConnection) -> None:
+        self.open_connections -= 1
+        try:
+            await conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+    async def _acquire(self) -> _PooledConnection:
+        """Take a slot and a live session; the caller must hand both back with _release()"""
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                conn = self._idle.pop()
+                if conn.smtp.is_connected and time.monotonic() - conn.last_used < self.idle_timeout:
+                    return conn
+                await self._close(conn)
+            return await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def _release(self, conn: _PooledConnection, reusable: bool) -> None:
+        try:
+            if reusable and conn.smtp.is_connected and conn.messages < self.max_messages:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+            else:
+                await self._close(conn)
+        finally:
+            self._slots.release()
+
+    async def send(self, message: Message) -> None:
+        """Send one message, reconnecting once if the pooled session went stale"""
+        await self._rate.wait()
+        for attempt in range(2):
+            conn = await self._acquire()
+            try:
+                await conn.smtp.send_message(message)
+            except _CONNECTION_ERRORS:
+                await self._release(conn, reusable=False)
+                if attempt:
+                    self.failed += 1
+                    raise
+                self.reconnects += 1
+                continue
+            except BaseException:
+                # Recipient or content errors leave the session usable
+                self.failed += 1
+                await self._release(conn, reusable=True)
+                raise
+            conn.messages += 1
+            self.sent += 1
+            await self._release(conn, reusable=True)
+            return
+
+    async def close(self) -> None:
+        """Close idle sessions, on application shutdown"""
+        while self._idle:
+            await self._close(self._idle.pop())
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics for the metrics endpoint"""
+        return {
+            "size": self.size,
+            "open_connections": self.open_connections,
+            "idle_connections": len(self._idle),
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "sent": self.sent,
+            "failed": self.failed,
+            "rate_limit_per_second": self._rate.rate
+        }
+
+
+# Global SMTP pool shared by every sender
+smtp_pool = SMTPPool()
+
+
+def _build_message(to_email: str, subject: str, html_content: str, text_content: Optional[str] = None) -> MIMEMultipart:
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = f"{SMTP_FROM_NAME} <{SMTP_FROM_EMAIL}>"
+    message["To"] = to_email
+    
+    # Add text and HTML parts
+    if text_content:
+        message.attach(MIMEText(text_content, "plain"))
+    message.attach(MIMEText(html_content, "html"))
+    return message
+
 async def send_email(
     to_email: str,
     subject: str,
@@ -21,107 +207,42 @@ async def send_email(
 ) -> bool:
     """Send an email via Gmail SMTP"""
     try:
-        # Create message
-        message = MIMEMultipart("alternative")
-        message["Subject"] = subject
-        message["From"] = f"{SMTP_FROM_NAME} <{SMTP_FROM_EMAIL}>"
-        message["To"] = to_email
-        
-        # Add text and HTML parts
-        if text_content:
-            part1 = MIMEText(text_content, "plain")
-            message.attach(part1)
-        
-        part2 = MIMEText(html_content, "html")
-        message.attach(part2)
-        
-        # Send email
-        await aiosmtplib.send(
-            message,
-            hostname=SMTP_HOST,
-            port=SMTP_PORT,
-            username=SMTP_USER,
-            password=SMTP_PASSWORD,
-            start_tls=True
-        )
-        
+        await smtp_pool.send(_build_message(to_email, subject, html_content, text_content))
         return True
     except Exception as e:
         print(f"Error sending email: {str(e)}")
         return False
 
+async def send_email_batch(
+    recipients: Iterable[str],
+    subject: str,
+    html_content: str,
+    text_content: Optional[str] = None,
+    concurrency: Optional[int] = None
+) -> List[DeliveryResult]:
+    """Send the same email to many recipients over the pool, one result per recipient.
+
+    Concurrency defaults to the pool size; the pool's rate limit still applies.
+    """
+    semaphore = asyncio.Semaphore(concurrency or smtp_pool.size)
+
+    async def deliver(to_email: str) -> DeliveryResult:
+        async with semaphore:
+            try:
+                await smtp_pool.send(_build_message(to_email, subject, html_content, text_content))
+                return DeliveryResult(to_email, True)
+            except Exception as e:
+                print(f"Error sending email to {to_email}: {str(e)}")
+                return DeliveryResult(to_email, False, str(e) or type(e).__name__)
+
+    return list(await asyncio.gather(*(deliver(to_email) for to_email in recipients)))
+
+async def send_rendered_email(to_email: str, email: RenderedEmail) -> bool:
+    return await send_email(to_email, email.subject, email.html, email.text)
+
 async def send_welcome_email(user_email: str, username: str) -> bool:
     """Send welcome email to new user"""
-    subject = "Welcome to Coffee and AI! ☕"
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: linear-gradient(135deg, #6B4423 0%, #8B6F47 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-            .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
-            .button {{ display: inline-block; padding: 12px 30px; background: #6B4423; color: white; text-decoration: none; border-radius: 5px; margin: 20px 0; }}
-            .footer {{ text-align: center; margin-top: 30px; color: #666; font-size: 12px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>☕ Welcome to Coffee and AI!</h1>
-            </div>
-            <div class="content">
-                <h2>Hello {username}! 👋</h2>
-                <p>Thank you for joining Coffee and AI - where intelligence meets espresso!</p>
-                
-                <p>Your account has been successfully created. You can now:</p>
-                <ul>
-                    <li>🤖 Chat with our AI-powered barista</li>
-                    <li>☕ Browse our menu and place orders</li>
-                    <li>📊 Track your order history</li>
-                    <li>⭐ Get personalized recommendations</li>
-                </ul>
-                
-                <p>Our AI assistant uses cutting-edge LangChain and LangGraph technology to provide you with the best coffee ordering experience.</p>
-                
-                <a href="http://localhost:3000" class="button">Start Ordering Now</a>
-                
-                <p>If you have any questions, feel free to reach out to our support team.</p>
-                
-                <p>Enjoy your coffee journey!</p>
-                <p><strong>The Coffee and AI Team</strong></p>
-            </div>
-            <div class="footer">
-                <p>© 2024 Coffee and AI. All rights reserved.</p>
-                <p>Built with LangChain, LangGraph, and Amazon Nova</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    text_content = f"""
-    Welcome to Coffee and AI!
-    
-    Hello {username}!
-    
-    Thank you for joining Coffee and AI - where intelligence meets espresso!
-    
-    Your account has been successfully created. You can now:
-    - Chat with our AI-powered barista
-    - Browse our menu and place orders
-    - Track your order history
-    - Get personalized recommendations
-    
-    Visit http://localhost:3000 to start ordering!
-    
-    Enjoy your coffee journey!
-    The Coffee and AI Team
-    """
-    
-    return await send_email(user_email, subject, html_content, text_content)
+    return await send_rendered_email(user_email, email_templates.WELCOME.render(username=username))
 
 async def send_order_confirmation_email(
     user_email: str,
@@ -131,120 +252,20 @@ async def send_order_confirmation_email(
     total: float
 ) -> bool:
     """Send order confirmation email"""
-    subject = f"Order Confirmation #{order_id} - Coffee and AI ☕"
-    
     # Calculate subtotal and tax
     subtotal = total / 1.08  # Remove tax to get subtotal
     tax = total - subtotal
     
-    items_html = ""
-    for item in items:
-        items_html += f"""
-        <tr>
-            <td style="padding: 10px; border-bottom: 1px solid #ddd;">{item['name']}</td>
-            <td style="padding: 10px; border-bottom: 1px solid #ddd; text-align: center;">{item['quantity']}</td>
-            <td style="padding: 10px; border-bottom: 1px solid #ddd; text-align: right;">${item['price']:.2f}</td>
-            <td style="padding: 10px; border-bottom: 1px solid #ddd; text-align: right;">${item['price'] * item['quantity']:.2f}</td>
-        </tr>
-        """
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: linear-gradient(135deg, #6B4423 0%, #8B6F47 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-            .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
-            .order-box {{ background: white; padding: 20px; border-radius: 5px; margin: 20px 0; }}
-            table {{ width: 100%; border-collapse: collapse; }}
-            .subtotal-row {{ font-size: 14px; }}
-            .tax-row {{ font-size: 14px; color: #666; }}
-            .total-row {{ font-weight: bold; font-size: 18px; border-top: 2px solid #333; }}
-            .footer {{ text-align: center; margin-top: 30px; color: #666; font-size: 12px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>🎉 Order Confirmed!</h1>
-                <p>Order #{order_id}</p>
-            </div>
-            <div class="content">
-                <h2>Thank you, {username}!</h2>
-                <p>Your order has been confirmed and is being prepared by our AI-powered barista system.</p>
-                
-                <div class="order-box">
-                    <h3>Order Details</h3>
-                    <table>
-                        <thead>
-                            <tr style="background: #f0f0f0;">
-                                <th style="padding: 10px; text-align: left;">Item</th>
-                                <th style="padding: 10px; text-align: center;">Qty</th>
-                                <th style="padding: 10px; text-align: right;">Price</th>
-                                <th style="padding: 10px; text-align: right;">Total</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            {items_html}
-                            <tr class="subtotal-row">
-                                <td colspan="3" style="padding: 10px; text-align: right;">Subtotal:</td>
-                                <td style="padding: 10px; text-align: right;">${subtotal:.2f}</td>
-                            </tr>
-                            <tr class="tax-row">
-                                <td colspan="3" style="padding: 10px; text-align: right;">Tax (8%):</td>
-                                <td style="padding: 10px; text-align: right;">${tax:.2f}</td>
-                            </tr>
-                            <tr class="total-row">
-                                <td colspan="3" style="padding: 15px; text-align: right;">Total:</td>
-                                <td style="padding: 15px; text-align: right;">${total:.2f}</td>
-                            </tr>
-                        </tbody>
-                    </table>
-                </div>
-                
-                <p><strong>⏱️ Estimated preparation time:</strong> 5-10 minutes</p>
-                <p><strong>📍 Pickup location:</strong> Main Counter</p>
-                
-                <p>We'll notify you when your order is ready!</p>
-                
-                <p>Thank you for choosing Coffee and AI!</p>
-            </div>
-            <div class="footer">
-                <p>© 2024 Coffee and AI. All rights reserved.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    items_text = "\n".join([
-        f"  {item['name']} x{item['quantity']} - ${item['price'] * item['quantity']:.2f}"
-        for item in items
-    ])
-    
-    text_content = f"""
-    Order Confirmed! Order #{order_id}
-    
-    Thank you, {username}!
-    
-    Your order has been confirmed and is being prepared.
-    
-    Order Details:
-    {items_text}
-    
-    Subtotal: ${subtotal:.2f}
-    Tax (8%): ${tax:.2f}
-    Total: ${total:.2f}
-    
-    Estimated preparation time: 5-10 minutes
-    Pickup location: Main Counter
-    
-    Thank you for choosing Coffee and AI!
-    """
-    
-    return await send_email(user_email, subject, html_content, text_content)
+    items_html, items_text = email_templates.order_item_rows(items)
+    return await send_rendered_email(user_email, email_templates.ORDER_CONFIRMATION.render(
+        username=username,
+        order_id=order_id,
+        items_html=items_html,
+        items_text=items_text,
+        subtotal=subtotal,
+        tax=tax,
+        total=total
+    ))
 
 async def send_order_ready_email(
     user_email: str,
@@ -252,58 +273,9 @@ async def send_order_ready_email(
     order_id: int
 ) -> bool:
     """Send order ready notification email"""
-    subject = f"Your Order #{order_id} is Ready! ☕"
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: linear-gradient(135deg, #10B981 0%, #059669 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-            .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; text-align: center; }}
-            .ready-icon {{ font-size: 60px; margin: 20px 0; }}
-            .footer {{ text-align: center; margin-top: 30px; color: #666; font-size: 12px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>✅ Order Ready!</h1>
-            </div>
-            <div class="content">
-                <div class="ready-icon">☕</div>
-                <h2>Hi {username}!</h2>
-                <p style="font-size: 18px;">Your order <strong>#{order_id}</strong> is ready for pickup!</p>
-                
-                <p>Please proceed to the main counter to collect your order.</p>
-                
-                <p style="margin-top: 30px;">Enjoy your coffee! ☕</p>
-            </div>
-            <div class="footer">
-                <p>© 2024 Coffee and AI. All rights reserved.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    text_content = f"""
-    Order Ready!
-    
-    Hi {username}!
-    
-    Your order #{order_id} is ready for pickup!
-    
-    Please proceed to the main counter to collect your order.
-    
-    Enjoy your coffee!
-    
-    Coffee and AI Team
-    """
-    
-    return await send_email(user_email, subject, html_content, text_content)
+    return await send_rendered_email(
+        user_email, email_templates.ORDER_READY.render(username=username, order_id=order_id)
+    )
 
 async def send_admin_notification(
     subject: str,
@@ -311,35 +283,11 @@ async def send_admin_notification(
     admin_emails: List[str]
 ) -> bool:
     """Send notification to admin users"""
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: #1F2937; color: white; padding: 20px; text-align: center; }}
-            .content {{ background: #f9f9f9; padding: 30px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h2>🔔 Admin Notification</h2>
-            </div>
-            <div class="content">
-                <p><strong>Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                <p>{message}</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    success = True
-    for admin_email in admin_emails:
-        result = await send_email(admin_email, subject, html_content, message)
-        if not result:
-            success = False
-    
-    return success
+    # Rendered once for every admin
+    email = email_templates.ADMIN_NOTIFICATION.render(
+        subject=subject,
+        message=message,
+        time=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    )
+    results = await send_email_batch(admin_emails, email.subject, email.html, email.text)
+    return all(result.sent for result in results)
@@ -0,0 +1,195 @@
+"""
+Bulk email jobs
+Admin campaigns run in the background: recipients are read from the database a page
+at a time and progress is checkpointed after every page, so a job survives restarts
+and any replica can resume it.
+"""
+import asyncio
+import os
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from tortoise import timezone
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
+
+from app.core.email import send_email_batch
+
+# Recipients loaded and sent per page (progress is saved after each page)
+EMAIL_JOB_PAGE_SIZE = int(os.getenv("EMAIL_JOB_PAGE_SIZE", "200"))
+# Fallback poll for jobs queued on other replicas or abandoned by a dead one
+EMAIL_JOB_POLL_INTERVAL = float(os.getenv("EMAIL_JOB_POLL_INTERVAL", "5"))
+# A running job whose lease is not renewed within this time is resumed elsewhere
+EMAIL_JOB_LEASE_SECONDS = int(os.getenv("EMAIL_JOB_LEASE_SECONDS", "300"))
+# Per-recipient failures kept on the job for the progress endpoint
+EMAIL_JOB_MAX_ERRORS = 100
+
+
+def job_progress(job) -> Dict[str, Any]:
+    """Progress payload of GET /api/admin/email/jobs/{id}"""
+    processed = job.sent + job.failed
+    elapsed = None
+    if job.started_at:
+        elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "subject": job.subject,
+        "total": job.total,
+        "sent": job.sent,
+        "failed": job.failed,
+        "remaining": max(job.total - processed, 0),
+        "throughput_per_second": round(processed / elapsed, 2) if elapsed else 0.0,
+        "elapsed_seconds": round(elapsed, 1) if elapsed is not None else None,
+        "errors": job.errors,
+        "last_error": job.last_error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+class EmailJobRunner:
+    """Creates bulk email jobs and runs them one at a time per replica"""
+
+    def __init__(self, page_size: int = EMAIL_JOB_PAGE_SIZE, poll_interval: float = EMAIL_JOB_POLL_INTERVAL):
+        self.page_size = page_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self.current_job: Optional[int] = None
+        self.jobs_completed = 0
+        self.jobs_resumed = 0
+        self.errors = 0
+
+    async def create(self, user_ids: List[int], subject: str, html_content: str,
+                     text_content: Optional[str] = None, created_by=None):
+        """Queue a job and wake the runner; returns the job, or None if no recipient is active"""
+        from app.models.email_job import EmailJob
+        from app.models.user import User
+        user_ids = sorted(set(user_ids))
+        total = await User.filter(id__in=user_ids, is_active=True).count()
+        if not total:
+            return None
+        job = await EmailJob.create(
+            subject=subject,
+            html_content=html_content,
+            text_content=text_content,
+            user_ids=user_ids,
+            total=total,
+            created_by=created_by
+        )
+        self._wakeup.set()
+        return job
+
+    async def _claim(self):
+        """Lease the oldest queued job, or a running one whose replica stopped renewing it"""
+        from app.models.email_job import EmailJob, EmailJobStatus
+        now = timezone.now()
+        async with in_transaction() as connection:
+            job = await (
+                EmailJob.filter(
+                    Q(status=EmailJobStatus.QUEUED)
+                    | Q(status=EmailJobStatus.RUNNING, locked_until__lt=now)
+                )
+                .order_by("id")
+                .select_for_update(skip_locked=True)
+                .using_db(connection)
+                .first()
+            )
+            if job is None:
+                return None
+            if job.status == EmailJobStatus.RUNNING:
+                self.jobs_resumed += 1
+                print(f"[EMAIL JOB] Resuming job {job.id} after user {job.cursor}")
+            job.status = EmailJobStatus.RUNNING
+            job.started_at = job.started_at or now
+            job.locked_until = now + timedelta(seconds=EMAIL_JOB_LEASE_SECONDS)
+            await job.save(using_db=connection, update_fields=["status", "started_at", "locked_until"])
+        return job
+
+    async def _run_job(self, job) -> None:
+        from app.models.email_job import EmailJob, EmailJobStatus
+        from app.models.user import User
+        self.current_job = job.id
+        try:
+            while True:
+                # Keyset page over the recipients, never the whole list at once
+                page = await (
+                    User.filter(id__in=job.user_ids, is_active=True, id__gt=job.cursor)
+                    .order_by("id")
+                    .limit(self.page_size)
+                    .values("id", "email")
+                )
+                if not page:
+                    break
+
+                results = await send_email_batch(
+                    [row["email"] for row in page], job.subject, job.html_content, job.text_content
+                )
+                sent = sum(1 for result in results if result.sent)
+                errors = job.errors + [
+                    {"email": result.email, "error": result.error} for result in results if not result.sent
+                ]
+
+                job.sent += sent
+                job.failed += len(results) - sent
+                job.cursor = page[-1]["id"]
+                job.errors = errors[-EMAIL_JOB_MAX_ERRORS:]
+                job.locked_until = timezone.now() + timedelta(seconds=EMAIL_JOB_LEASE_SECONDS)
+                await job.save(update_fields=["sent", "failed", "cursor", "errors", "locked_until"])
+
+            job.status = EmailJobStatus.COMPLETED
+            job.finished_at = timezone.now()
+            job.locked_until = None
+            await job.save(update_fields=["status", "finished_at", "locked_until"])
+            self.jobs_completed += 1
+            print(f"[EMAIL JOB] Job {job.id} completed: {job.sent} sent, {job.failed} failed")
+        except asyncio.CancelledError:
+            # Shutdown: the lease expires and the job resumes from its cursor
+            raise
+        except Exception as e:
+            self.errors += 1
+            print(f"[EMAIL JOB] Job {job.id} failed: {str(e)}")
+            await EmailJob.filter(id=job.id).update(
+                status=EmailJobStatus.FAILED, last_error=str(e), finished_at=timezone.now(), locked_until=None
+            )
+        finally:
+            self.current_job = None
+
+    async def run_once(self) -> bool:
+        """Run the next available job to completion; returns False if there was none"""
+        job = await self._claim()
+        if job is None:
+            return False
+        await self._run_job(job)
+        return True
+
+    async def run(self) -> None:
+        """Background loop, started on application startup"""
+        while True:
+            try:
+                while await self.run_once():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"[EMAIL JOB] Runner failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Runner statistics for the metrics endpoint"""
+        return {
+            "current_job": self.current_job,
+            "jobs_completed": self.jobs_completed,
+            "jobs_resumed": self.jobs_resumed,
+            "errors": self.errors
+        }
+
+
+# Global job runner
+email_jobs = EmailJobRunner()
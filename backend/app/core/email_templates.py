@@ -0,0 +1,294 @@
+"""
+Email templates
+Each email is declared once as a list of blocks and compiled at import time into an
+HTML and a plain-text template sharing one layout. The layout, CSS and all static
+text are joined ahead of time, so rendering only formats and escapes the fields.
+"""
+import html
+from dataclasses import dataclass
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class Markup(str):
+    """Pre-rendered HTML inserted into a template without escaping"""
+
+
+class CompiledTemplate:
+    """str.format-style template parsed once into static chunks and fields"""
+
+    def __init__(self, source: str):
+        parts: List[Tuple[str, Optional[str], str]] = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if conversion:
+                raise ValueError(f"Conversions are not supported in email templates: {{{field}!{conversion}}}")
+            parts.append((literal, field, spec or ""))
+        self._parts = tuple(parts)
+        self.fields = frozenset(field for _, field, _ in parts if field)
+
+    def render(self, values: Dict[str, Any], escape: bool = False) -> str:
+        out = []
+        for literal, field, spec in self._parts:
+            out.append(literal)
+            if field is None:
+                continue
+            value = values[field]
+            text = format(value, spec)
+            if escape and not isinstance(value, Markup):
+                text = html.escape(text)
+            out.append(text)
+        return "".join(out)
+
+
+@dataclass(frozen=True)
+class Block:
+    """One piece of an email body, written once and rendered to both HTML and text"""
+    html: str
+    text: str
+
+
+def heading(text: str) -> Block:
+    return Block(f"<h2>{text}</h2>", text)
+
+
+def paragraph(text: str, style: str = "") -> Block:
+    style_attr = f' style="{style}"' if style else ""
+    return Block(f"<p{style_attr}>{text}</p>", text)
+
+
+def bullets(items: Iterable[str]) -> Block:
+    items = list(items)
+    return Block(
+        "<ul>" + "".join(f"<li>{item}</li>" for item in items) + "</ul>",
+        "\n".join(f"- {item}" for item in items)
+    )
+
+
+def button(label: str, url: str) -> Block:
+    return Block(f'<a href="{url}" class="button">{label}</a>', f"{label}: {url}")
+
+
+def signature(text: str) -> Block:
+    return Block(f"<p><strong>{text}</strong></p>", text)
+
+
+def raw(html_source: str, text_source: str) -> Block:
+    return Block(html_source, text_source)
+
+
+# Header colours
+THEMES = {
+    "coffee": "background: linear-gradient(135deg, #6B4423 0%, #8B6F47 100%); border-radius: 10px 10px 0 0;",
+    "success": "background: linear-gradient(135deg, #10B981 0%, #059669 100%); border-radius: 10px 10px 0 0;",
+    "admin": "background: #1F2937;"
+}
+
+_LAYOUT_CSS = """
+            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+            .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+            .header { color: white; padding: 30px; text-align: center; %(theme)s }
+            .content { background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px;%(content_style)s }
+            .button { display: inline-block; padding: 12px 30px; background: #6B4423; color: white; text-decoration: none; border-radius: 5px; margin: 20px 0; }
+            .order-box { background: white; padding: 20px; border-radius: 5px; margin: 20px 0; }
+            table { width: 100%%; border-collapse: collapse; }
+            .subtotal-row { font-size: 14px; }
+            .tax-row { font-size: 14px; color: #666; }
+            .total-row { font-weight: bold; font-size: 18px; border-top: 2px solid #333; }
+            .ready-icon { font-size: 60px; margin: 20px 0; }
+            .footer { text-align: center; margin-top: 30px; color: #666; font-size: 12px; }
+"""
+
+_DEFAULT_FOOTER = ("© 2024 Coffee and AI. All rights reserved.",)
+
+
+def _escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _layout_html(title: str, subtitle: Optional[str], body: str, theme: str,
+                 centered: bool, footer: Tuple[str, ...]) -> str:
+    css = _LAYOUT_CSS % {"theme": THEMES[theme], "content_style": " text-align: center;" if centered else ""}
+    subtitle_html = f"\n                <p>{subtitle}</p>" if subtitle else ""
+    footer_html = "".join(f"\n                <p>{line}</p>" for line in footer)
+    return f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>{_escape_braces(css)}        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>{title}</h1>{subtitle_html}
+            </div>
+            <div class="content">
+                {body}
+            </div>
+            <div class="footer">{footer_html}
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+
+@dataclass(frozen=True)
+class RenderedEmail:
+    subject: str
+    html: str
+    text: str
+
+
+class EmailTemplate:
+    """Subject, HTML and text of one email, compiled once from a single block list"""
+
+    def __init__(self, subject: str, title: str, blocks: List[Block], subtitle: Optional[str] = None,
+                 theme: str = "coffee", centered: bool = False, footer: Tuple[str, ...] = _DEFAULT_FOOTER,
+                 text_title: Optional[str] = None):
+        body_html = "\n                \n                ".join(block.html for block in blocks if block.html)
+        body_text = "\n\n".join(block.text for block in blocks if block.text)
+        heading_text = text_title or (f"{title} {subtitle}" if subtitle else title)
+        self.subject = CompiledTemplate(subject)
+        self.html = CompiledTemplate(_layout_html(title, subtitle, body_html, theme, centered, footer))
+        self.text = CompiledTemplate(f"{heading_text}\n\n{body_text}\n")
+        self.fields = self.subject.fields | self.html.fields | self.text.fields
+
+    def render(self, **values: Any) -> RenderedEmail:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Missing email template fields: {', '.join(sorted(missing))}")
+        return RenderedEmail(
+            subject=self.subject.render(values),
+            html=self.html.render(values, escape=True),
+            text=self.text.render(values)
+        )
+
+
+_ORDER_ITEM_ROW = CompiledTemplate("""
+                            <tr>
+                                <td style="padding: 10px; border-bottom: 1px solid #ddd;">{name}</td>
+                                <td style="padding: 10px; border-bottom: 1px solid #ddd; text-align: center;">{quantity}</td>
+                                <td style="padding: 10px; border-bottom: 1px solid #ddd; text-align: right;">${price:.2f}</td>
+                                <td style="padding: 10px; border-bottom: 1px solid #ddd; text-align: right;">${line_total:.2f}</td>
+                            </tr>""")
+_ORDER_ITEM_LINE = CompiledTemplate("  {name} x{quantity} - ${line_total:.2f}")
+
+
+def order_item_rows(items: List[dict]) -> Tuple[Markup, str]:
+    """HTML table rows and text lines for the items of an order"""
+    rows = []
+    lines = []
+    for item in items:
+        values = {**item, "line_total": item["price"] * item["quantity"]}
+        rows.append(_ORDER_ITEM_ROW.render(values, escape=True))
+        lines.append(_ORDER_ITEM_LINE.render(values))
+    return Markup("".join(rows)), "\n".join(lines)
+
+
+WELCOME = EmailTemplate(
+    subject="Welcome to Coffee and AI! ☕",
+    title="☕ Welcome to Coffee and AI!",
+    text_title="Welcome to Coffee and AI!",
+    blocks=[
+        heading("Hello {username}! 👋"),
+        paragraph("Thank you for joining Coffee and AI - where intelligence meets espresso!"),
+        paragraph("Your account has been successfully created. You can now:"),
+        bullets([
+            "🤖 Chat with our AI-powered barista",
+            "☕ Browse our menu and place orders",
+            "📊 Track your order history",
+            "⭐ Get personalized recommendations"
+        ]),
+        paragraph("Our AI assistant uses cutting-edge LangChain and LangGraph technology to provide you with the best coffee ordering experience."),
+        button("Start Ordering Now", "http://localhost:3000"),
+        paragraph("If you have any questions, feel free to reach out to our support team."),
+        paragraph("Enjoy your coffee journey!"),
+        signature("The Coffee and AI Team")
+    ],
+    footer=("© 2024 Coffee and AI. All rights reserved.", "Built with LangChain, LangGraph, and Amazon Nova")
+)
+
+ORDER_CONFIRMATION = EmailTemplate(
+    subject="Order Confirmation #{order_id} - Coffee and AI ☕",
+    title="🎉 Order Confirmed!",
+    subtitle="Order #{order_id}",
+    text_title="Order Confirmed! Order #{order_id}",
+    blocks=[
+        heading("Thank you, {username}!"),
+        paragraph("Your order has been confirmed and is being prepared by our AI-powered barista system."),
+        raw(
+            """<div class="order-box">
+                    <h3>Order Details</h3>
+                    <table>
+                        <thead>
+                            <tr style="background: #f0f0f0;">
+                                <th style="padding: 10px; text-align: left;">Item</th>
+                                <th style="padding: 10px; text-align: center;">Qty</th>
+                                <th style="padding: 10px; text-align: right;">Price</th>
+                                <th style="padding: 10px; text-align: right;">Total</th>
+                            </tr>
+                        </thead>
+                        <tbody>{items_html}
+                            <tr class="subtotal-row">
+                                <td colspan="3" style="padding: 10px; text-align: right;">Subtotal:</td>
+                                <td style="padding: 10px; text-align: right;">${subtotal:.2f}</td>
+                            </tr>
+                            <tr class="tax-row">
+                                <td colspan="3" style="padding: 10px; text-align: right;">Tax (8%):</td>
+                                <td style="padding: 10px; text-align: right;">${tax:.2f}</td>
+                            </tr>
+                            <tr class="total-row">
+                                <td colspan="3" style="padding: 15px; text-align: right;">Total:</td>
+                                <td style="padding: 15px; text-align: right;">${total:.2f}</td>
+                            </tr>
+                        </tbody>
+                    </table>
+                </div>""",
+            "Order Details:\n{items_text}\n\nSubtotal: ${subtotal:.2f}\nTax (8%): ${tax:.2f}\nTotal: ${total:.2f}"
+        ),
+        raw(
+            "<p><strong>⏱️ Estimated preparation time:</strong> 5-10 minutes</p>\n"
+            "                <p><strong>📍 Pickup location:</strong> Main Counter</p>",
+            "Estimated preparation time: 5-10 minutes\nPickup location: Main Counter"
+        ),
+        paragraph("We'll notify you when your order is ready!"),
+        paragraph("Thank you for choosing Coffee and AI!")
+    ]
+)
+
+ORDER_READY = EmailTemplate(
+    subject="Your Order #{order_id} is Ready! ☕",
+    title="✅ Order Ready!",
+    text_title="Order Ready!",
+    theme="success",
+    centered=True,
+    blocks=[
+        raw('<div class="ready-icon">☕</div>', ""),
+        heading("Hi {username}!"),
+        raw(
+            '<p style="font-size: 18px;">Your order <strong>#{order_id}</strong> is ready for pickup!</p>',
+            "Your order #{order_id} is ready for pickup!"
+        ),
+        paragraph("Please proceed to the main counter to collect your order."),
+        paragraph("Enjoy your coffee! ☕", style="margin-top: 30px;"),
+        raw("", "Coffee and AI Team")
+    ]
+)
+
+ADMIN_NOTIFICATION = EmailTemplate(
+    subject="{subject}",
+    title="🔔 Admin Notification",
+    theme="admin",
+    footer=(),
+    blocks=[
+        raw("<p><strong>Time:</strong> {time}</p>", "Time: {time}"),
+        paragraph("{message}")
+    ]
+)
+
+# Admin-written messages (single and bulk); the message is trusted HTML
+ANNOUNCEMENT = EmailTemplate(
+    subject="{subject}",
+    title="☕ Coffee and AI",
+    blocks=[paragraph("{message}")]
+)
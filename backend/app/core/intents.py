@@ -0,0 +1,193 @@
+"""
+Intent classification
+One engine behind every workflow's keyword routing. A classifier's phrase lists are
+compiled once, at import time, into a single regex that matches whole words only
+("hi" no longer fires on "this"). Rules are tried in priority order and return an
+intent with a confidence.
+
+A small local model (TF-IDF features, logistic regression) can be trained from
+labelled traffic with train_intent_model.py. When INTENT_MODEL_DIR holds a model for
+a classifier, it answers messages no rule matched and overrides a rule when it is
+more confident.
+"""
+import json
+import math
+import os
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Directory with trained models, one "<classifier name>.json" per classifier (empty = rules only)
+INTENT_MODEL_DIR = os.getenv("INTENT_MODEL_DIR", "")
+# A model prediction below this probability is ignored
+INTENT_MODEL_MIN_CONFIDENCE = float(os.getenv("INTENT_MODEL_MIN_CONFIDENCE", "0.6"))
+
+TOKEN = re.compile(r"[a-z0-9$]+")
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Lowercase word tokens; apostrophes split words ("what's" -> "what", "s")"""
+    return tuple(TOKEN.findall(text.lower()))
+
+
+@dataclass(frozen=True)
+class Intent:
+    name: str
+    confidence: float
+    source: str = "rules"  # rules, model or default
+
+
+def _phrase_pattern(phrase: str) -> str:
+    """Regex for a phrase: whole words, any whitespace between them, "*" for any word ending"""
+    prefix = phrase.endswith("*")
+    words = phrase.rstrip("*").lower().split()
+    return r"\s+".join(re.escape(word) for word in words) + (r"\w*" if prefix else "")
+
+
+class TfidfLogisticModel:
+    """Multinomial logistic regression over TF-IDF weighted unigrams and bigrams"""
+
+    def __init__(self, labels: List[str], idf: Dict[str, float], weights: Dict[str, Dict[str, float]],
+                 bias: Dict[str, float]):
+        self.labels = labels
+        self.idf = idf
+        self.weights = weights  # label -> feature -> weight
+        self.bias = bias
+
+    @staticmethod
+    def terms(tokens: Sequence[str]) -> List[str]:
+        return list(tokens) + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def features(self, tokens: Sequence[str]) -> Dict[str, float]:
+        """L2-normalized TF-IDF vector of the known terms"""
+        counts = Counter(term for term in self.terms(tokens) if term in self.idf)
+        vector = {term: count * self.idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+        return {term: value / norm for term, value in vector.items()}
+
+    def probabilities(self, features: Dict[str, float]) -> Dict[str, float]:
+        scores = {
+            label: self.bias[label] + sum(self.weights[label].get(term, 0.0) * value for term, value in features.items())
+            for label in self.labels
+        }
+        top = max(scores.values())
+        exps = {label: math.exp(score - top) for label, score in scores.items()}
+        total = sum(exps.values())
+        return {label: value / total for label, value in exps.items()}
+
+    def predict(self, tokens: Sequence[str]) -> Tuple[str, float]:
+        probabilities = self.probabilities(self.features(tokens))
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+    @classmethod
+    def train(cls, samples: Sequence[Tuple[str, str]], epochs: int = 30, learning_rate: float = 0.5,
+              l2: float = 1e-4, seed: int = 0) -> "TfidfLogisticModel":
+        """Fit on (message, intent) pairs with plain stochastic gradient descent"""
+        documents = [(tokenize(message), intent) for message, intent in samples]
+        labels = sorted({intent for _, intent in documents})
+        document_frequency = Counter(term for tokens, _ in documents for term in set(cls.terms(tokens)))
+        idf = {term: math.log((1 + len(documents)) / (1 + count)) + 1 for term, count in document_frequency.items()}
+        model = cls(labels, idf, {label: {} for label in labels}, {label: 0.0 for label in labels})
+
+        vectors = [(model.features(tokens), intent) for tokens, intent in documents]
+        rng = random.Random(seed)
+        for _ in range(epochs):
+            rng.shuffle(vectors)
+            for features, intent in vectors:
+                probabilities = model.probabilities(features)
+                for label in labels:
+                    gradient = probabilities[label] - (1.0 if label == intent else 0.0)
+                    weights = model.weights[label]
+                    for term, value in features.items():
+                        weight = weights.get(term, 0.0)
+                        weights[term] = weight - learning_rate * (gradient * value + l2 * weight)
+                    model.bias[label] -= learning_rate * gradient
+        return model
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump({"labels": self.labels, "idf": self.idf, "weights": self.weights, "bias": self.bias}, file)
+
+    @classmethod
+    def load(cls, path: str) -> "TfidfLogisticModel":
+        with open(path) as file:
+            data = json.load(file)
+        return cls(data["labels"], data["idf"], data["weights"], data["bias"])
+
+
+class IntentClassifier:
+    """Priority-ordered phrase rules compiled into one regex, with an optional model"""
+
+    def __init__(self, name: str, rules: Sequence[Tuple[str, Iterable[str], float]],
+                 default: str, default_confidence: float = 0.5, model: Optional[TfidfLogisticModel] = None):
+        self.name = name
+        self.rules = {f"r{index}": Intent(intent, confidence) for index, (intent, _, confidence) in enumerate(rules)}
+        self.intents = {rule.name for rule in self.rules.values()} | {default}
+        self.default = Intent(default, default_confidence, "default")
+        # One lookahead per rule, tried in priority order at the start of the message: the
+        # first rule with a phrase anywhere in the message matches, and its group names it
+        self._pattern = re.compile("|".join(
+            rf"(?=.*?\b(?P<r{index}>{'|'.join(_phrase_pattern(phrase) for phrase in phrases)})\b)"
+            for index, (_, phrases, _) in enumerate(rules)
+        ), re.DOTALL)
+        self.model = model if model is not None else self._load_model()
+        self.counts: Counter = Counter()
+        classifiers[name] = self
+
+    def _load_model(self) -> Optional[TfidfLogisticModel]:
+        if not INTENT_MODEL_DIR:
+            return None
+        path = os.path.join(INTENT_MODEL_DIR, f"{self.name}.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            model = TfidfLogisticModel.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[INTENTS] Could not load {path}: {str(e)}")
+            return None
+        unknown = set(model.labels) - self.intents
+        if unknown:
+            print(f"[INTENTS] Ignoring {path}: unknown intents {', '.join(sorted(unknown))}")
+            return None
+        print(f"[INTENTS] Loaded {self.name} model ({len(model.idf)} terms)")
+        return model
+
+    def rule_intent(self, text: str) -> Intent:
+        match = self._pattern.match(text.lower().replace("’", "'"))
+        if match is None:
+            return self.default
+        return self.rules[match.lastgroup]
+
+    def classify(self, text: str) -> Intent:
+        """Intent of a message: the highest-priority matching rule, or the model when it knows better"""
+        intent = self.rule_intent(text)
+        if self.model is not None:
+            label, probability = self.model.predict(tokenize(text))
+            if probability >= INTENT_MODEL_MIN_CONFIDENCE and (intent.source == "default" or probability > intent.confidence):
+                intent = Intent(label, probability, "model")
+        self.counts[(intent.source, intent.name)] += 1
+        return intent
+
+
+# Every classifier by name, for the metrics endpoint
+classifiers: Dict[str, IntentClassifier] = {}
+
+
+def intent_stats() -> Dict[str, Any]:
+    """Classification counts per classifier for the metrics endpoint"""
+    stats = {}
+    for name, classifier in classifiers.items():
+        by_source: Counter = Counter()
+        by_intent: Counter = Counter()
+        for (source, intent), count in classifier.counts.items():
+            by_source[source] += count
+            by_intent[intent] += count
+        stats[name] = {
+            "model": classifier.model is not None,
+            "by_source": dict(by_source),
+            "by_intent": dict(by_intent)
+        }
+    return stats
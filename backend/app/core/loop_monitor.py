@@ -0,0 +1,99 @@
+"""
+Event Loop Monitor
+Detects and reports code that blocks the asyncio event loop
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+
+# A stall longer than this is reported as blocking
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+# How often the loop heartbeat runs
+LOOP_MONITOR_INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50"))
+
+
+class EventLoopMonitor:
+    """Heartbeat coroutine plus watchdog thread.
+
+    The coroutine records a timestamp on every tick. The watchdog thread notices when
+    the timestamp stops moving and captures the event loop thread's stack, so the
+    report names the code that is blocking rather than just the delay.
+    """
+
+    def __init__(self, threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS, interval_ms: float = LOOP_MONITOR_INTERVAL_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.blocked_count = 0
+        self.max_lag_ms = 0.0
+        self.last_block: Optional[Dict[str, Any]] = None
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stopped.wait(self.interval):
+            beat = self._last_beat
+            stalled = time.monotonic() - beat
+            if stalled < self.threshold or beat == reported_beat:
+                continue
+            # Report each stall once, with the stack of whatever holds the loop
+            reported_beat = beat
+            self.blocked_count += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame, limit=8) if frame else []
+            self.last_block = {
+                "stalled_ms": round(stalled * 1000, 1),
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "stack": [line.strip() for line in stack]
+            }
+            print(f"[LOOP MONITOR] Event loop blocked for at least {stalled * 1000:.0f}ms")
+            if stack:
+                print("".join(stack))
+
+    def start(self) -> None:
+        """Start monitoring the running event loop"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """Stop the heartbeat and the watchdog thread"""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Loop health statistics for the metrics endpoint"""
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "blocked_count": self.blocked_count,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "last_block": self.last_block
+        }
+
+
+# Global monitor instance
+loop_monitor = EventLoopMonitor()
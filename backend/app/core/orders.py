@@ -0,0 +1,137 @@
+"""
+Order placement
+Creates the order for a checked-out cart; shared by every agent type.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.core.admin_stats import admin_stats
+from app.core.cart_store import CartState, cart_store
+from app.core.outbox import outbox
+from app.core.pricing import PricedCart, price_cart
+from app.models.customer import Customer
+from app.models.order import Order, OrderStatus
+from app.models.user import User
+
+
+def customer_display_name(session_id: str) -> str:
+    """Short customer label used in Slack notifications"""
+    return session_id.split('@')[0] if '@' in session_id else session_id[:8]
+
+
+async def place_order(session_id: str, cart: Dict[str, int], priced: Optional[PricedCart] = None) -> Tuple[int, bool]:
+    """Save a confirmed order and queue its Slack and email notifications.
+
+    The order and its outbox events commit together; delivery happens in the
+    background. Pass the cart's PricedCart when the caller already has it, so the
+    saved order matches what the customer is shown. Returns the order id and
+    whether a confirmation email was queued.
+    """
+    # Price every line in one pass (8% tax included in the total)
+    if priced is None:
+        priced = await price_cart(cart)
+    order_items = priced.order_items
+    total = priced.total
+
+    user = await User.get_or_none(email=session_id)
+
+    async with outbox.transaction() as connection:
+        customer, created = await Customer.get_or_create(session_id=session_id, using_db=connection)
+        order = await Order.create(
+            customer=customer,
+            items=order_items,
+            total=total,
+            status=OrderStatus.CONFIRMED,
+            using_db=connection
+        )
+        await outbox.enqueue(
+            "slack.new_order",
+            {
+                "order_id": order.id,
+                "customer": customer_display_name(session_id),
+                "total": total,
+                "items_count": len(order_items)
+            },
+            idempotency_key=f"order:{order.id}:slack_new_order",
+            connection=connection
+        )
+        if user:
+            await outbox.enqueue(
+                "email.order_confirmation",
+                {
+                    "user_email": user.email,
+                    "username": user.username,
+                    "order_id": order.id,
+                    "items": order_items,
+                    "total": total
+                },
+                idempotency_key=f"order:{order.id}:email_confirmation",
+                connection=connection
+            )
+
+    admin_stats.notify()
+    print(f"[ORDER DEBUG] Order created with ID: {order.id}, email queued: {bool(user)}")
+    return order.id, bool(user)
+
+
+@dataclass(frozen=True)
+class ConfirmedOrder:
+    order_id: int
+    priced: PricedCart
+    email_queued: bool
+
+
+async def restore_cart(session_id: str, items: Dict[str, int]) -> None:
+    """Put checked-out items back into the cart, merged with anything added since"""
+    def mutate(cart: CartState) -> None:
+        for key, quantity in items.items():
+            cart.items[key] = cart.items.get(key, 0) + quantity
+
+    await cart_store.update(session_id, mutate)
+
+
+async def confirm_cart(session_id: str) -> Optional[ConfirmedOrder]:
+    """Check out the session's cart and place its order; None if the cart is empty.
+
+    The cart is taken atomically, so a repeated confirmation cannot place two orders.
+    If pricing or placing the order fails, the items go back into the cart before the
+    error is raised, so the customer can simply confirm again.
+    """
+    cart = await cart_store.checkout(session_id, hold_pending=False)
+    if not cart:
+        return None
+    try:
+        priced = await price_cart(cart)
+        order_id, email_queued = await place_order(session_id, cart, priced)
+    except BaseException:
+        try:
+            await restore_cart(session_id, cart)
+        except Exception as e:
+            print(f"[ORDER] Could not restore the cart of {session_id}: {str(e)}")
+        raise
+    return ConfirmedOrder(order_id, priced, email_queued)
+
+
+async def cart_summary(session_id: str) -> str:
+    """One-line cart contents and subtotal, as shown by the chat agents"""
+    cart = await cart_store.get(session_id)
+    if not cart.items:
+        return "Your cart is empty."
+    priced = await price_cart(cart.items)
+    lines = ", ".join(f"{line.quantity}x {line.name} (${line.line_total:.2f})" for line in priced.lines)
+    return f"Your cart: {lines}, Total: ${priced.subtotal:.2f}"
+
+
+async def confirm_order(session_id: str) -> str:
+    """Confirm the session's cart and describe the placed order"""
+    order = await confirm_cart(session_id)
+    if order is None:
+        return "Your cart is empty. Add something before confirming."
+    items = "\n".join(f"- {line.quantity}x {line.name} - ${line.line_total:.2f}" for line in order.priced.lines)
+    return f"""Order #{order.order_id} confirmed! ☕
+
+Your order:
+{items}
+Total: ${order.priced.total:.2f}
+
+Your order will be ready in 5-10 minutes. Thank you for choosing Coffee and AI!"""
@@ -0,0 +1,228 @@
+"""
+Transactional outbox
+Slack and email side effects are written as outbox rows in the same transaction as
+the order or user they belong to, then delivered by a background dispatcher, so
+request handlers return as soon as the commit finishes.
+"""
+import asyncio
+import os
+import random
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from tortoise import timezone
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
+
+from app.core import email, slack
+
+# Deliveries running at the same time on each replica
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+# Events claimed per dispatch round
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+# Fallback poll for events written by other replicas or due for retry
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+# Attempts before an event is dead-lettered
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# Retry delay doubles from the base up to the maximum (seconds)
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "5"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "900"))
+# A claimed event is retried by any replica if not finished within the lease
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+# Time allowed for a single delivery
+OUTBOX_SEND_TIMEOUT = float(os.getenv("OUTBOX_SEND_TIMEOUT", "30"))
+
+
+@dataclass(frozen=True)
+class OutboxHandler:
+    send: Callable[..., Awaitable[bool]]  # Called with the event payload as keyword arguments
+    enabled: Optional[Callable[[], bool]] = None  # Events are skipped while this returns False
+
+
+class Outbox:
+    """Event writer and background dispatcher"""
+
+    def __init__(self, workers: int = OUTBOX_WORKERS, batch_size: int = OUTBOX_BATCH_SIZE,
+                 poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, OutboxHandler] = {}
+        self._wakeup = asyncio.Event()
+        self.enqueued = 0
+        self.duplicates = 0
+        self.sent = 0
+        self.skipped = 0
+        self.retried = 0
+        self.dead = 0
+        self.errors = 0
+
+    def register(self, kind: str, send: Callable[..., Awaitable[bool]],
+                 enabled: Optional[Callable[[], bool]] = None) -> None:
+        self._handlers[kind] = OutboxHandler(send, enabled)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Database transaction whose enqueued events are dispatched right after commit"""
+        async with in_transaction() as connection:
+            yield connection
+        self.notify()
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], idempotency_key: str, connection=None) -> bool:
+        """Record an event, normally inside transaction(). Returns False if the key already exists."""
+        from app.models.outbox import OutboxEvent
+        _, created = await OutboxEvent.get_or_create(
+            idempotency_key=idempotency_key,
+            defaults={"kind": kind, "payload": payload, "available_at": timezone.now()},
+            using_db=connection
+        )
+        if created:
+            self.enqueued += 1
+        else:
+            self.duplicates += 1
+        return created
+
+    def notify(self) -> None:
+        """Wake the dispatcher instead of waiting for the next poll"""
+        self._wakeup.set()
+
+    async def _claim(self) -> List[Any]:
+        """Lease a batch of due events; skip_locked keeps replicas from claiming the same rows"""
+        from app.models.outbox import OutboxEvent, OutboxStatus
+        now = timezone.now()
+        async with in_transaction() as connection:
+            events = await (
+                OutboxEvent.filter(
+                    Q(status=OutboxStatus.PENDING, available_at__lte=now)
+                    | Q(status=OutboxStatus.PROCESSING, locked_until__lt=now)
+                )
+                .order_by("available_at")
+                .limit(self.batch_size)
+                .select_for_update(skip_locked=True)
+                .using_db(connection)
+            )
+            if events:
+                await OutboxEvent.filter(id__in=[event.id for event in events]).using_db(connection).update(
+                    status=OutboxStatus.PROCESSING,
+                    locked_until=now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+                )
+        return events
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _deliver(self, event) -> None:
+        from app.models.outbox import OutboxEvent, OutboxStatus
+        attempts = event.attempts + 1
+        handler = self._handlers.get(event.kind)
+        if handler is not None and handler.enabled is not None and not handler.enabled():
+            await OutboxEvent.filter(id=event.id).update(status=OutboxStatus.SKIPPED, locked_until=None)
+            self.skipped += 1
+            return
+
+        error = None
+        if handler is None:
+            error = f"No handler registered for {event.kind}"
+            attempts = OUTBOX_MAX_ATTEMPTS
+        else:
+            try:
+                if not await asyncio.wait_for(handler.send(**event.payload), timeout=OUTBOX_SEND_TIMEOUT):
+                    error = "Delivery reported failure"
+            except asyncio.TimeoutError:
+                error = f"Delivery timed out after {OUTBOX_SEND_TIMEOUT:.0f}s"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+
+        if error is None:
+            await OutboxEvent.filter(id=event.id).update(
+                status=OutboxStatus.SENT, attempts=attempts, sent_at=timezone.now(), locked_until=None, last_error=None
+            )
+            self.sent += 1
+        elif attempts >= OUTBOX_MAX_ATTEMPTS:
+            await OutboxEvent.filter(id=event.id).update(
+                status=OutboxStatus.DEAD, attempts=attempts, locked_until=None, last_error=error
+            )
+            self.dead += 1
+            print(f"[OUTBOX] Dead-lettered {event.kind} ({event.idempotency_key}) after {attempts} attempts: {error}")
+        else:
+            await OutboxEvent.filter(id=event.id).update(
+                status=OutboxStatus.PENDING,
+                attempts=attempts,
+                available_at=timezone.now() + timedelta(seconds=self._backoff(attempts)),
+                locked_until=None,
+                last_error=error
+            )
+            self.retried += 1
+            print(f"[OUTBOX] {event.kind} attempt {attempts} failed, will retry: {error}")
+
+    async def dispatch_once(self) -> int:
+        """Deliver one batch of due events with bounded concurrency; returns the batch size"""
+        events = await self._claim()
+        if not events:
+            return 0
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def deliver(event) -> None:
+            async with semaphore:
+                try:
+                    await self._deliver(event)
+                except Exception as e:
+                    # Left in processing; another round picks it up once the lease expires
+                    self.errors += 1
+                    print(f"[OUTBOX] Failed to record delivery of event {event.id}: {str(e)}")
+
+        await asyncio.gather(*(deliver(event) for event in events))
+        return len(events)
+
+    async def run(self) -> None:
+        """Background dispatch loop, started on application startup"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while await self.dispatch_once() >= self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"[OUTBOX] Dispatch failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Dispatcher statistics for the metrics endpoint"""
+        return {
+            "workers": self.workers,
+            "enqueued": self.enqueued,
+            "duplicates": self.duplicates,
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "retried": self.retried,
+            "dead": self.dead,
+            "errors": self.errors
+        }
+
+
+def _slack_enabled() -> bool:
+    return bool(slack.SLACK_WEBHOOK_URL)
+
+
+def _email_enabled() -> bool:
+    return bool(email.SMTP_USER)
+
+
+# Global outbox instance
+outbox = Outbox()
+# Slack events are posted one by one and report Slack's answer, so failures are retried
+outbox.register("slack.new_order", partial(slack.send_new_order_notification, wait=True), enabled=_slack_enabled)
+outbox.register("slack.new_user", partial(slack.send_new_user_notification, wait=True), enabled=_slack_enabled)
+outbox.register("slack.order_ready", partial(slack.send_order_ready_notification, wait=True), enabled=_slack_enabled)
+outbox.register("email.welcome", email.send_welcome_email, enabled=_email_enabled)
+outbox.register("email.order_confirmation", email.send_order_confirmation_email, enabled=_email_enabled)
+outbox.register("email.order_ready", email.send_order_ready_email, enabled=_email_enabled)
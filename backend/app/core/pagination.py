@@ -0,0 +1,94 @@
+"""
+Keyset pagination
+List endpoints page through rows ordered by (created_at, id) and hand back an opaque
+cursor for the next page in the X-Next-Cursor header, so the response body stays a
+plain list and deep pages cost the same as the first one.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from tortoise.expressions import Q
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor pointing just past the given row"""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def page_size(limit: Optional[int], default: int, maximum: int) -> int:
+    """Requested page size, defaulted and capped"""
+    if limit is None:
+        return default
+    return max(1, min(limit, maximum))
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """Comma-separated ?fields= projection, validated against the response schema"""
+    if not fields:
+        return list(allowed)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(allowed)}"
+        )
+    return requested
+
+
+def keyset_filter(cursor: Optional[str], descending: bool) -> Q:
+    """Rows after the cursor in (created_at, id) order"""
+    if not cursor:
+        return Q()
+    created_at, row_id = decode_cursor(cursor)
+    if descending:
+        # The redundant bound lets Postgres use it as an index condition
+        return Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=row_id))
+    return Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(id__gt=row_id))
+
+
+def page_query(queryset, cursor: Optional[str], limit: int, fields: Iterable[str], descending: bool = True):
+    """The query behind fetch_page: one row more than the page, to tell if another follows"""
+    columns = list(dict.fromkeys([*fields, "id", "created_at"]))
+    ordering = ("-created_at", "-id") if descending else ("created_at", "id")
+    return (
+        queryset.filter(keyset_filter(cursor, descending))
+        .order_by(*ordering)
+        .limit(limit + 1)
+        .values(*columns)
+    )
+
+
+async def fetch_page(queryset, cursor: Optional[str], limit: int, fields: Iterable[str],
+                     descending: bool = True) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of rows as dicts with only the requested columns, plus the next cursor"""
+    fields = list(fields)
+    rows = await page_query(queryset, cursor, limit, fields, descending)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return [{name: row[name] for name in fields} for row in rows], next_cursor
+
+
+def page_response(rows: List[Dict[str, Any]], next_cursor: Optional[str]) -> JSONResponse:
+    """JSON list response carrying the next cursor in a header"""
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return JSONResponse(content=jsonable_encoder(rows), headers=headers)
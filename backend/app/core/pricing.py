@@ -0,0 +1,97 @@
+"""
+Cart pricing
+Prices a whole cart at once from the menu catalog, so totals and order creation
+never issue one query per cart line.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Tuple, Union
+
+from app.core.catalog import CatalogItem, menu_catalog
+
+TAX_RATE = 0.08
+
+CartKey = Union[int, str]
+
+
+@dataclass(frozen=True)
+class PricedLine:
+    item_id: int
+    name: str
+    quantity: int
+    unit_price: float
+    line_total: float
+
+    def to_order_item(self) -> Dict[str, Any]:
+        """Shape stored in Order.items"""
+        return {
+            "item_id": self.item_id,
+            "name": self.name,
+            "quantity": self.quantity,
+            "price": self.unit_price
+        }
+
+
+@dataclass(frozen=True)
+class PricedCart:
+    lines: Tuple[PricedLine, ...]
+    subtotal: float
+    tax: float
+    total: float
+    unresolved: Tuple[CartKey, ...] = ()  # Cart keys that matched no menu item
+
+    @property
+    def order_items(self) -> List[Dict[str, Any]]:
+        return [line.to_order_item() for line in self.lines]
+
+
+def _is_id(key: CartKey) -> bool:
+    return isinstance(key, int) or (isinstance(key, str) and key.strip().isdigit())
+
+
+async def price_cart(cart: Mapping[CartKey, int], tax_rate: float = TAX_RATE) -> PricedCart:
+    """Resolve every line of a cart keyed by item id or item name.
+
+    Lines are priced from the catalog snapshot. Ids the snapshot does not know yet
+    (an item added on another replica before the next sync) are fetched in a single
+    query. Items taken off the menu keep their price so existing carts still total.
+    """
+    menu = await menu_catalog.get()
+    resolved: Dict[CartKey, CatalogItem] = {}
+    missing_ids = []
+    for key in cart:
+        if _is_id(key):
+            item = menu.get(int(key))
+            if item is None:
+                missing_ids.append(int(key))
+        else:
+            item = menu.lookup(key)
+        if item is not None:
+            resolved[key] = item
+
+    if missing_ids:
+        from app.models.menu import MenuItem
+        rows = {row.id: row for row in await MenuItem.filter(id__in=missing_ids)}
+        for key in cart:
+            row = rows.get(int(key)) if _is_id(key) else None
+            if row is not None:
+                resolved[key] = CatalogItem(
+                    id=row.id,
+                    name=row.name,
+                    description=row.description,
+                    price=float(row.price),
+                    category=row.category,
+                    available=row.available
+                )
+
+    lines = []
+    unresolved = []
+    for key, quantity in cart.items():
+        item = resolved.get(key)
+        if item is None:
+            unresolved.append(key)
+            continue
+        lines.append(PricedLine(item.id, item.name, quantity, item.price, round(item.price * quantity, 2)))
+
+    subtotal = round(sum(line.line_total for line in lines), 2)
+    tax = round(subtotal * tax_rate, 2)
+    return PricedCart(tuple(lines), subtotal, tax, round(subtotal + tax, 2), tuple(unresolved))
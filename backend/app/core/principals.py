@@ -0,0 +1,90 @@
+"""
+Authenticated-user cache
+Every protected request resolves its bearer token to a user row. The row is cached
+per process for a short TTL, keyed by the token subject and its version claim, and
+dropped on every replica when an account is activated, deactivated or edited.
+"""
+import os
+import time
+from collections import OrderedDict
+from copy import copy
+from typing import Any, Dict, Tuple
+
+from app.core.cache_sync import cache_sync
+
+PRINCIPAL_CACHE_NAME = "principals"
+
+# Seconds a cached user is trusted before it is read again
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+# Users kept per process (least recently used are evicted)
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+
+class PrincipalCache:
+    """Short-lived user rows for get_current_user, keyed by (username, token version)"""
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get(self, username: str, token_version: int):
+        """User for a verified token, or None if it does not exist or the token was revoked"""
+        from app.models.user import User
+        key = (username, token_version)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, user = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                # A private instance per request; handlers may modify and save it
+                return copy(user)
+            del self._entries[key]
+
+        self.misses += 1
+        user = await User.get_or_none(username=username)
+        if user is None or user.token_version != token_version:
+            return None
+        self._entries[key] = (time.monotonic() + self.ttl, user)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return copy(user)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def reload(self, version: int) -> None:
+        """cache_sync handler: another replica changed a user"""
+        self.clear()
+
+    async def invalidate(self, username: str) -> None:
+        """Call after writing a user row: drops it here and on every other replica"""
+        for key in [key for key in self._entries if key[0] == username]:
+            del self._entries[key]
+        self.invalidations += 1
+        version = await cache_sync.bump(PRINCIPAL_CACHE_NAME)
+        cache_sync.mark_seen(PRINCIPAL_CACHE_NAME, version)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics for the metrics endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+# Global cache used by get_current_user
+principal_cache = PrincipalCache()
+cache_sync.register(PRINCIPAL_CACHE_NAME, principal_cache.reload)
@@ -0,0 +1,202 @@
+"""
+Response cache for repeated questions
+Menu and coffee-culture questions ("show me the menu", "why do people love coffee")
+arrive over and over with the same answer. Answers are kept per process, keyed on the
+normalized message, the agent, the model and the menu catalog version, so a menu
+change retires every cached answer at once. Messages that could touch a cart or an
+order are never cached.
+
+With RESPONSE_CACHE_SIMILARITY set, a differently worded question can reuse an answer:
+questions are embedded with the conversation memory's embedder, and a miss is matched
+against every live entry of the same agent, model and menu with one matrix product.
+"""
+import copy
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.catalog import menu_catalog
+
+# Seconds a cached answer is served (0 disables the cache)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+# Answers kept per process; the least recently used is evicted first
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+# Embedding cosine similarity (0-1) at which a differently worded question reuses an answer (0 = exact matches only)
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0"))
+# Embedder for similarity matching: "bedrock" (semantic) or "hashing" (word overlap, rewordings only)
+RESPONSE_CACHE_EMBEDDER = os.getenv("RESPONSE_CACHE_EMBEDDER", "bedrock")
+
+# Anything that may add to, change or check out a cart, or asks about the customer's own data
+CART_INTENT = re.compile(
+    r"\b(add|buy|purchase|remove|delete|cancel|confirm|checkout|check out|pay|place|"
+    r"cart|order|orders|ordering|i'?ll have|i'?ll take|give me|get me|i want|i'?d like|"
+    r"yes|yeah|yep|sure|ok|okay|my)\b"
+)
+
+# Words that do not change what is being asked
+FILLER_WORDS = frozenset({
+    "please", "pls", "hey", "hi", "hello", "the", "a", "an", "can", "could", "would",
+    "you", "me", "us", "just", "so", "um", "uh", "thanks", "thank"
+})
+
+CacheKey = Tuple[str, str, int, str]
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase words without punctuation or filler: 'Show me the menu, please!' -> 'show menu'"""
+    words = re.findall(r"[a-z0-9]+", message.lower().replace("'", ""))
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+
+class ResponseCache:
+    """LRU cache of agent answers with a TTL and optional similarity matching"""
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 similarity: float = RESPONSE_CACHE_SIMILARITY, embedder=None):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.similarity = similarity
+        self._embedder = embedder
+        # key -> (expires, row, value); row is the entry's line in the similarity index
+        self._entries: "OrderedDict[CacheKey, Tuple[float, int, Any]]" = OrderedDict()
+        # Similarity index, one row per entry slot: normalized question embedding, entry
+        # group (agent, model, menu version) and expiry; free rows have expiry 0
+        self._vectors: Optional[np.ndarray] = None
+        self._groups = np.zeros(self.max_entries, dtype=np.int64)
+        self._expires = np.zeros(self.max_entries, dtype=np.float64)
+        self._free: List[int] = list(range(self.max_entries - 1, -1, -1))
+        self._row_keys: List[Optional[CacheKey]] = [None] * self.max_entries
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def cacheable(self, message: str) -> bool:
+        """Whether the answer to this message may be cached at all"""
+        return self.ttl > 0 and not CART_INTENT.search(message.lower())
+
+    async def _key(self, agent_type: str, model: str, message: str) -> CacheKey:
+        menu = await menu_catalog.get()
+        return (agent_type, model, menu.version, normalize_message(message))
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            from app.memory.vector_memory import create_embedder
+            self._embedder = create_embedder(RESPONSE_CACHE_EMBEDDER)
+        return self._embedder
+
+    async def _embed(self, normalized: str) -> Optional[np.ndarray]:
+        vector = await self.embedder.aembed(normalized)
+        if vector is None or not np.any(vector):
+            return None
+        return vector / np.linalg.norm(vector)
+
+    async def _similar(self, key: CacheKey, now: float) -> Optional[CacheKey]:
+        """Closest live entry for the same agent, model and catalog version"""
+        if self._vectors is None or len(self._free) == self.max_entries:
+            return None
+        query = await self._embed(key[3])
+        if query is None:
+            return None
+        scores = self._vectors @ query
+        scores[(self._groups != hash(key[:3])) | (self._expires <= now)] = -1.0
+        row = int(np.argmax(scores))
+        if scores[row] < self.similarity:
+            return None
+        return self._row_keys[row]
+
+    def _release_row(self, row: int) -> None:
+        self._expires[row] = 0.0
+        self._row_keys[row] = None
+        self._free.append(row)
+
+    def _drop(self, key: CacheKey) -> None:
+        _, row, _ = self._entries.pop(key)
+        self._release_row(row)
+
+    async def get(self, agent_type: str, model: str, message: str) -> Optional[Any]:
+        """Cached answer for this message, or None"""
+        if not self.cacheable(message):
+            self.bypassed += 1
+            return None
+        key = await self._key(agent_type, model, message)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= now:
+            self._drop(key)
+            entry = None
+        if entry is None and self.similarity > 0:
+            similar = await self._similar(key, now)
+            if similar is not None:
+                key, entry = similar, self._entries[similar]
+                self.similar_hits += 1
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[2])
+
+    async def put(self, agent_type: str, model: str, message: str, value: Any) -> None:
+        """Remember the answer to a message; ignored for messages that are not cacheable"""
+        if not self.cacheable(message):
+            return
+        key = await self._key(agent_type, model, message)
+        if not key[3]:
+            return
+        vector = await self._embed(key[3]) if self.similarity > 0 else None
+        if key in self._entries:
+            self._drop(key)
+        while not self._free:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+        expires = time.monotonic() + self.ttl
+        row = self._free.pop()
+        self._row_keys[row] = key
+        self._groups[row] = hash(key[:3])
+        self._expires[row] = expires
+        if vector is not None:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            self._vectors[row] = vector
+        elif self._vectors is not None:
+            self._vectors[row] = 0.0
+        self._entries[key] = (expires, row, copy.deepcopy(value))
+        self.stores += 1
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and size for the metrics endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.ttl > 0,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "similarity_threshold": self.similarity,
+            "embedder": self.embedder.name if self.similarity > 0 else None,
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bypassed": self.bypassed,
+            "stores": self.stores,
+            "evictions": self.evictions
+        }
+
+
+# Global response cache
+response_cache = ResponseCache()
@@ -1,9 +1,229 @@
+import asyncio
 import os
 import aiohttp
 import time
-from typing import Optional
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", "")
+# Notifications of the same kind within this many seconds are posted as one digest (0 disables)
+SLACK_DIGEST_WINDOW = float(os.getenv("SLACK_DIGEST_WINDOW", "30"))
+# Messages waiting for Slack before the oldest are dropped; Slack never slows the caller down
+SLACK_QUEUE_SIZE = int(os.getenv("SLACK_QUEUE_SIZE", "500"))
+SLACK_TIMEOUT = float(os.getenv("SLACK_TIMEOUT", "10"))
+# Lines listed in a digest before the rest are summarised
+SLACK_DIGEST_MAX_LINES = 10
+# Attempts for a queued message that fails for reasons other than rate limiting
+SLACK_MAX_ATTEMPTS = 3
+
+
+def _attachment(message: str, title: Optional[str], color: str) -> Dict[str, Any]:
+    return {
+        "attachments": [{
+            "color": color,
+            "title": title or "Coffee and AI Notification",
+            "text": message,
+            "footer": "Coffee and AI",
+            "ts": int(time.time())
+        }]
+    }
+
+
+class SlackClient:
+    """Webhook poster over one long-lived aiohttp session, honouring Slack's Retry-After"""
+
+    def __init__(self, timeout: float = SLACK_TIMEOUT):
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.blocked_until = 0.0
+        self.posted = 0
+        self.throttled = 0
+        self.failed = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=4, ttl_dns_cache=300)
+            )
+        return self._session
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until Slack accepts messages again"""
+        return max(0.0, self.blocked_until - time.monotonic())
+
+    async def post(self, payload: Dict[str, Any]) -> bool:
+        """Post once. While rate limited this returns False immediately instead of waiting."""
+        if self.retry_after > 0:
+            self.throttled += 1
+            return False
+        async with self._get_session().post(SLACK_WEBHOOK_URL, json=payload) as response:
+            if response.status == 200:
+                self.posted += 1
+                return True
+            if response.status == 429:
+                delay = float(response.headers.get("Retry-After", "1"))
+                self.blocked_until = time.monotonic() + delay
+                self.throttled += 1
+                print(f"[SLACK] Rate limited, holding messages for {delay:.0f}s")
+                return False
+            self.failed += 1
+            print(f"Slack notification failed: {response.status}")
+            return False
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+@dataclass
+class _Digest:
+    title: str
+    color: str
+    summary: str  # Format string with {count} and {window}
+    messages: List[str] = field(default_factory=list)  # Full text, used when only one follows
+    lines: List[str] = field(default_factory=list)  # One-line form for the digest
+    opened: float = field(default_factory=time.monotonic)
+
+
+class SlackNotifier:
+    """Queues notifications, coalesces bursts into digests and posts them in the background"""
+
+    def __init__(self, client: SlackClient, window: float = SLACK_DIGEST_WINDOW, queue_size: int = SLACK_QUEUE_SIZE):
+        self.client = client
+        self.window = window
+        self.queue_size = queue_size
+        self._digests: Dict[str, _Digest] = {}
+        self._queue: Deque[Tuple[Dict[str, Any], int]] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.queued = 0
+        self.dropped = 0
+        self.digests_sent = 0
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        self._wakeup.set()
+
+    def enqueue(self, payload: Dict[str, Any]) -> None:
+        if len(self._queue) >= self.queue_size:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append((payload, 0))
+        self.queued += 1
+        self._ensure_running()
+
+    def notify(self, key: str, message: str, title: str, color: str, summary: str, line: str) -> None:
+        """Queue a notification. The first of a burst goes out at once; the rest of the same key
+        within the window are posted together as one digest when the window closes."""
+        digest = self._digests.get(key)
+        if self.window <= 0 or digest is None:
+            self.enqueue(_attachment(message, title, color))
+            if self.window > 0:
+                self._digests[key] = _Digest(title, color, summary)
+            return
+        digest.messages.append(message)
+        digest.lines.append(line)
+        self._ensure_running()
+
+    def _flush_digests(self, force: bool = False) -> None:
+        now = time.monotonic()
+        for key, digest in list(self._digests.items()):
+            if not force and now - digest.opened < self.window:
+                continue
+            del self._digests[key]
+            if not digest.lines:
+                continue
+            if len(digest.lines) == 1:
+                self.enqueue(_attachment(digest.messages[0], digest.title, digest.color))
+                continue
+            shown = digest.lines[:SLACK_DIGEST_MAX_LINES]
+            message = digest.summary.format(count=len(digest.lines), window=int(self.window)) + "\n\n" + "\n".join(shown)
+            if len(digest.lines) > len(shown):
+                message += f"\n…and {len(digest.lines) - len(shown)} more"
+            self.enqueue(_attachment(message, digest.title, digest.color))
+            self.digests_sent += 1
+
+    def _next_digest_due(self) -> Optional[float]:
+        if not self._digests:
+            return None
+        opened = min(digest.opened for digest in self._digests.values())
+        return max(0.0, opened + self.window - time.monotonic())
+
+    async def _drain(self) -> None:
+        """Post queued messages in order, stopping while Slack asks us to back off"""
+        while self._queue and self.client.retry_after <= 0:
+            payload, attempts = self._queue[0]
+            try:
+                posted = await self.client.post(payload)
+            except Exception as e:
+                print(f"Slack notification error: {e}")
+                posted = False
+            if posted:
+                self._queue.popleft()
+            elif self.client.retry_after > 0:
+                break  # Rate limited: retried once Retry-After has passed
+            else:
+                self._queue.popleft()
+                if attempts + 1 < SLACK_MAX_ATTEMPTS:
+                    self._queue.append((payload, attempts + 1))
+                else:
+                    self.dropped += 1
+
+    async def run(self) -> None:
+        """Background sender, started on the first notification"""
+        while True:
+            self._flush_digests()
+            await self._drain()
+            waits = [wait for wait in (
+                self.client.retry_after if self._queue else None,
+                self._next_digest_due()
+            ) if wait is not None]
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(waits) if waits else None)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Post open digests and queued messages, then close the session (on shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._flush_digests(force=True)
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except Exception as e:
+            print(f"[SLACK] {len(self._queue)} notifications not sent on shutdown: {e}")
+        await self.client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Notifier statistics for the metrics endpoint"""
+        return {
+            "digest_window_seconds": self.window,
+            "queued": self.queued,
+            "queue_depth": len(self._queue),
+            "open_digests": len(self._digests),
+            "digests_sent": self.digests_sent,
+            "dropped": self.dropped,
+            "posted": self.client.posted,
+            "throttled": self.client.throttled,
+            "failed": self.client.failed,
+            "retry_after_seconds": round(self.client.retry_after, 1)
+        }
+
+
+# Global notifier and its shared client
+slack_client = SlackClient()
+slack_notifier = SlackNotifier(slack_client)
+
 
 async def send_slack_notification(
     message: str,
@@ -16,24 +236,10 @@ async def send_slack_notification(
         return False
     
     try:
-        payload = {
-            "attachments": [{
-                "color": color,
-                "title": title or "Coffee and AI Notification",
-                "text": message,
-                "footer": "Coffee and AI",
-                "ts": int(time.time())
-            }]
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(SLACK_WEBHOOK_URL, json=payload) as response:
-                if response.status == 200:
-                    print(f"Slack notification sent: {title}")
-                    return True
-                else:
-                    print(f"Slack notification failed: {response.status}")
-                    return False
+        if await slack_client.post(_attachment(message, title, color)):
+            print(f"Slack notification sent: {title}")
+            return True
+        return False
     except Exception as e:
         print(f"Slack notification error: {e}")
         return False
@@ -70,46 +276,73 @@ async def send_slack_rich_notification(
             ]
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(SLACK_WEBHOOK_URL, json=payload) as response:
-                return response.status == 200
+        return await slack_client.post(payload)
     except Exception as e:
         print(f"Slack rich notification error: {e}")
         return False
 
 
-async def send_new_user_notification(username: str, email: str) -> bool:
-    """Send notification for new user registration"""
-    return await send_slack_notification(
+async def _send_event(key: str, message: str, title: str, color: str, summary: str, line: str, wait: bool) -> bool:
+    """Post an event notification now (wait) or queue it for the digest.
+
+    With wait the result is Slack's answer, so the outbox retries a failed or rate
+    limited delivery instead of marking it sent; without it the notification is
+    coalesced with others of its kind and True only means it was queued.
+    """
+    if not SLACK_WEBHOOK_URL:
+        print("Slack webhook URL not configured")
+        return False
+    if wait:
+        return await send_slack_notification(message, title, color)
+    slack_notifier.notify(key, message, title=title, color=color, summary=summary, line=line)
+    return True
+
+
+async def send_new_user_notification(username: str, email: str, wait: bool = False) -> bool:
+    """Notify about a new user registration"""
+    return await _send_event(
+        "new_user",
         f"🎉 New user registered!\n\n"
         f"*Username:* {username}\n"
         f"*Email:* {email}",
         title="New Registration",
-        color="#10B981"  # Green
+        color="#10B981",  # Green
+        summary="🎉 {count} more users registered in the last {window}s",
+        line=f"• {username} ({email})",
+        wait=wait
     )
 
 
-async def send_new_order_notification(order_id: int, customer: str, total: float, items_count: int) -> bool:
-    """Send notification for new order"""
-    return await send_slack_notification(
+async def send_new_order_notification(order_id: int, customer: str, total: float, items_count: int,
+                                      wait: bool = False) -> bool:
+    """Notify about a new order"""
+    return await _send_event(
+        "new_order",
         f"☕ New order placed!\n\n"
         f"*Order ID:* #{order_id}\n"
         f"*Customer:* {customer}\n"
         f"*Total:* ${total:.2f}\n"
         f"*Items:* {items_count}",
         title="New Order",
-        color="#F59E0B"  # Amber
+        color="#F59E0B",  # Amber
+        summary="☕ {count} more new orders in the last {window}s",
+        line=f"• #{order_id} {customer} - ${total:.2f} ({items_count} items)",
+        wait=wait
     )
 
 
-async def send_order_ready_notification(order_id: int, customer: str) -> bool:
-    """Send notification when order is ready"""
-    return await send_slack_notification(
+async def send_order_ready_notification(order_id: int, customer: str, wait: bool = False) -> bool:
+    """Notify when an order is ready"""
+    return await _send_event(
+        "order_ready",
         f"✅ Order ready for pickup!\n\n"
         f"*Order ID:* #{order_id}\n"
         f"*Customer:* {customer}",
         title="Order Ready",
-        color="#3B82F6"  # Blue
+        color="#3B82F6",  # Blue
+        summary="✅ {count} more orders ready for pickup in the last {window}s",
+        line=f"• #{order_id} {customer}",
+        wait=wait
     )
 
 
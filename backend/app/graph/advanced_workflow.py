@@ -2,12 +2,17 @@ from typing import Dict, Any, List
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.runnables import RunnableLambda
-from app.core.bedrock import get_haiku_response
+from app.core.bedrock import BEDROCK_MODEL_ID, generate
 from app.prompts.templates import MENU_PROMPT, ORDER_PROMPT, CONFIRMATION_PROMPT, INTENT_PROMPT
 from app.tools.langchain_tools import AVAILABLE_TOOLS, get_menu_items, get_item_recommendations
 from app.memory.vector_memory import vector_memory
-from app.models.menu import MenuItem
+from app.core.catalog import menu_catalog
+from app.core.commands import command_parser
+from app.core.intents import IntentClassifier
+from app.core.pricing import price_cart
+from app.core.response_cache import response_cache
 import json
+import re
 
 class AdvancedCafeState(dict):
     """Advanced state for the cafe chatbot with tool calling"""
@@ -15,11 +20,33 @@ class AdvancedCafeState(dict):
     messages: List[Any]
     cart: Dict[int, int]
     current_intent: str
+    intent_confidence: float
     tool_calls: List[Dict]
     menu_context: List[Dict]
     total_amount: float
     user_preferences: Dict[str, Any]
 
+# Checked in order; the first rule with a matching phrase wins
+INTENT_CLASSIFIER = IntentClassifier("advanced_workflow", [
+    # Menu queries (checked first for menu-specific requests)
+    ("MENU", [
+        "show menu", "show me the menu", "what do you have", "menu please", "see the menu", "view menu",
+        "tell me about coffee", "why people love coffee", "coffee culture", "recommend*", "suggest*", "best coffee"
+    ], 0.9),
+    # Order and cart operations
+    ("ORDER", [
+        "add", "adding", "order*", "get", "buy*", "purchase*", "want*", "i'll have", "i'll take", "give me",
+        "show cart", "my cart", "cart total", "total", "remove*", "delete*"
+    ], 0.85),
+    ("CONFIRMATION", ["confirm*", "place", "yes", "proceed*", "checkout", "pay*"], 0.85),
+    ("GREETING", ["hello", "hi", "help", "start", "welcome"], 0.8),
+    # General menu/coffee queries
+    ("MENU", [
+        "coffee*", "latte*", "cappuccino*", "espresso*", "mocha*", "americano*", "drinks", "morning",
+        "why", "love*", "caffeine", "favorite*"
+    ], 0.6),
+], default="MENU", default_confidence=0.4)
+
 async def intent_classification_node(state: AdvancedCafeState) -> Dict[str, Any]:
     """Classify user intent using LangChain prompt template"""
     try:
@@ -27,65 +54,17 @@ async def intent_classification_node(state: AdvancedCafeState) -> Dict[str, Any]
         session_id = state.get("session_id", "default")
         
         # Load conversation history from vector memory
-        memory_vars = vector_memory.load_memory_variables({
+        memory_vars = await vector_memory.aload_memory_variables({
             "session_id": session_id,
             "user_message": user_message
         })
         
-        # Simple intent classification based on keywords - ORDER FIRST
-        message_lower = user_message.lower()
-        
-        # Menu queries (check first for menu-specific requests)
-        if any(phrase in message_lower for phrase in [
-            "show menu", "show me the menu", "what do you have", "menu please",
-            "see the menu", "view menu", "tell me about coffee", "why people love coffee",
-            "coffee culture", "recommend", "suggest", "best coffee"
-        ]):
-            intent = "MENU"
-        
-        # Order operations (specific add/buy actions)
-        elif any(word in message_lower for word in [
-            "add", "order", "get", "buy", "purchase", "want", "i'll have", "give me"
-        ]) or any(phrase in message_lower for phrase in [
-            "add a", "add an", "order a", "order an", "get a", "get an", 
-            "i want a", "i want an", "i'll take", "give me a"
-        ]):
-            intent = "ORDER"
-        
-        # Cart operations
-        elif any(phrase in message_lower for phrase in [
-            "show cart", "my cart", "cart total", "what's in my cart"
-        ]) or any(word in message_lower for word in [
-            "total", "remove", "delete"
-        ]):
-            intent = "ORDER"
-        
-        # Confirmation keywords
-        elif any(word in message_lower for word in [
-            "confirm", "place", "yes", "proceed", "checkout", "pay"
-        ]):
-            intent = "CONFIRMATION"
-        
-        # Greetings
-        elif any(word in message_lower for word in [
-            "hello", "hi", "help", "start", "welcome"
-        ]) and not any(word in message_lower for word in ["add", "order", "get"]):
-            intent = "GREETING"
-        
-        # General menu/coffee queries
-        elif any(word in message_lower for word in [
-            "coffee", "latte", "cappuccino", "espresso", "mocha", "americano", 
-            "drinks", "morning", "why", "love", "caffeine", "favorite"
-        ]):
-            intent = "MENU"
-        
-        # Default to menu for general queries
-        else:
-            intent = "MENU"
+        intent = INTENT_CLASSIFIER.classify(user_message)
         
         return {
             **state,
-            "current_intent": intent
+            "current_intent": intent.name,
+            "intent_confidence": intent.confidence
         }
         
     except Exception as e:
@@ -100,18 +79,12 @@ async def menu_agent_node(state: AdvancedCafeState) -> Dict[str, Any]:
         user_message = state["messages"][-1].content
         session_id = state.get("session_id", "default")
         
-        # Get menu items directly from database
-        from app.models.menu import MenuItem
-        items = await MenuItem.filter(available=True)
-        
-        # Format menu for prompt
-        menu_text = "\n".join([
-            f"- {item.name}: ${float(item.price):.2f} - {item.description}"
-            for item in items
-        ])
+        # Menu snapshot with pre-rendered prompt text
+        menu = await menu_catalog.get()
+        menu_text = menu.menu_prompt
         
         # Load conversation history
-        memory_vars = vector_memory.load_memory_variables({
+        memory_vars = await vector_memory.aload_memory_variables({
             "session_id": session_id,
             "user_message": user_message
         })
@@ -129,17 +102,29 @@ Customer message: "{user_message}"
 
 If they're asking about coffee in general (like why people love coffee in the morning), provide an informative and engaging answer about coffee culture, then naturally transition to mentioning our menu options. If they're asking about our specific menu, focus on our offerings. Be conversational and helpful."""
 
-        ai_response = get_haiku_response(prompt)
-        
-        # Check if user wants recommendations
-        if any(word in user_message.lower() for word in ["recommend", "suggest", "best", "favorite"]):
-            # Simple recommendations based on keywords
-            if "sweet" in user_message.lower():
-                ai_response += "\n\nFor something sweet, I'd especially recommend our Mocha - it's espresso with chocolate and steamed milk!"
-            if "strong" in user_message.lower():
-                ai_response += "\n\nFor something strong, try our Espresso or Americano!"
+        ai_response = await response_cache.get("advanced_workflow", BEDROCK_MODEL_ID, user_message)
+        if ai_response is None:
+            llm_response = await generate(prompt)
+            if not llm_response.ok:
+                return {
+                    **state,
+                    "messages": state["messages"] + [AIMessage(content="I'm having trouble with the menu right now. Please try again.")]
+                }
+            ai_response = llm_response.text
+            
+            # Check if user wants recommendations
+            if any(word in user_message.lower() for word in ["recommend", "suggest", "best", "favorite"]):
+                # Simple recommendations based on keywords
+                if "sweet" in user_message.lower():
+                    ai_response += "\n\nFor something sweet, I'd especially recommend our Mocha - it's espresso with chocolate and steamed milk!"
+                if "strong" in user_message.lower():
+                    ai_response += "\n\nFor something strong, try our Espresso or Americano!"
+            
+            # Only answers given without earlier conversation stand on their own
+            if not memory_vars.get("conversation_history"):
+                await response_cache.put("advanced_workflow", BEDROCK_MODEL_ID, user_message, ai_response)
         
-        menu_items = [{"name": item.name, "price": float(item.price), "description": item.description} for item in items]
+        menu_items = [{"name": item.name, "price": item.price, "description": item.description} for item in menu.items]
         
         return {
             **state,
@@ -160,26 +145,19 @@ async def order_agent_node(state: AdvancedCafeState) -> Dict[str, Any]:
         session_id = state.get("session_id", "default")
         current_cart = state.get("cart", {})
         
-        # Get menu items directly from database
-        from app.models.menu import MenuItem
-        menu_items = await MenuItem.filter(available=True)
-        menu_text = "\n".join([f"- {item.name}: ${float(item.price):.2f}" for item in menu_items])
+        menu = await menu_catalog.get()
+        menu_text = menu.price_prompt
         
         # Format current cart
         cart_text = "Empty"
         if current_cart:
-            cart_items = []
-            for item_id, quantity in current_cart.items():
-                # Find item name
-                try:
-                    item = await MenuItem.get(id=item_id)
-                    cart_items.append(f"{quantity}x {item.name}")
-                except:
-                    cart_items.append(f"{quantity}x Item {item_id}")
+            priced = await price_cart(current_cart)
+            cart_items = [f"{line.quantity}x {line.name}" for line in priced.lines]
+            cart_items += [f"{current_cart[item_id]}x Item {item_id}" for item_id in priced.unresolved]
             cart_text = ", ".join(cart_items)
         
         # Load conversation history
-        memory_vars = vector_memory.load_memory_variables({
+        memory_vars = await vector_memory.aload_memory_variables({
             "session_id": session_id,
             "user_message": user_message
         })
@@ -204,7 +182,18 @@ Analyze the message and respond with ONE of these actions:
 
 Only respond with the action, nothing else."""
 
-        ai_response = get_haiku_response(prompt)
+        # Unambiguous commands are parsed locally instead of asking the model for the action
+        command = command_parser.parse(user_message, menu)
+        if command.confident and command.verb in ("add", "show_cart"):
+            ai_response = command.action
+        else:
+            llm_response = await generate(prompt, max_tokens=100)
+            if not llm_response.ok:
+                return {
+                    **state,
+                    "messages": state["messages"] + [AIMessage(content="I'm having trouble with your order. Please try again.")]
+                }
+            ai_response = llm_response.text.strip()
         
         # Process the AI response for actions
         updated_cart = current_cart.copy()
@@ -215,13 +204,15 @@ Only respond with the action, nothing else."""
             
             for item_text in items_to_add:
                 item_text = item_text.strip()
-                for item in menu_items:
+                quantity_match = re.match(r"(\d+)x\s+", item_text)
+                quantity = int(quantity_match.group(1)) if quantity_match else 1
+                for item in menu.items:
                     if item.name.lower() in item_text.lower():
                         if item.id in updated_cart:
-                            updated_cart[item.id] += 1
+                            updated_cart[item.id] += quantity
                         else:
-                            updated_cart[item.id] = 1
-                        added_items.append(f"1x {item.name} (${float(item.price):.2f})")
+                            updated_cart[item.id] = quantity
+                        added_items.append(f"{quantity}x {item.name} (${item.price:.2f})")
                         break
             
             if added_items:
@@ -233,17 +224,14 @@ Only respond with the action, nothing else."""
             if not updated_cart:
                 response = "Your cart is empty. Add some items by saying something like 'add a latte'!"
             else:
-                total = 0
+                priced = await price_cart(updated_cart)
+                total = priced.subtotal
                 cart_display = "Your order:\n\n"
                 
-                for item_id, quantity in updated_cart.items():
-                    try:
-                        item = await MenuItem.get(id=item_id)
-                        item_total = float(item.price) * quantity
-                        total += item_total
-                        cart_display += f"• {quantity}x {item.name} - ${item_total:.2f}\n"
-                    except:
-                        cart_display += f"• {quantity}x Item {item_id}\n"
+                for line in priced.lines:
+                    cart_display += f"• {line.quantity}x {line.name} - ${line.line_total:.2f}\n"
+                for item_id in priced.unresolved:
+                    cart_display += f"• {updated_cart[item_id]}x Item {item_id}\n"
                 
                 cart_display += f"\nTotal: ${total:.2f}\n\nSay 'confirm order' to place your order!"
                 response = cart_display
@@ -272,22 +260,14 @@ async def confirmation_agent_node(state: AdvancedCafeState) -> Dict[str, Any]:
         if not current_cart:
             response = "Your cart is empty. Add some items first!"
         else:
-            # Calculate total using database
-            from app.models.menu import MenuItem
-            total = 0
-            cart_summary = []
-            
-            for item_id, quantity in current_cart.items():
-                try:
-                    item = await MenuItem.get(id=item_id)
-                    item_total = float(item.price) * quantity
-                    total += item_total
-                    cart_summary.append(f"{quantity}x {item.name}")
-                except:
-                    cart_summary.append(f"{quantity}x Item {item_id}")
+            # Price the whole cart in one pass
+            priced = await price_cart(current_cart)
+            total = priced.subtotal
+            cart_summary = [f"{line.quantity}x {line.name}" for line in priced.lines]
+            cart_summary += [f"{current_cart[item_id]}x Item {item_id}" for item_id in priced.unresolved]
             
             # Load conversation history
-            memory_vars = vector_memory.load_memory_variables({
+            memory_vars = await vector_memory.aload_memory_variables({
                 "session_id": session_id,
                 "user_message": user_message
             })
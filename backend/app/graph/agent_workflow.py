@@ -1,8 +1,9 @@
 from typing import TypedDict, List, Dict, Any
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
+from app.memory.checkpointer import checkpointer
 from app.agents.langchain_agents import menu_executor, order_executor, confirmation_executor
+from app.core.intents import IntentClassifier
 
 class AgentCafeState(TypedDict):
     session_id: str
@@ -12,20 +13,17 @@ class AgentCafeState(TypedDict):
     menu_context: List[str]
     total_amount: float
 
+# Checked in order (confirmation first so "place order" is not taken as a new order)
+COORDINATOR_INTENTS = IntentClassifier("coordinator", [
+    ("confirmation", ["place order", "confirm*", "checkout", "finish*", "complete order"], 0.9),
+    ("menu", ["menu*", "coffee*", "drinks", "what do you have", "show me"], 0.8),
+    ("order", ["add", "adding", "order*", "cart", "buy*", "get"], 0.8),
+], default="menu")
+
 # Node functions that use standard LangChain agents
 async def coordinator_node(state: AgentCafeState) -> AgentCafeState:
     """Determine which agent should handle the request"""
-    user_message = state["messages"][-1].content.lower()
-    
-    # Intent classification - improved for order confirmation
-    if any(keyword in user_message for keyword in ["place order", "confirm", "checkout", "finish", "complete order"]):
-        intent = "confirmation"
-    elif any(keyword in user_message for keyword in ["menu", "coffee", "drinks", "what do you have", "show me"]):
-        intent = "menu"
-    elif any(keyword in user_message for keyword in ["add", "order", "cart", "buy", "get"]):
-        intent = "order"
-    else:
-        intent = "menu"  # Default to menu
+    intent = COORDINATOR_INTENTS.classify(state["messages"][-1].content).name
     
     return {**state, "current_intent": intent}
 
@@ -121,11 +119,8 @@ def create_agent_workflow():
     workflow.add_edge("order_agent", END)
     workflow.add_edge("confirmation_agent", END)
     
-    # Add memory for persistence
-    memory = MemorySaver()
-    
-    # Compile the workflow
-    return workflow.compile(checkpointer=memory)
+    # Compile the workflow with the shared checkpointer for persistence
+    return workflow.compile(checkpointer=checkpointer)
 
 # Create the workflow instance
 agent_workflow = create_agent_workflow()
@@ -1,9 +1,13 @@
 from typing import Dict, Any
 from langchain_core.messages import HumanMessage, AIMessage
 from app.graph.state import CafeState
-from app.core.bedrock import get_haiku_response
-from app.models.menu import MenuItem
+from app.core.bedrock import generate
+from app.core.catalog import menu_catalog
+from app.core.commands import command_parser
+from app.core.intents import IntentClassifier
+from app.core.pricing import price_cart
 import json
+import re
 
 async def menu_node(state: CafeState) -> Dict[str, Any]:
     """Handle menu-related queries"""
@@ -12,8 +16,8 @@ async def menu_node(state: CafeState) -> Dict[str, Any]:
         user_message = state["messages"][-1].content
         
         # Get menu items for context
-        items = await MenuItem.filter(available=True)
-        menu_context = "\n".join([f"- {item.name}: ${float(item.price):.2f} - {item.description}" for item in items])
+        menu = await menu_catalog.get()
+        menu_context = menu.menu_prompt
         
         prompt = f"""You are a helpful barista assistant. Here's our menu:
 
@@ -23,12 +27,18 @@ Customer message: "{user_message}"
 
 Respond naturally and helpfully about our menu items. Be friendly and conversational."""
 
-        ai_response = get_haiku_response(prompt)
+        llm_response = await generate(prompt)
+        if not llm_response.ok:
+            return {
+                "messages": state["messages"] + [AIMessage(content="I'm having trouble with the menu right now. Please try again.")],
+                "current_agent": "menu"
+            }
+        ai_response = llm_response.text
         
         return {
             "messages": state["messages"] + [AIMessage(content=ai_response)],
             "current_agent": "menu",
-            "menu_context": [{"name": item.name, "price": float(item.price), "description": item.description} for item in items]
+            "menu_context": [{"name": item.name, "price": item.price, "description": item.description} for item in menu.items]
         }
     except Exception as e:
         return {
@@ -44,8 +54,8 @@ async def order_node(state: CafeState) -> Dict[str, Any]:
         current_cart = state.get("cart", {})
         
         # Get menu for context
-        menu_items = await MenuItem.filter(available=True)
-        menu_context = "\n".join([f"- {item.name}: ${float(item.price):.2f}" for item in menu_items])
+        menu = await menu_catalog.get()
+        menu_context = menu.price_prompt
         
         prompt = f"""You are a barista assistant handling orders. Available items:
 
@@ -63,7 +73,18 @@ Analyze the message and respond with ONE of these actions:
 
 Only respond with the action, nothing else."""
 
-        ai_response = get_haiku_response(prompt)
+        # Unambiguous commands are parsed locally instead of asking the model for the action
+        command = command_parser.parse(user_message, menu)
+        if command.confident and command.verb in ("add", "show_cart"):
+            ai_response = command.action
+        else:
+            llm_response = await generate(prompt, max_tokens=100)
+            if not llm_response.ok:
+                return {
+                    "messages": state["messages"] + [AIMessage(content="I'm having trouble with your order. Please try again.")],
+                    "current_agent": "order"
+                }
+            ai_response = llm_response.text.strip()
         
         # Process AI response
         if ai_response.startswith("ADD:"):
@@ -73,13 +94,13 @@ Only respond with the action, nothing else."""
             
             for item_text in items_to_add:
                 item_text = item_text.strip()
-                for item in menu_items:
+                quantity_match = re.match(r"(\d+)x\s+", item_text)
+                quantity = int(quantity_match.group(1)) if quantity_match else 1
+                for item in menu.items:
                     if item.name.lower() in item_text.lower():
-                        if item.id in updated_cart:
-                            updated_cart[item.id] += 1
-                        else:
-                            updated_cart[item.id] = 1
-                        added_items.append(f"1x {item.name} (${float(item.price):.2f})")
+                        key = str(item.id)
+                        updated_cart[key] = updated_cart.get(key, 0) + quantity
+                        added_items.append(f"{quantity}x {item.name} (${item.price:.2f})")
                         break
             
             if added_items:
@@ -97,14 +118,12 @@ Only respond with the action, nothing else."""
             if not current_cart:
                 response = "Your cart is empty. Add some items by saying something like 'add a latte'!"
             else:
-                total = 0
+                priced = await price_cart(current_cart)
+                total = priced.subtotal
                 cart_display = "Your order:\n\n"
                 
-                for item_id, quantity in current_cart.items():
-                    item = await MenuItem.get(id=item_id)
-                    item_total = float(item.price) * quantity
-                    total += item_total
-                    cart_display += f"• {quantity}x {item.name} - ${item_total:.2f}\n"
+                for line in priced.lines:
+                    cart_display += f"• {line.quantity}x {line.name} - ${line.line_total:.2f}\n"
                 
                 cart_display += f"\nTotal: ${total:.2f}\n\nSay 'confirm order' to place your order!"
                 response = cart_display
@@ -154,26 +173,20 @@ async def confirmation_node(state: CafeState) -> Dict[str, Any]:
             "current_agent": "confirmation"
         }
 
+# Checked in order; the first rule with a matching phrase wins, anything else goes to the menu
+ROUTER_INTENTS = IntentClassifier("router", [
+    ("menu", [
+        "menu*", "coffee*", "latte*", "cappuccino*", "espresso*", "mocha*", "americano*",
+        "what do you have", "option*", "drinks"
+    ], 0.8),
+    ("order", ["add", "adding", "order*", "cart", "remove*", "total", "show", "get"], 0.8),
+    ("confirmation", ["confirm*", "place", "yes", "proceed*", "checkout"], 0.8),
+], default="menu")
+
 async def router_node(state: CafeState) -> str:
     """Route to appropriate agent based on user intent"""
     try:
-        user_message = state["messages"][-1].content.lower()
-        
-        # Menu-related keywords
-        if any(word in user_message for word in ["menu", "coffee", "latte", "cappuccino", "espresso", "mocha", "americano", "what do you have", "options", "drinks"]):
-            return "menu"
-        
-        # Order-related keywords
-        elif any(word in user_message for word in ["add", "order", "cart", "remove", "total", "show", "get"]):
-            return "order"
-        
-        # Confirmation keywords
-        elif any(word in user_message for word in ["confirm", "place", "yes", "proceed", "checkout"]):
-            return "confirmation"
-        
-        # Default to menu for general queries
-        else:
-            return "menu"
+        return ROUTER_INTENTS.classify(state["messages"][-1].content).name
             
     except Exception:
         return "menu"
@@ -1,10 +1,29 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import init_db, close_db
+from app.core.database import init_db, close_db, check_db, DB_READY_TIMEOUT
+from app.core.db_pool import db_pool_metrics
 from app.api import chat, menu, orders, auth, admin
 from app.models.menu import MenuItem
 from app.models.user import User
-from app.core.security import get_password_hash
+from app.core.security import password_hasher
+from app.agents.registry import agent_registry, parse_warmup_specs
+from app.memory.checkpointer import checkpointer
+from app.core.loop_monitor import loop_monitor
+from app.core.bedrock import bedrock_client
+from app.core.cache_sync import cache_sync
+from app.core.catalog import menu_catalog
+from app.core.cart_store import cart_store
+from app.core.outbox import outbox
+from app.core.email import smtp_pool
+from app.core.email_jobs import email_jobs
+from app.core.slack import slack_notifier
+from app.core.principals import principal_cache
+from app.core.admin_stats import admin_stats
+from app.core.response_cache import response_cache
+from app.core.commands import command_parser
+from app.core.intents import intent_stats
+from app.memory.vector_memory import vector_memory
 import asyncio
 
 app = FastAPI(title="Barista Agentic App", version="1.0.0")
@@ -15,6 +34,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
@@ -23,20 +43,37 @@ app.include_router(chat.router, prefix="/api", tags=["chat"])
 app.include_router(menu.router, prefix="/api", tags=["menu"])
 app.include_router(orders.router, prefix="/api", tags=["orders"])
 
+# Long-running maintenance tasks started with the application
+background_tasks = []
+
 @app.on_event("startup")
 async def startup_event():
+    loop_monitor.start()
     await init_db()
     await seed_menu_data()
     await seed_admin_user()
+    await menu_catalog.load()
+    await agent_registry.warm_up(parse_warmup_specs())
+    background_tasks.append(asyncio.create_task(checkpointer.run_compaction()))
+    background_tasks.append(asyncio.create_task(cache_sync.run()))
+    background_tasks.append(asyncio.create_task(cart_store.run_expiry()))
+    background_tasks.append(asyncio.create_task(outbox.run()))
+    background_tasks.append(asyncio.create_task(email_jobs.run()))
+    background_tasks.append(asyncio.create_task(admin_stats.run()))
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    loop_monitor.stop()
+    await smtp_pool.close()
+    await slack_notifier.close()
+    password_hasher.close()
     await close_db()
 
 async def seed_menu_data():
     # Check if menu items already exist
-    existing_items = await MenuItem.all()
-    if existing_items:
+    if await MenuItem.exists():
         return
     
     # Seed initial menu data
@@ -53,6 +90,8 @@ async def seed_menu_data():
     
     for item_data in menu_items:
         await MenuItem.create(**item_data)
+    # Replicas that started before the seed reload on their next poll
+    await cache_sync.bump("menu")
 
 async def seed_admin_user():
     # Check if admin user already exists
@@ -65,7 +104,7 @@ async def seed_admin_user():
         email="admin@coffeeandai.com",
         username="admin",
         full_name="Admin User",
-        hashed_password=get_password_hash("admin123"),
+        hashed_password=await password_hasher.hash("admin123"),
         is_admin=True,
         is_active=True
     )
@@ -78,3 +117,44 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 while the database is unreachable or the pool has no free connection"""
+    try:
+        await check_db()
+    except asyncio.TimeoutError:
+        error = f"Database did not answer within {DB_READY_TIMEOUT:.0f}s"
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    else:
+        return {"status": "ready", "database_pool": db_pool_metrics.stats()}
+    return JSONResponse(
+        status_code=503,
+        content={"status": "unavailable", "error": error, "database_pool": db_pool_metrics.stats()}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime statistics for the shared in-process subsystems"""
+    return {
+        "database_pool": db_pool_metrics.stats(),
+        "agent_registry": agent_registry.stats(),
+        "checkpointer": checkpointer.stats(),
+        "event_loop": loop_monitor.stats(),
+        "bedrock": bedrock_client.stats(),
+        "menu_catalog": menu_catalog.stats(),
+        "cache_sync": cache_sync.stats(),
+        "cart_store": cart_store.stats(),
+        "outbox": outbox.stats(),
+        "smtp": smtp_pool.stats(),
+        "email_jobs": email_jobs.stats(),
+        "slack": slack_notifier.stats(),
+        "password_hasher": password_hasher.stats(),
+        "principal_cache": principal_cache.stats(),
+        "admin_stats": admin_stats.stats(),
+        "response_cache": response_cache.stats(),
+        "command_fast_path": command_parser.stats(),
+        "intents": intent_stats(),
+        "vector_memory": vector_memory.stats()
+    }
@@ -0,0 +1,523 @@
+"""
+Shared conversation checkpointer
+LangGraph checkpoints stored in Postgres with an in-memory LRU front tier
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+# Threads kept in the in-memory front tier per process
+CHECKPOINT_CACHE_THREADS = int(os.getenv("CHECKPOINT_CACHE_THREADS", "1000"))
+# Conversations idle for longer than this are dropped from memory and Postgres
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_SECONDS", str(24 * 3600)))
+# Checkpoints kept per thread by compaction (the latest one is all a new turn needs)
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "5"))
+# How often the background compaction runs
+CHECKPOINT_COMPACT_INTERVAL = int(os.getenv("CHECKPOINT_COMPACT_INTERVAL", "300"))
+
+Typed = Tuple[str, bytes]
+
+
+class _ThreadEntry:
+    """Checkpoints and pending writes of one thread held in memory"""
+
+    __slots__ = ("checkpoints", "writes", "touched")
+
+    def __init__(self):
+        # checkpoint_ns -> checkpoint_id -> (checkpoint, metadata, parent_checkpoint_id)
+        self.checkpoints: Dict[str, Dict[str, Tuple[Typed, Typed, Optional[str]]]] = {}
+        # (checkpoint_ns, checkpoint_id) -> (task_id, idx) -> (task_id, channel, value, task_path)
+        self.writes: Dict[Tuple[str, str], Dict[Tuple[str, int], Tuple[str, str, Typed, str]]] = {}
+        self.touched = time.monotonic()
+
+
+class TieredCheckpointSaver(BaseCheckpointSaver[str]):
+    """Checkpointer shared by every agent and every backend replica.
+
+    Async methods (used by ``ainvoke``/``astream``) read and write Postgres and keep
+    recently used threads in an LRU memory tier, so a warm turn only costs a lookup of
+    the latest checkpoint id. Sync methods serve the memory tier only.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = CHECKPOINT_CACHE_THREADS,
+        ttl_seconds: int = CHECKPOINT_TTL_SECONDS,
+        keep_last: int = CHECKPOINT_KEEP_LAST,
+        *,
+        serde=None
+    ):
+        super().__init__(serde=serde)
+        self.max_threads = max(1, max_threads)
+        self.ttl_seconds = ttl_seconds
+        self.keep_last = max(1, keep_last)
+        self._threads: "OrderedDict[str, _ThreadEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ----------------------------------------------------------------- memory tier
+
+    def _entry(self, thread_id: str, create: bool = False) -> Optional[_ThreadEntry]:
+        entry = self._threads.get(thread_id)
+        now = time.monotonic()
+        if entry is not None and now - entry.touched > self.ttl_seconds:
+            del self._threads[thread_id]
+            entry = None
+        if entry is None:
+            if not create:
+                return None
+            entry = _ThreadEntry()
+            self._threads[thread_id] = entry
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._threads.move_to_end(thread_id)
+        entry.touched = now
+        return entry
+
+    def _remember_checkpoint(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        saved: Tuple[Typed, Typed, Optional[str]]
+    ) -> None:
+        entry = self._entry(thread_id, create=True)
+        checkpoints = entry.checkpoints.setdefault(checkpoint_ns, {})
+        checkpoints[checkpoint_id] = saved
+        # Keep memory bounded per thread as well as per process
+        if len(checkpoints) > self.keep_last:
+            for old_id in sorted(checkpoints.keys())[:-self.keep_last]:
+                del checkpoints[old_id]
+                entry.writes.pop((checkpoint_ns, old_id), None)
+
+    def _remember_writes(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        writes: Sequence[Tuple[str, int, str, Typed, str]]
+    ) -> None:
+        entry = self._entry(thread_id, create=True)
+        stored = entry.writes.setdefault((checkpoint_ns, checkpoint_id), {})
+        for task_id, idx, channel, value, task_path in writes:
+            # Regular writes are only recorded once, special channels are overwritten
+            if idx >= 0 and (task_id, idx) in stored:
+                continue
+            stored[(task_id, idx)] = (task_id, channel, value, task_path)
+
+    def _memory_tuple(self, thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]) -> Optional[CheckpointTuple]:
+        entry = self._entry(thread_id)
+        if entry is None:
+            return None
+        checkpoints = entry.checkpoints.get(checkpoint_ns)
+        if not checkpoints:
+            return None
+        if checkpoint_id is None:
+            checkpoint_id = max(checkpoints.keys())
+        saved = checkpoints.get(checkpoint_id)
+        if saved is None:
+            return None
+        writes = entry.writes.get((checkpoint_ns, checkpoint_id), {}).values()
+        return self._make_tuple(
+            thread_id,
+            checkpoint_ns,
+            checkpoint_id,
+            saved,
+            [(task_id, channel, value) for task_id, channel, value, _ in writes]
+        )
+
+    def _make_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        saved: Tuple[Typed, Typed, Optional[str]],
+        writes: List[Tuple[str, str, Typed]]
+    ) -> CheckpointTuple:
+        checkpoint, metadata, parent_checkpoint_id = saved
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed(checkpoint),
+            metadata=self.serde.loads_typed(metadata),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed(value)) for task_id, channel, value in writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def _serialize(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata) -> Tuple[Typed, Typed, Optional[str]]:
+        return (
+            self.serde.dumps_typed(checkpoint),
+            self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+            config["configurable"].get("checkpoint_id"),
+        )
+
+    def _serialize_writes(self, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str) -> List[Tuple[str, int, str, Typed, str]]:
+        return [
+            (task_id, WRITES_IDX_MAP.get(channel, idx), channel, self.serde.dumps_typed(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+
+    @staticmethod
+    def _matches(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+        return not filter or all(metadata.get(key) == value for key, value in filter.items())
+
+    # ------------------------------------------------------------------- sync API
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        return self._memory_tuple(thread_id, checkpoint_ns, get_checkpoint_id(config))
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[CheckpointTuple]:
+        thread_ids = [config["configurable"]["thread_id"]] if config else list(self._threads.keys())
+        before_id = get_checkpoint_id(before) if before else None
+        for thread_id in thread_ids:
+            entry = self._entry(thread_id)
+            if entry is None:
+                continue
+            for checkpoint_ns, checkpoints in list(entry.checkpoints.items()):
+                if config and "checkpoint_ns" in config["configurable"] and config["configurable"]["checkpoint_ns"] != checkpoint_ns:
+                    continue
+                for checkpoint_id in sorted(checkpoints.keys(), reverse=True):
+                    if before_id and checkpoint_id >= before_id:
+                        continue
+                    checkpoint_tuple = self._memory_tuple(thread_id, checkpoint_ns, checkpoint_id)
+                    if checkpoint_tuple is None or not self._matches(checkpoint_tuple.metadata, filter):
+                        continue
+                    if limit is not None:
+                        if limit <= 0:
+                            return
+                        limit -= 1
+                    yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        self._remember_checkpoint(thread_id, checkpoint_ns, checkpoint["id"], self._serialize(config, checkpoint, metadata))
+        return self._next_config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    @staticmethod
+    def _next_config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        self._remember_writes(
+            config["configurable"]["thread_id"],
+            config["configurable"].get("checkpoint_ns", ""),
+            config["configurable"]["checkpoint_id"],
+            self._serialize_writes(writes, task_id, task_path)
+        )
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._threads.pop(thread_id, None)
+
+    # ------------------------------------------------------------------ async API
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        from app.models.checkpoint import ConversationCheckpoint, ConversationCheckpointWrite
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        try:
+            if checkpoint_id is None:
+                # Another replica may have advanced this thread, so always ask for the latest id
+                latest = await ConversationCheckpoint.filter(
+                    thread_id=thread_id, checkpoint_ns=checkpoint_ns
+                ).order_by("-checkpoint_id").limit(1).values_list("checkpoint_id", flat=True)
+                if not latest:
+                    return self._memory_tuple(thread_id, checkpoint_ns, None)
+                checkpoint_id = latest[0]
+
+            cached = self._memory_tuple(thread_id, checkpoint_ns, checkpoint_id)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            self.misses += 1
+            row = await ConversationCheckpoint.get_or_none(
+                thread_id=thread_id, checkpoint_ns=checkpoint_ns, checkpoint_id=checkpoint_id
+            )
+            if row is None:
+                return None
+            write_rows = await ConversationCheckpointWrite.filter(
+                thread_id=thread_id, checkpoint_ns=checkpoint_ns, checkpoint_id=checkpoint_id
+            ).order_by("task_id", "idx")
+        except Exception as e:
+            print(f"[CHECKPOINT] Postgres read failed, serving from memory: {str(e)}")
+            return self._memory_tuple(thread_id, checkpoint_ns, checkpoint_id)
+
+        saved = (
+            (row.checkpoint_type, bytes(row.checkpoint)),
+            (row.metadata_type, bytes(row.checkpoint_metadata)),
+            row.parent_checkpoint_id,
+        )
+        self._remember_checkpoint(thread_id, checkpoint_ns, checkpoint_id, saved)
+        self._remember_writes(thread_id, checkpoint_ns, checkpoint_id, [
+            (w.task_id, w.idx, w.channel, (w.value_type, bytes(w.value)), w.task_path) for w in write_rows
+        ])
+        return self._memory_tuple(thread_id, checkpoint_ns, checkpoint_id)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        from app.models.checkpoint import ConversationCheckpoint, ConversationCheckpointWrite
+
+        query = ConversationCheckpoint.all()
+        if config:
+            query = query.filter(thread_id=config["configurable"]["thread_id"])
+            if "checkpoint_ns" in config["configurable"]:
+                query = query.filter(checkpoint_ns=config["configurable"]["checkpoint_ns"])
+        if before and get_checkpoint_id(before):
+            query = query.filter(checkpoint_id__lt=get_checkpoint_id(before))
+        # Metadata filters are applied after deserialization, so only limit the query without them
+        if limit is not None and not filter:
+            query = query.limit(limit)
+
+        for row in await query.order_by("-checkpoint_id"):
+            saved = (
+                (row.checkpoint_type, bytes(row.checkpoint)),
+                (row.metadata_type, bytes(row.checkpoint_metadata)),
+                row.parent_checkpoint_id,
+            )
+            metadata = self.serde.loads_typed(saved[1])
+            if not self._matches(metadata, filter):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    return
+                limit -= 1
+            write_rows = await ConversationCheckpointWrite.filter(
+                thread_id=row.thread_id, checkpoint_ns=row.checkpoint_ns, checkpoint_id=row.checkpoint_id
+            ).order_by("task_id", "idx")
+            yield self._make_tuple(
+                row.thread_id,
+                row.checkpoint_ns,
+                row.checkpoint_id,
+                saved,
+                [(w.task_id, w.channel, (w.value_type, bytes(w.value))) for w in write_rows]
+            )
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        from app.models.checkpoint import ConversationCheckpoint
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        saved = self._serialize(config, checkpoint, metadata)
+        self._remember_checkpoint(thread_id, checkpoint_ns, checkpoint["id"], saved)
+        checkpoint_data, metadata_data, parent_checkpoint_id = saved
+
+        try:
+            await ConversationCheckpoint.bulk_create([
+                ConversationCheckpoint(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint["id"],
+                    parent_checkpoint_id=parent_checkpoint_id,
+                    checkpoint_type=checkpoint_data[0],
+                    checkpoint=checkpoint_data[1],
+                    metadata_type=metadata_data[0],
+                    checkpoint_metadata=metadata_data[1],
+                )
+            ], ignore_conflicts=True)
+        except Exception as e:
+            print(f"[CHECKPOINT] Postgres write failed, kept in memory only: {str(e)}")
+        return self._next_config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        from app.models.checkpoint import ConversationCheckpointWrite
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        serialized = self._serialize_writes(writes, task_id, task_path)
+        self._remember_writes(thread_id, checkpoint_ns, checkpoint_id, serialized)
+
+        try:
+            special = [w for w in serialized if w[1] < 0]
+            if special:
+                # Special channels (errors, interrupts) replace earlier values
+                for write_task_id, idx, _, _, _ in special:
+                    await ConversationCheckpointWrite.filter(
+                        thread_id=thread_id, checkpoint_ns=checkpoint_ns,
+                        checkpoint_id=checkpoint_id, task_id=write_task_id, idx=idx
+                    ).delete()
+            await ConversationCheckpointWrite.bulk_create([
+                ConversationCheckpointWrite(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint_id,
+                    task_id=write_task_id,
+                    task_path=write_task_path,
+                    idx=idx,
+                    channel=channel,
+                    value_type=value[0],
+                    value=value[1],
+                )
+                for write_task_id, idx, channel, value, write_task_path in serialized
+            ], ignore_conflicts=True)
+        except Exception as e:
+            print(f"[CHECKPOINT] Postgres write failed, kept in memory only: {str(e)}")
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        from app.models.checkpoint import ConversationCheckpoint, ConversationCheckpointWrite
+
+        self.delete_thread(thread_id)
+        await ConversationCheckpoint.filter(thread_id=thread_id).delete()
+        await ConversationCheckpointWrite.filter(thread_id=thread_id).delete()
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same monotonic string versions as InMemorySaver, sortable across processes
+        import random
+
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        next_v = current_v + 1
+        next_h = random.random()
+        return f"{next_v:032}.{next_h:016}"
+
+    # ---------------------------------------------------------------- maintenance
+
+    async def acompact(self) -> Dict[str, int]:
+        """Expire idle threads and drop all but the newest checkpoints of each thread"""
+        from tortoise import Tortoise
+
+        now = time.monotonic()
+        for thread_id in [t for t, entry in self._threads.items() if now - entry.touched > self.ttl_seconds]:
+            del self._threads[thread_id]
+
+        conn = Tortoise.get_connection("default")
+        expired = await conn.execute_query(
+            "DELETE FROM conversation_checkpoints "
+            "WHERE thread_id IN ("
+            "  SELECT thread_id FROM conversation_checkpoints"
+            "  GROUP BY thread_id HAVING MAX(created_at) < NOW() - ($1::int * INTERVAL '1 second')"
+            ")",
+            [self.ttl_seconds]
+        )
+        compacted = await conn.execute_query(
+            "DELETE FROM conversation_checkpoints WHERE id IN ("
+            "  SELECT id FROM ("
+            "    SELECT id, ROW_NUMBER() OVER ("
+            "      PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC"
+            "    ) AS position FROM conversation_checkpoints"
+            "  ) ranked WHERE position > $1::int"
+            ")",
+            [self.keep_last]
+        )
+        orphaned = await conn.execute_query(
+            "DELETE FROM conversation_checkpoint_writes w WHERE NOT EXISTS ("
+            "  SELECT 1 FROM conversation_checkpoints c"
+            "  WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns"
+            "  AND c.checkpoint_id = w.checkpoint_id"
+            ")"
+        )
+        return {"expired": expired[0], "compacted": compacted[0], "orphaned_writes": orphaned[0]}
+
+    async def run_compaction(self, interval: int = CHECKPOINT_COMPACT_INTERVAL) -> None:
+        """Background loop compacting checkpoints, started on application startup"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                result = await self.acompact()
+                if any(result.values()):
+                    print(f"[CHECKPOINT] Compaction removed {result}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[CHECKPOINT] Compaction failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Checkpointer statistics for the metrics endpoint"""
+        return {
+            "threads_in_memory": len(self._threads),
+            "max_threads": self.max_threads,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Global checkpointer shared by every agent
+checkpointer = TieredCheckpointSaver()
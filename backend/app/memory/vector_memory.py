@@ -1,111 +1,319 @@
-from typing import List, Dict, Any, Optional
-import json
-from datetime import datetime, timedelta
+"""
+Conversation memory with vector retrieval
+Every exchange is embedded and stored in a contiguous NumPy matrix per session. A prompt
+gets the latest exchanges plus the earlier ones most similar (cosine) to the new
+message, up to a token budget. Sessions live in one LRU: once the process-wide byte
+ceiling or session limit is reached, the sessions idle the longest are dropped.
+"""
+import os
+import re
+import sys
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Embedder: "hashing" (local, no network) or "bedrock" (Titan text embeddings)
+VECTOR_MEMORY_EMBEDDER = os.getenv("VECTOR_MEMORY_EMBEDDER", "hashing")
+# Embedding size (Titan v2 accepts 256, 512 or 1024)
+VECTOR_MEMORY_DIMENSIONS = int(os.getenv("VECTOR_MEMORY_DIMENSIONS", "512"))
+# Process-wide ceiling for the heap held by stored exchanges and vectors; idle sessions are
+# evicted beyond it (a short session takes about 20 KB at 512 dimensions)
+VECTOR_MEMORY_MAX_BYTES = int(os.getenv("VECTOR_MEMORY_MAX_BYTES", str(256 * 1024 * 1024)))
+# Sessions kept per process; the least recently used is evicted first
+VECTOR_MEMORY_MAX_SESSIONS = int(os.getenv("VECTOR_MEMORY_MAX_SESSIONS", "10000"))
+# Exchanges kept per session; the oldest are dropped first
+VECTOR_MEMORY_MAX_ENTRIES = int(os.getenv("VECTOR_MEMORY_MAX_ENTRIES", "200"))
+# Token budget (words) of the history put into a prompt
+VECTOR_MEMORY_CONTEXT_TOKENS = int(os.getenv("VECTOR_MEMORY_CONTEXT_TOKENS", "600"))
+# Earlier exchanges retrieved by similarity, on top of the most recent ones
+VECTOR_MEMORY_TOP_K = int(os.getenv("VECTOR_MEMORY_TOP_K", "4"))
+
+# Latest exchanges always included, whatever their similarity
+RECENT_ENTRIES = 2
+# Heap use of a session beyond its entries and arrays: the index object, the array
+# headers and the session's slot and key in the LRU
+SESSION_OVERHEAD = 600
+# Retrieved exchanges less similar than this are left out
+MIN_SIMILARITY = 0.2
+INITIAL_CAPACITY = 8
+
+TOKEN = re.compile(r"[a-z0-9$]+")
+
+
+def entry_size(entry: Dict[str, Any]) -> int:
+    """Heap bytes of a stored exchange: the dict and its values (keys are shared literals)"""
+    return sys.getsizeof(entry) + sum(sys.getsizeof(value) for value in entry.values())
+
+
+class HashingEmbedder:
+    """Local embedder: signed feature hashing of words and word pairs, no model needed"""
+    name = "hashing"
+
+    def __init__(self, dimensions: int = VECTOR_MEMORY_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        words = TOKEN.findall(text.lower())
+        for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = zlib.crc32(term.encode())
+            vector[digest % self.dimensions] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def aembed(self, text: str) -> Optional[np.ndarray]:
+        return self.embed(text)
+
+
+class BedrockEmbedder:
+    """Remote embedder backed by a Bedrock text embedding model"""
+    name = "bedrock"
+
+    def __init__(self, dimensions: int = VECTOR_MEMORY_DIMENSIONS):
+        self.dimensions = dimensions
+        self.errors = 0
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        # A network call cannot be made from synchronous code on the event loop
+        return None
+
+    async def aembed(self, text: str) -> Optional[np.ndarray]:
+        from app.core.bedrock import bedrock_client
+        embedding, error = await bedrock_client.embed(text, self.dimensions)
+        if error or not embedding:
+            self.errors += 1
+            return None
+        return np.asarray(embedding, dtype=np.float32)
+
+
+EMBEDDERS = {"hashing": HashingEmbedder, "bedrock": BedrockEmbedder}
+
+
+def create_embedder(name: str = VECTOR_MEMORY_EMBEDDER, dimensions: int = VECTOR_MEMORY_DIMENSIONS):
+    if name not in EMBEDDERS:
+        print(f"[MEMORY] Unknown embedder {name!r}, using hashing")
+        name = "hashing"
+    return EMBEDDERS[name](dimensions)
+
+
+class SessionIndex:
+    """One session's exchanges and their embeddings, row i of vectors belonging to entries[i]"""
+    __slots__ = ("entries", "vectors", "embedded", "entry_bytes")
+
+    def __init__(self, dimensions: int):
+        self.entries: List[Dict[str, Any]] = []
+        self.vectors = np.zeros((INITIAL_CAPACITY, dimensions), dtype=np.float32)
+        # Rows without an embedding (embedder failure) are zero and never retrieved by similarity
+        self.embedded = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self.entry_bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Heap bytes held by the session, as counted against the memory ceiling"""
+        return (
+            self.vectors.nbytes + self.embedded.nbytes + self.entry_bytes
+            + sys.getsizeof(self.entries) + SESSION_OVERHEAD
+        )
+
+    def append(self, entry: Dict[str, Any], vector: Optional[np.ndarray], max_entries: int) -> None:
+        count = len(self.entries)
+        if count == len(self.vectors):
+            if count >= max_entries:
+                # Drop the oldest quarter at once rather than shifting the matrix every save
+                drop = max(1, count // 4)
+                self.vectors[:count - drop] = self.vectors[drop:count]
+                self.embedded[:count - drop] = self.embedded[drop:count]
+                self.entry_bytes -= sum(old["bytes"] for old in self.entries[:drop])
+                del self.entries[:drop]
+                count -= drop
+            else:
+                capacity = min(max(count * 2, INITIAL_CAPACITY), max_entries)
+                vectors = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+                vectors[:count] = self.vectors[:count]
+                embedded = np.zeros(capacity, dtype=bool)
+                embedded[:count] = self.embedded[:count]
+                self.vectors, self.embedded = vectors, embedded
+
+        if vector is not None:
+            self.vectors[count] = vector
+            self.embedded[count] = True
+        else:
+            self.vectors[count] = 0
+            self.embedded[count] = False
+        entry["bytes"] = 0
+        entry["bytes"] = entry_size(entry)
+        self.entries.append(entry)
+        self.entry_bytes += entry["bytes"]
+
+    def search(self, query: Optional[np.ndarray], top_k: int, budget: int) -> List[Dict[str, Any]]:
+        """Most recent exchanges, then the most similar earlier ones, within the token budget"""
+        count = len(self.entries)
+        recent = list(range(count - 1, max(0, count - RECENT_ENTRIES) - 1, -1))
+        ranked: List[int] = []
+        earlier = count - len(recent)
+        if query is not None and earlier > 0 and top_k > 0:
+            scores = self.vectors[:earlier] @ query
+            scores[~self.embedded[:earlier]] = -1.0
+            k = min(top_k, earlier)
+            candidates = np.argpartition(-scores, k - 1)[:k]
+            ranked = [int(i) for i in candidates[np.argsort(-scores[candidates])] if scores[i] >= MIN_SIMILARITY]
+
+        picked: List[int] = []
+        used = 0
+        for index in recent + ranked:
+            tokens = self.entries[index]["tokens"]
+            # The latest exchange always goes in; anything else only if it fits
+            if picked and used + tokens > budget:
+                continue
+            picked.append(index)
+            used += tokens
+        return [self.entries[index] for index in sorted(picked)]
+
 
 class SimpleVectorMemory:
-    """Simple vector-based memory for conversation history"""
-    
-    def __init__(self, max_tokens: int = 2000):
-        self.conversations: Dict[str, List[Dict]] = {}
-        self.max_tokens = max_tokens
+    """Vector-indexed conversation memory for all sessions, bounded by a global byte ceiling"""
+
+    def __init__(self, embedder=None, max_bytes: int = VECTOR_MEMORY_MAX_BYTES,
+                 max_sessions: int = VECTOR_MEMORY_MAX_SESSIONS, max_entries: int = VECTOR_MEMORY_MAX_ENTRIES,
+                 context_tokens: int = VECTOR_MEMORY_CONTEXT_TOKENS, top_k: int = VECTOR_MEMORY_TOP_K):
+        self.embedder = embedder or create_embedder()
+        self.max_bytes = max_bytes
+        self.max_sessions = max(1, max_sessions)
+        self.max_entries = max(INITIAL_CAPACITY, max_entries)
+        self.context_tokens = context_tokens
+        self.top_k = top_k
         self.memory_key = "conversation_history"
-    
-    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """Load conversation history for the session"""
-        session_id = inputs.get("session_id", "default")
-        history = self.get_relevant_history(session_id, inputs.get("user_message", ""))
-        
-        # Format history for prompt
+        self._sessions: "OrderedDict[str, SessionIndex]" = OrderedDict()
+        self._bytes = 0
+        self.saves = 0
+        self.retrievals = 0
+        self.evictions = 0
+
+    def _format(self, history: List[Dict[str, Any]]) -> Dict[str, Any]:
         formatted_history = []
         for entry in history:
             formatted_history.append(f"User: {entry['user']}")
             formatted_history.append(f"Assistant: {entry['assistant']}")
-        
-        return {
-            self.memory_key: "\n".join(formatted_history[-10:])  # Last 5 exchanges
-        }
-    
-    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        """Save the conversation context"""
-        session_id = inputs.get("session_id", "default")
-        user_message = inputs.get("user_message", "")
-        assistant_response = outputs.get("response", "")
-        
-        if session_id not in self.conversations:
-            self.conversations[session_id] = []
-        
-        # Add new conversation entry
+        return {self.memory_key: "\n".join(formatted_history)}
+
+    def _search(self, session_id: str, query: Optional[np.ndarray]) -> List[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        if session is None or not session.entries:
+            return []
+        self._sessions.move_to_end(session_id)
+        self.retrievals += 1
+        return session.search(query, self.top_k, self.context_tokens)
+
+    def _store(self, session_id: str, user_message: str, assistant_response: str,
+               vector: Optional[np.ndarray]) -> None:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = SessionIndex(self.embedder.dimensions)
+        else:
+            self._bytes -= session.nbytes
+        self._sessions.move_to_end(session_id)
+
         entry = {
             "user": user_message,
             "assistant": assistant_response,
             "timestamp": datetime.now().isoformat(),
             "tokens": len(user_message.split()) + len(assistant_response.split())
         }
-        
-        self.conversations[session_id].append(entry)
-        
-        # Trim old conversations if too long
-        self._trim_memory(session_id)
-    
+        session.append(entry, vector, self.max_entries)
+        self._bytes += session.nbytes
+        self.saves += 1
+        self._evict()
+
+    def _evict(self) -> None:
+        """Drop the least recently used sessions until under both limits (the active one stays)"""
+        while len(self._sessions) > 1 and (self._bytes > self.max_bytes or len(self._sessions) > self.max_sessions):
+            _, session = self._sessions.popitem(last=False)
+            self._bytes -= session.nbytes
+            self.evictions += 1
+
+    @staticmethod
+    def _exchange(user_message: str, assistant_response: str) -> str:
+        return f"{user_message}\n{assistant_response}"
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Load conversation history for the session (remote embedders fall back to recent exchanges)"""
+        session_id = inputs.get("session_id", "default")
+        return self._format(self.get_relevant_history(session_id, inputs.get("user_message", "")))
+
+    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Load conversation history for the session"""
+        session_id = inputs.get("session_id", "default")
+        if session_id not in self._sessions:
+            return self._format([])
+        query = await self.embedder.aembed(inputs.get("user_message", ""))
+        return self._format(self._search(session_id, query))
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """Save the conversation context"""
+        user_message = inputs.get("user_message", "")
+        assistant_response = outputs.get("response", "")
+        vector = self.embedder.embed(self._exchange(user_message, assistant_response))
+        self._store(inputs.get("session_id", "default"), user_message, assistant_response, vector)
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """Save the conversation context"""
+        user_message = inputs.get("user_message", "")
+        assistant_response = outputs.get("response", "")
+        vector = await self.embedder.aembed(self._exchange(user_message, assistant_response))
+        self._store(inputs.get("session_id", "default"), user_message, assistant_response, vector)
+
     def clear(self) -> None:
         """Clear all memory"""
-        self.conversations.clear()
-    
+        self._sessions.clear()
+        self._bytes = 0
+
     def get_relevant_history(self, session_id: str, current_message: str) -> List[Dict]:
-        """Get relevant conversation history using simple similarity"""
-        if session_id not in self.conversations:
+        """Recent and most similar exchanges of the session, oldest first"""
+        if session_id not in self._sessions:
             return []
-        
-        history = self.conversations[session_id]
-        
-        # Simple relevance: recent conversations + keyword matching
-        relevant = []
-        current_words = set(current_message.lower().split())
-        
-        for entry in history[-10:]:  # Last 10 entries
-            # Always include recent entries
-            if len(relevant) < 5:
-                relevant.append(entry)
-            else:
-                # Check for keyword overlap
-                entry_words = set((entry['user'] + ' ' + entry['assistant']).lower().split())
-                overlap = len(current_words.intersection(entry_words))
-                
-                if overlap > 1:  # At least 2 word overlap
-                    relevant.append(entry)
-        
-        return relevant[-8:]  # Return last 8 relevant entries
-    
-    def _trim_memory(self, session_id: str) -> None:
-        """Trim memory to stay within token limits"""
-        if session_id not in self.conversations:
-            return
-        
-        conversations = self.conversations[session_id]
-        total_tokens = sum(entry['tokens'] for entry in conversations)
-        
-        # Remove oldest entries if over limit
-        while total_tokens > self.max_tokens and len(conversations) > 5:
-            removed = conversations.pop(0)
-            total_tokens -= removed['tokens']
-    
+        return self._search(session_id, self.embedder.embed(current_message))
+
     def clear_session(self, session_id: str) -> None:
         """Clear memory for a specific session"""
-        if session_id in self.conversations:
-            del self.conversations[session_id]
-    
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._bytes -= session.nbytes
+
     def get_session_summary(self, session_id: str) -> Dict[str, Any]:
         """Get summary statistics for a session"""
-        if session_id not in self.conversations:
+        session = self._sessions.get(session_id)
+        if session is None or not session.entries:
             return {"total_messages": 0, "total_tokens": 0}
-        
-        conversations = self.conversations[session_id]
+
+        entries = session.entries
         return {
-            "total_messages": len(conversations),
-            "total_tokens": sum(entry['tokens'] for entry in conversations),
-            "first_message": conversations[0]['timestamp'] if conversations else None,
-            "last_message": conversations[-1]['timestamp'] if conversations else None
+            "total_messages": len(entries),
+            "total_tokens": sum(entry['tokens'] for entry in entries),
+            "first_message": entries[0]['timestamp'],
+            "last_message": entries[-1]['timestamp']
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and eviction statistics for the metrics endpoint"""
+        stats = {
+            "embedder": self.embedder.name,
+            "dimensions": self.embedder.dimensions,
+            "sessions": len(self._sessions),
+            "entries": sum(len(session.entries) for session in self._sessions.values()),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_sessions": self.max_sessions,
+            "saves": self.saves,
+            "retrievals": self.retrievals,
+            "evictions": self.evictions
         }
+        if hasattr(self.embedder, "errors"):
+            stats["embedding_errors"] = self.embedder.errors
+        return stats
+
 
 # Global memory instance
 vector_memory = SimpleVectorMemory()
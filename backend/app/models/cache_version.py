@@ -0,0 +1,10 @@
+from tortoise.models import Model
+from tortoise import fields
+
+class CacheVersion(Model):
+    name = fields.CharField(max_length=64, pk=True)  # Cache name, e.g. "menu"
+    version = fields.IntField(default=0)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "cache_versions"
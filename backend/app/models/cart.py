@@ -0,0 +1,12 @@
+from tortoise.models import Model
+from tortoise import fields
+
+class Cart(Model):
+    session_id = fields.CharField(max_length=255, pk=True)
+    items = fields.JSONField(default=dict)  # {item_id: quantity}
+    pending_order = fields.JSONField(null=True)  # Checked-out items awaiting order creation
+    version = fields.IntField(default=1)  # Optimistic concurrency counter
+    updated_at = fields.DatetimeField(auto_now=True, index=True)
+
+    class Meta:
+        table = "carts"
@@ -0,0 +1,35 @@
+from tortoise.models import Model
+from tortoise import fields
+
+class ConversationCheckpoint(Model):
+    id = fields.IntField(pk=True)
+    thread_id = fields.CharField(max_length=255)
+    checkpoint_ns = fields.CharField(max_length=255, default="")
+    checkpoint_id = fields.CharField(max_length=64)
+    parent_checkpoint_id = fields.CharField(max_length=64, null=True)
+    checkpoint_type = fields.CharField(max_length=32)
+    checkpoint = fields.BinaryField()  # Serialized LangGraph checkpoint
+    metadata_type = fields.CharField(max_length=32)
+    checkpoint_metadata = fields.BinaryField()
+    created_at = fields.DatetimeField(auto_now_add=True, index=True)
+
+    class Meta:
+        table = "conversation_checkpoints"
+        unique_together = (("thread_id", "checkpoint_ns", "checkpoint_id"),)
+
+class ConversationCheckpointWrite(Model):
+    id = fields.IntField(pk=True)
+    thread_id = fields.CharField(max_length=255)
+    checkpoint_ns = fields.CharField(max_length=255, default="")
+    checkpoint_id = fields.CharField(max_length=64)
+    task_id = fields.CharField(max_length=64)
+    task_path = fields.CharField(max_length=255, default="")
+    idx = fields.IntField()
+    channel = fields.CharField(max_length=255)
+    value_type = fields.CharField(max_length=32)
+    value = fields.BinaryField()  # Serialized pending write
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "conversation_checkpoint_writes"
+        unique_together = (("thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx"),)
@@ -0,0 +1,31 @@
+from tortoise.models import Model
+from tortoise import fields
+from enum import Enum
+
+class EmailJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class EmailJob(Model):
+    id = fields.IntField(pk=True)
+    subject = fields.CharField(max_length=255)
+    html_content = fields.TextField()
+    text_content = fields.TextField(null=True)
+    user_ids = fields.JSONField()  # Requested recipients; resolved page by page while sending
+    total = fields.IntField(default=0)  # Active users among user_ids when the job was created
+    sent = fields.IntField(default=0)
+    failed = fields.IntField(default=0)
+    cursor = fields.IntField(default=0)  # Last user id processed; the job resumes after it
+    errors = fields.JSONField(default=list)  # Most recent per-recipient failures
+    status = fields.CharEnumField(EmailJobStatus, default=EmailJobStatus.QUEUED)
+    locked_until = fields.DatetimeField(null=True)  # Lease of the replica running it
+    last_error = fields.TextField(null=True)
+    created_by = fields.ForeignKeyField("models.User", related_name="email_jobs", null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    started_at = fields.DatetimeField(null=True)
+    finished_at = fields.DatetimeField(null=True)
+
+    class Meta:
+        table = "email_jobs"
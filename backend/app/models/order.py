@@ -23,6 +23,11 @@ class Order(Model):
 
     class Meta:
         table = "orders"
+        indexes = (
+            ("customer_id", "created_at"),  # Order history of one customer, newest first
+            ("status", "created_at"),  # Orders by status (pending count, ready queue)
+            ("created_at",),  # Recent orders for the dashboard's time series
+        )
 
 class OrderItemSchema(BaseModel):
     item_id: int
@@ -0,0 +1,27 @@
+from tortoise.models import Model
+from tortoise import fields
+from enum import Enum
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    SENT = "sent"
+    SKIPPED = "skipped"  # Channel not configured, nothing to deliver
+    DEAD = "dead"  # Gave up after the maximum number of attempts
+
+class OutboxEvent(Model):
+    id = fields.IntField(pk=True)
+    kind = fields.CharField(max_length=64)  # e.g. "email.order_confirmation"
+    payload = fields.JSONField()  # Keyword arguments of the handler
+    idempotency_key = fields.CharField(max_length=255, unique=True)
+    status = fields.CharEnumField(OutboxStatus, default=OutboxStatus.PENDING)
+    attempts = fields.IntField(default=0)
+    available_at = fields.DatetimeField()  # Not dispatched before this time (retry backoff)
+    locked_until = fields.DatetimeField(null=True)  # Lease of the replica dispatching it
+    last_error = fields.TextField(null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    sent_at = fields.DatetimeField(null=True)
+
+    class Meta:
+        table = "outbox_events"
+        indexes = (("status", "available_at"),)
@@ -15,9 +15,11 @@ class User(Model):
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
     last_login = fields.DatetimeField(null=True)
+    token_version = fields.IntField(default=0)  # Bumped to revoke every token issued so far
 
     class Meta:
         table = "users"
+        indexes = (("created_at", "id"),)  # Keyset pagination of the admin user listing
 
 # Pydantic schemas
 class UserCreate(BaseModel):
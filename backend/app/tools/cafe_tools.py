@@ -1,26 +1,16 @@
 from langchain_core.tools import tool
 from typing import List, Dict, Any
-from app.models.menu import MenuItem
+from app.core.catalog import menu_catalog
 import json
 
 @tool
-def get_menu_items(category: str = None) -> str:
+async def get_menu_items(category: str = None) -> str:
     """Get menu items, optionally filtered by category (coffee, pastry, food)"""
     try:
-        query = MenuItem.all()
-        if category:
-            query = query.filter(category__icontains=category)
-        items = await query.filter(available=True)
+        menu = await menu_catalog.get()
+        items = menu.in_category(category) if category else menu.items
         
-        menu_list = []
-        for item in items:
-            menu_list.append({
-                "id": item.id,
-                "name": item.name,
-                "price": float(item.price),
-                "description": item.description,
-                "category": item.category
-            })
+        menu_list = [item.to_dict() for item in items]
         
         return json.dumps(menu_list)
     except Exception as e:
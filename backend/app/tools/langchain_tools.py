@@ -1,5 +1,5 @@
 from typing import List, Dict, Any, Optional
-from app.models.menu import MenuItem
+from app.core.catalog import menu_catalog
 import json
 
 async def get_menu_items(category: Optional[str] = None) -> str:
@@ -12,20 +12,10 @@ async def get_menu_items(category: Optional[str] = None) -> str:
         JSON string of menu items
     """
     try:
-        query = MenuItem.all()
-        if category:
-            query = query.filter(category__icontains=category)
-        items = await query.filter(available=True)
+        menu = await menu_catalog.get()
+        items = menu.in_category(category) if category else menu.items
         
-        menu_list = []
-        for item in items:
-            menu_list.append({
-                "id": item.id,
-                "name": item.name,
-                "price": float(item.price),
-                "description": item.description,
-                "category": item.category
-            })
+        menu_list = [item.to_dict() for item in items]
         
         return json.dumps(menu_list, indent=2)
     except Exception as e:
@@ -89,12 +79,12 @@ async def get_item_recommendations(preferences: str) -> str:
     """
     try:
         # Simple recommendation logic
-        items = await MenuItem.filter(available=True)
+        menu = await menu_catalog.get()
         recommendations = []
         
         preferences_lower = preferences.lower()
         
-        for item in items:
+        for item in menu.items:
             score = 0
             item_text = f"{item.name} {item.description}".lower()
             
@@ -112,7 +102,7 @@ async def get_item_recommendations(preferences: str) -> str:
                 recommendations.append({
                     "id": item.id,
                     "name": item.name,
-                    "price": float(item.price),
+                    "price": item.price,
                     "description": item.description,
                     "score": score
                 })
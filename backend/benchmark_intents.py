@@ -0,0 +1,181 @@
+"""
+Benchmark and accuracy check for the intent classifiers
+Runs the labelled messages in intent_samples.jsonl through every classifier and
+through the keyword chains they replaced, and reports accuracy and time per message.
+No database or model access is needed.
+
+    python benchmark_intents.py
+
+Exits with status 1 when a classifier's accuracy falls below INTENT_MIN_ACCURACY, so
+it can guard changes to the phrase lists.
+"""
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.agents.custom_workflow import WORKFLOW_INTENTS
+from app.graph.advanced_workflow import INTENT_CLASSIFIER
+from app.graph.agent_workflow import COORDINATOR_INTENTS
+from app.graph.nodes import ROUTER_INTENTS
+
+INTENT_SAMPLES = Path(__file__).parent / "intent_samples.jsonl"
+INTENT_MIN_ACCURACY = float(os.getenv("INTENT_MIN_ACCURACY", "0.85"))
+BENCHMARK_ROUNDS = int(os.getenv("BENCHMARK_ROUNDS", "2000"))
+
+# Seed menu, standing in for the catalog lookup of the custom workflow
+MENU_ITEM_NAMES = ["espresso", "americano", "latte", "cappuccino", "mocha", "croissant", "blueberry muffin", "avocado toast"]
+
+
+# The keyword chains the classifiers replaced, kept as the baseline
+def legacy_advanced_workflow(message: str) -> str:
+    message_lower = message.lower()
+    if any(phrase in message_lower for phrase in [
+        "show menu", "show me the menu", "what do you have", "menu please",
+        "see the menu", "view menu", "tell me about coffee", "why people love coffee",
+        "coffee culture", "recommend", "suggest", "best coffee"
+    ]):
+        return "MENU"
+    elif any(word in message_lower for word in [
+        "add", "order", "get", "buy", "purchase", "want", "i'll have", "give me"
+    ]) or any(phrase in message_lower for phrase in [
+        "add a", "add an", "order a", "order an", "get a", "get an",
+        "i want a", "i want an", "i'll take", "give me a"
+    ]):
+        return "ORDER"
+    elif any(phrase in message_lower for phrase in [
+        "show cart", "my cart", "cart total", "what's in my cart"
+    ]) or any(word in message_lower for word in [
+        "total", "remove", "delete"
+    ]):
+        return "ORDER"
+    elif any(word in message_lower for word in [
+        "confirm", "place", "yes", "proceed", "checkout", "pay"
+    ]):
+        return "CONFIRMATION"
+    elif any(word in message_lower for word in [
+        "hello", "hi", "help", "start", "welcome"
+    ]) and not any(word in message_lower for word in ["add", "order", "get"]):
+        return "GREETING"
+    elif any(word in message_lower for word in [
+        "coffee", "latte", "cappuccino", "espresso", "mocha", "americano",
+        "drinks", "morning", "why", "love", "caffeine", "favorite"
+    ]):
+        return "MENU"
+    return "MENU"
+
+
+def legacy_router(message: str) -> str:
+    user_message = message.lower()
+    if any(word in user_message for word in ["menu", "coffee", "latte", "cappuccino", "espresso", "mocha", "americano", "what do you have", "options", "drinks"]):
+        return "menu"
+    elif any(word in user_message for word in ["add", "order", "cart", "remove", "total", "show", "get"]):
+        return "order"
+    elif any(word in user_message for word in ["confirm", "place", "yes", "proceed", "checkout"]):
+        return "confirmation"
+    return "menu"
+
+
+def legacy_coordinator(message: str) -> str:
+    user_message = message.lower()
+    if any(keyword in user_message for keyword in ["place order", "confirm", "checkout", "finish", "complete order"]):
+        return "confirmation"
+    elif any(keyword in user_message for keyword in ["menu", "coffee", "drinks", "what do you have", "show me"]):
+        return "menu"
+    elif any(keyword in user_message for keyword in ["add", "order", "cart", "buy", "get"]):
+        return "order"
+    return "menu"
+
+
+def mentions_menu_item(message: str) -> bool:
+    text = f" {' '.join(message.lower().split())}"
+    return any(f" {name}" in text for name in MENU_ITEM_NAMES)
+
+
+def legacy_custom_workflow(message: str) -> str:
+    query_lower = message.lower()
+    if any(word in query_lower for word in ["menu", "what", "available", "options"]):
+        return "browse_menu"
+    elif any(word in query_lower for word in ["add", "order", "want", "get"]) or mentions_menu_item(message):
+        return "place_order"
+    elif any(word in query_lower for word in ["cart", "total", "summary"]):
+        return "view_cart"
+    elif any(word in query_lower for word in ["confirm", "yes", "proceed", "checkout"]):
+        return "confirm_order"
+    return "general"
+
+
+def custom_workflow(message: str) -> str:
+    """WORKFLOW_INTENTS plus the menu item rule of analyze_intent"""
+    intent = WORKFLOW_INTENTS.classify(message).name
+    if intent not in ("browse_menu", "place_order") and mentions_menu_item(message):
+        return "place_order"
+    return intent
+
+
+CLASSIFIERS = {
+    "advanced_workflow": (legacy_advanced_workflow, lambda message: INTENT_CLASSIFIER.classify(message).name),
+    "router": (legacy_router, lambda message: ROUTER_INTENTS.classify(message).name),
+    "coordinator": (legacy_coordinator, lambda message: COORDINATOR_INTENTS.classify(message).name),
+    "custom_workflow": (legacy_custom_workflow, custom_workflow),
+}
+
+
+def load_samples():
+    samples = {}
+    with open(INTENT_SAMPLES) as file:
+        for line in file:
+            if line.strip():
+                row = json.loads(line)
+                samples.setdefault(row["classifier"], []).append((row["message"], row["intent"]))
+    return samples
+
+
+def evaluate(classify, samples):
+    """Accuracy, misclassified samples and microseconds per message"""
+    misses = [(message, expected, classify(message)) for message, expected in samples]
+    misses = [miss for miss in misses if miss[1] != miss[2]]
+    start = time.perf_counter()
+    for _ in range(BENCHMARK_ROUNDS):
+        for message, _ in samples:
+            classify(message)
+    elapsed = time.perf_counter() - start
+    return 1 - len(misses) / len(samples), misses, elapsed / (BENCHMARK_ROUNDS * len(samples)) * 1e6
+
+
+def main() -> int:
+    print("\n" + "="*60)
+    print("☕ Coffee and AI - Intent Classifier Benchmark")
+    print("="*60)
+
+    samples = load_samples()
+    failed = []
+    print(f"\n{'Classifier':<20} {'samples':>7} {'legacy acc':>11} {'new acc':>8} {'legacy µs':>10} {'new µs':>7}")
+    results = {}
+    for name, (legacy, current) in CLASSIFIERS.items():
+        rows = samples.get(name, [])
+        if not rows:
+            continue
+        legacy_accuracy, _, legacy_us = evaluate(legacy, rows)
+        accuracy, misses, us = evaluate(current, rows)
+        results[name] = misses
+        print(f"{name:<20} {len(rows):>7} {legacy_accuracy:>10.0%} {accuracy:>8.0%} {legacy_us:>10.1f} {us:>7.1f}")
+        if accuracy < INTENT_MIN_ACCURACY:
+            failed.append(name)
+
+    for name, misses in results.items():
+        for message, expected, got in misses:
+            print(f"  {name}: {message!r} expected {expected}, got {got}")
+
+    print("="*60 + "\n")
+    if failed:
+        print(f"❌ Accuracy below {INTENT_MIN_ACCURACY:.0%}: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "menu_items" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "name" VARCHAR(100) NOT NULL,
+    "description" TEXT NOT NULL,
+    "price" DECIMAL(6,2) NOT NULL,
+    "category" VARCHAR(50) NOT NULL,
+    "available" BOOL NOT NULL  DEFAULT True,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "customers" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "session_id" VARCHAR(100) NOT NULL UNIQUE,
+    "name" VARCHAR(100),
+    "preferences" JSONB NOT NULL,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "orders" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "items" JSONB NOT NULL,
+    "total" DECIMAL(8,2) NOT NULL,
+    "status" VARCHAR(9) NOT NULL  DEFAULT 'pending',
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "customer_id" INT NOT NULL REFERENCES "customers" ("id") ON DELETE CASCADE
+);
+COMMENT ON COLUMN "orders"."status" IS 'PENDING: pending\nCONFIRMED: confirmed\nPREPARING: preparing\nREADY: ready\nCOMPLETED: completed';
+CREATE TABLE IF NOT EXISTS "users" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "email" VARCHAR(255) NOT NULL UNIQUE,
+    "username" VARCHAR(100) NOT NULL UNIQUE,
+    "full_name" VARCHAR(255),
+    "hashed_password" VARCHAR(255) NOT NULL,
+    "is_active" BOOL NOT NULL  DEFAULT True,
+    "is_admin" BOOL NOT NULL  DEFAULT False,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "last_login" TIMESTAMPTZ,
+    "token_version" INT NOT NULL  DEFAULT 0
+);
+-- Databases created by generate_schemas before the column existed
+ALTER TABLE "users" ADD COLUMN IF NOT EXISTS "token_version" INT NOT NULL  DEFAULT 0;
+CREATE INDEX IF NOT EXISTS "idx_users_email_133a6f" ON "users" ("email");
+CREATE INDEX IF NOT EXISTS "idx_users_usernam_266d85" ON "users" ("username");
+CREATE TABLE IF NOT EXISTS "conversation_checkpoints" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "thread_id" VARCHAR(255) NOT NULL,
+    "checkpoint_ns" VARCHAR(255) NOT NULL  DEFAULT '',
+    "checkpoint_id" VARCHAR(64) NOT NULL,
+    "parent_checkpoint_id" VARCHAR(64),
+    "checkpoint_type" VARCHAR(32) NOT NULL,
+    "checkpoint" BYTEA NOT NULL,
+    "metadata_type" VARCHAR(32) NOT NULL,
+    "checkpoint_metadata" BYTEA NOT NULL,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT "uid_conversatio_thread__cd7b07" UNIQUE ("thread_id", "checkpoint_ns", "checkpoint_id")
+);
+CREATE INDEX IF NOT EXISTS "idx_conversatio_created_e51cd7" ON "conversation_checkpoints" ("created_at");
+CREATE TABLE IF NOT EXISTS "conversation_checkpoint_writes" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "thread_id" VARCHAR(255) NOT NULL,
+    "checkpoint_ns" VARCHAR(255) NOT NULL  DEFAULT '',
+    "checkpoint_id" VARCHAR(64) NOT NULL,
+    "task_id" VARCHAR(64) NOT NULL,
+    "task_path" VARCHAR(255) NOT NULL  DEFAULT '',
+    "idx" INT NOT NULL,
+    "channel" VARCHAR(255) NOT NULL,
+    "value_type" VARCHAR(32) NOT NULL,
+    "value" BYTEA NOT NULL,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT "uid_conversatio_thread__6d49c5" UNIQUE ("thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx")
+);
+CREATE TABLE IF NOT EXISTS "cache_versions" (
+    "name" VARCHAR(64) NOT NULL  PRIMARY KEY,
+    "version" INT NOT NULL  DEFAULT 0,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "carts" (
+    "session_id" VARCHAR(255) NOT NULL  PRIMARY KEY,
+    "items" JSONB NOT NULL,
+    "pending_order" JSONB,
+    "version" INT NOT NULL  DEFAULT 1,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS "idx_carts_updated_3b9f4f" ON "carts" ("updated_at");
+CREATE TABLE IF NOT EXISTS "outbox_events" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "kind" VARCHAR(64) NOT NULL,
+    "payload" JSONB NOT NULL,
+    "idempotency_key" VARCHAR(255) NOT NULL UNIQUE,
+    "status" VARCHAR(10) NOT NULL  DEFAULT 'pending',
+    "attempts" INT NOT NULL  DEFAULT 0,
+    "available_at" TIMESTAMPTZ NOT NULL,
+    "locked_until" TIMESTAMPTZ,
+    "last_error" TEXT,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "sent_at" TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS "idx_outbox_even_status_9ab8a9" ON "outbox_events" ("status", "available_at");
+COMMENT ON COLUMN "outbox_events"."status" IS 'PENDING: pending\nPROCESSING: processing\nSENT: sent\nSKIPPED: skipped\nDEAD: dead';
+CREATE TABLE IF NOT EXISTS "email_jobs" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "subject" VARCHAR(255) NOT NULL,
+    "html_content" TEXT NOT NULL,
+    "text_content" TEXT,
+    "user_ids" JSONB NOT NULL,
+    "total" INT NOT NULL  DEFAULT 0,
+    "sent" INT NOT NULL  DEFAULT 0,
+    "failed" INT NOT NULL  DEFAULT 0,
+    "cursor" INT NOT NULL  DEFAULT 0,
+    "errors" JSONB NOT NULL,
+    "status" VARCHAR(9) NOT NULL  DEFAULT 'queued',
+    "locked_until" TIMESTAMPTZ,
+    "last_error" TEXT,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "started_at" TIMESTAMPTZ,
+    "finished_at" TIMESTAMPTZ,
+    "created_by_id" INT REFERENCES "users" ("id") ON DELETE CASCADE
+);
+COMMENT ON COLUMN "email_jobs"."status" IS 'QUEUED: queued\nRUNNING: running\nCOMPLETED: completed\nFAILED: failed';
+CREATE TABLE IF NOT EXISTS "aerich" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "version" VARCHAR(255) NOT NULL,
+    "app" VARCHAR(100) NOT NULL,
+    "content" JSONB NOT NULL
+);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        """
@@ -0,0 +1,14 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_orders_custome_f98ddd" ON "orders" ("customer_id", "created_at");
+CREATE INDEX IF NOT EXISTS "idx_orders_status_c63842" ON "orders" ("status", "created_at");
+ANALYZE "orders";"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_orders_custome_f98ddd";
+DROP INDEX IF EXISTS "idx_orders_status_c63842";"""
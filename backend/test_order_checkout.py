@@ -0,0 +1,149 @@
+"""
+Test script for order confirmation failures
+Makes placing the order fail and checks that the customer's cart survives, for the
+shared confirm_cart helper, the cart command fast path and the deep agent's pending
+order. Runs against an in-memory SQLite database; no Postgres, Bedrock, SMTP or
+Slack needed.
+
+    python test_order_checkout.py
+"""
+import asyncio
+import copy
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tortoise import Tortoise
+
+from app.core import orders
+from app.core.cart_store import cart_store
+from app.core.commands import Command, execute_command
+from app.core.database import TORTOISE_ORM
+from app.main import seed_menu_data
+
+
+async def failing_place_order(session_id, cart, priced=None):
+    raise RuntimeError("simulated database outage")
+
+
+async def test_confirm_cart_keeps_cart_on_failure():
+    """A failed order leaves the cart as it was"""
+    print("\n=== Testing Failed Confirmation ===")
+    session_id = "checkout-failure@example.com"
+    await cart_store.add(session_id, 1, 2)
+    await cart_store.add(session_id, 2)
+    before = (await cart_store.get(session_id)).items
+
+    place_order = orders.place_order
+    orders.place_order = failing_place_order
+    try:
+        await orders.confirm_cart(session_id)
+        print("❌ confirm_cart did not raise\n")
+        return False
+    except RuntimeError:
+        pass
+    finally:
+        orders.place_order = place_order
+
+    after = (await cart_store.get(session_id)).items
+    passed = after == before
+    print(f"✅ Cart intact: {after}\n" if passed else f"❌ Cart was {before}, now {after}\n")
+    return passed
+
+
+async def test_confirm_cart_places_order():
+    """A successful confirmation places the order and empties the cart"""
+    print("=== Testing Successful Confirmation ===")
+    session_id = "checkout-success@example.com"
+    await cart_store.add(session_id, 1, 2)
+
+    order = await orders.confirm_cart(session_id)
+    after = (await cart_store.get(session_id)).items
+    passed = order is not None and order.order_id > 0 and not after
+    print(f"✅ Order #{order.order_id} placed, cart emptied\n" if passed else f"❌ Order {order}, cart {after}\n")
+    return passed
+
+
+async def test_fast_path_keeps_cart_on_failure():
+    """A failed "confirm" command leaves the cart as it was"""
+    print("=== Testing Failed Confirm Command ===")
+    session_id = "command-failure@example.com"
+    await cart_store.add(session_id, 4, 3)
+    before = (await cart_store.get(session_id)).items
+
+    place_order = orders.place_order
+    orders.place_order = failing_place_order
+    try:
+        await execute_command(Command("confirm", confidence=1.0), session_id)
+    except RuntimeError:
+        pass
+    finally:
+        orders.place_order = place_order
+
+    after = (await cart_store.get(session_id)).items
+    passed = after == before
+    print(f"✅ Cart intact: {after}\n" if passed else f"❌ Cart was {before}, now {after}\n")
+    return passed
+
+
+async def test_pending_order_restored():
+    """The deep agent's pending order goes back into the cart when placing it fails"""
+    print("=== Testing Failed Pending Order ===")
+    from app.agents import deep_coordinator
+    session_id = "pending-failure@example.com"
+    await cart_store.add(session_id, 3, 1)
+    before = (await cart_store.get(session_id)).items
+
+    # What the confirm_order tool does during the agent run, then the agent's wrap-up
+    await deep_coordinator._confirm_order(session_id)
+    agent = deep_coordinator.DeepCoordinatorAgent.__new__(deep_coordinator.DeepCoordinatorAgent)
+    result = {"messages": [
+        {"role": "user", "content": "confirm my order"},
+        {"role": "assistant", "content": "Your order is confirmed!"}
+    ]}
+    place_order = deep_coordinator.place_order
+    deep_coordinator.place_order = failing_place_order
+    try:
+        response = await agent._finish(result, "confirm my order", session_id)
+    finally:
+        deep_coordinator.place_order = place_order
+
+    cart = await cart_store.get(session_id)
+    passed = cart.items == before and cart.pending_order is None and "back in your cart" in response
+    print(f"✅ Pending items back in the cart: {cart.items}\n" if passed
+          else f"❌ Cart was {before}, now {cart.items}, pending {cart.pending_order}, response {response!r}\n")
+    return passed
+
+
+async def main():
+    print("\n" + "="*60)
+    print("☕ Coffee and AI - Order Checkout Test Suite")
+    print("="*60)
+
+    config = copy.deepcopy(TORTOISE_ORM)
+    config["connections"] = {"default": "sqlite://:memory:"}
+    await Tortoise.init(config=config)
+    await Tortoise.generate_schemas()
+    await seed_menu_data()
+
+    results = {
+        "Failed Confirmation": await test_confirm_cart_keeps_cart_on_failure(),
+        "Successful Confirmation": await test_confirm_cart_places_order(),
+        "Failed Confirm Command": await test_fast_path_keeps_cart_on_failure(),
+        "Failed Pending Order": await test_pending_order_restored()
+    }
+    await Tortoise.close_connections()
+
+    print("="*60)
+    print("TEST RESULTS SUMMARY")
+    print("="*60)
+    for test_name, result in results.items():
+        status = "✅ PASSED" if result else "❌ FAILED"
+        print(f"{status} - {test_name}")
+    print("="*60 + "\n")
+    return 0 if all(results.values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
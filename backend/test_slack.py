@@ -14,7 +14,8 @@ from app.core.slack import (
     send_new_user_notification,
     send_new_order_notification,
     send_order_ready_notification,
-    send_error_notification
+    send_error_notification,
+    slack_notifier
 )
 
 async def test_basic_notification():
@@ -98,6 +99,9 @@ async def main():
         "Error Notification": await test_error_notification()
     }
     
+    # Event notifications are queued; post them before exiting
+    await slack_notifier.close()
+    
     # Print summary
     print("="*60)
     print("TEST RESULTS SUMMARY")
@@ -0,0 +1,70 @@
+"""
+Train the local intent model of one classifier
+Fits a TF-IDF + logistic regression model on labelled messages, reports its accuracy
+on a held-out fifth of them, then trains on everything and writes
+<INTENT_MODEL_DIR>/<classifier>.json, which the classifier loads on startup.
+
+Input is JSON lines with "message" and "intent" (and optionally "classifier"; other
+classifiers' rows are skipped), e.g. exported chat traffic labelled by hand:
+    INTENT_MODEL_DIR=models/intents python train_intent_model.py advanced_workflow traffic.jsonl
+Without an input file the bundled intent_samples.jsonl is used.
+"""
+import json
+import os
+import random
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.intents import INTENT_MODEL_DIR, TfidfLogisticModel, tokenize
+
+DEFAULT_SAMPLES = Path(__file__).parent / "intent_samples.jsonl"
+HOLDOUT_FRACTION = 0.2
+
+
+def load_samples(path: Path, classifier: str):
+    samples = []
+    with open(path) as file:
+        for line in file:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row.get("classifier", classifier) == classifier:
+                samples.append((row["message"], row["intent"]))
+    return samples
+
+
+def main() -> int:
+    if len(sys.argv) < 2:
+        print("Usage: python train_intent_model.py <classifier> [samples.jsonl]")
+        return 1
+    classifier = sys.argv[1]
+    path = Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SAMPLES
+    if not INTENT_MODEL_DIR:
+        print("❌ INTENT_MODEL_DIR is not set")
+        return 1
+
+    samples = load_samples(path, classifier)
+    if len(samples) < 10:
+        print(f"❌ Only {len(samples)} samples for {classifier} in {path}")
+        return 1
+
+    shuffled = samples[:]
+    random.Random(0).shuffle(shuffled)
+    holdout = shuffled[:max(1, int(len(shuffled) * HOLDOUT_FRACTION))]
+    training = shuffled[len(holdout):]
+    model = TfidfLogisticModel.train(training)
+    correct = sum(1 for message, intent in holdout if model.predict(tokenize(message))[0] == intent)
+    print(f"{classifier}: {len(training)} training / {len(holdout)} held out, accuracy {correct / len(holdout):.0%}")
+
+    model = TfidfLogisticModel.train(samples)
+    os.makedirs(INTENT_MODEL_DIR, exist_ok=True)
+    output = os.path.join(INTENT_MODEL_DIR, f"{classifier}.json")
+    model.save(output)
+    print(f"✅ Wrote {output} ({len(model.labels)} intents, {len(model.idf)} terms)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
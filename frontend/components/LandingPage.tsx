@@ -9,6 +9,8 @@ export default function LandingPage() {
   const [showOrders, setShowOrders] = useState(false);
   const [orders, setOrders] = useState<any[]>([]);
   const [loadingOrders, setLoadingOrders] = useState(false);
+  const [nextOrdersCursor, setNextOrdersCursor] = useState<string | null>(null);
+  const [loadingMoreOrders, setLoadingMoreOrders] = useState(false);
   const [user, setUser] = useState<any>(null);
   const [token, setToken] = useState<string | null>(null);
   const dropdownRef = useRef<HTMLDivElement>(null);
@@ -49,26 +51,45 @@ export default function LandingPage() {
     setShowProfileDropdown(false);
   };
 
+  // Order history is paged; the cursor for the next page comes back in X-Next-Cursor
+  const fetchOrdersPage = (cursor: string | null) =>
+    axios.get(`${process.env.NEXT_PUBLIC_API_URL}/api/my-orders`, {
+      headers: { 'Authorization': `Bearer ${token}` },
+      params: { fields: 'id,items,total,status,created_at', ...(cursor ? { cursor } : {}) }
+    });
+
   const fetchOrders = async () => {
     if (!token || !user) return;
     
     setLoadingOrders(true);
     try {
-      const response = await axios.get(
-        `${process.env.NEXT_PUBLIC_API_URL}/api/my-orders`,
-        {
-          headers: { 'Authorization': `Bearer ${token}` }
-        }
-      );
+      const response = await fetchOrdersPage(null);
       setOrders(response.data);
+      setNextOrdersCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Error fetching orders:', error);
       setOrders([]);
+      setNextOrdersCursor(null);
     } finally {
       setLoadingOrders(false);
     }
   };
 
+  const fetchMoreOrders = async () => {
+    if (!token || !nextOrdersCursor) return;
+    
+    setLoadingMoreOrders(true);
+    try {
+      const response = await fetchOrdersPage(nextOrdersCursor);
+      setOrders((previous) => [...previous, ...response.data]);
+      setNextOrdersCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error fetching more orders:', error);
+    } finally {
+      setLoadingMoreOrders(false);
+    }
+  };
+
   const handleShowOrders = () => {
     setShowOrders(true);
     setShowProfileDropdown(false);
@@ -337,6 +358,15 @@ export default function LandingPage() {
                       </div>
                     </div>
                   ))}
+                  {nextOrdersCursor && (
+                    <button
+                      onClick={fetchMoreOrders}
+                      disabled={loadingMoreOrders}
+                      className="w-full py-2 text-coffee-700 border border-coffee-200 rounded-lg hover:bg-coffee-50 disabled:opacity-50"
+                    >
+                      {loadingMoreOrders ? 'Loading...' : 'Load older orders'}
+                    </button>
+                  )}
                 </div>
               )}
             </div>